@@ -0,0 +1,41 @@
+"""
+Compare the int8 and ONNX inference backends with fp32 PyTorch on a tiny local checkpoint.
+
+Usage (from the repository root):
+    python -m benchmarks.backend_parity [--pairs 512] [--batch-size 32]
+"""
+import argparse
+import tempfile
+
+from benchmarks.tiny_model import build_tiny_checkpoint, generate_sentences
+from core.config import Config
+from core.inference_backends import compare_backends
+from core.model_registry import ModelRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pairs', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=32)
+    # The production threshold would make most decisions of a random checkpoint equal; the default
+    # is the median fp32 probability, so half of the decisions are positive.
+    parser.add_argument('--threshold', type=float, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        Config.INFERENCE_ONNX_CACHE_DIR = f"{directory}/onnx"
+        model_path = build_tiny_checkpoint(f"{directory}/model")
+        premises = generate_sentences(args.pairs, seed=1)
+        hypotheses = generate_sentences(args.pairs, min_words=2, max_words=4, seed=2)
+        reports = compare_backends(model_path, list(zip(premises, hypotheses)), args.threshold,
+                                   batch_size=args.batch_size, registry=ModelRegistry())
+
+    print(f"threshold {reports[0]['threshold']:.4f}")
+    print(f"{'backend':<12}{'agreement':>12}{'mean_abs_diff':>15}{'max_abs_diff':>15}{'seconds':>10}{'speedup':>10}")
+    for report in reports:
+        print(f"{report['backend']:<12}{report['agreement']:>12.4f}{report['mean_abs_diff']:>15.2e}{report['max_abs_diff']:>15.2e}"
+              f"{report['seconds']:>10.3f}{report['speedup']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
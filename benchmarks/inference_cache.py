@@ -0,0 +1,91 @@
+"""
+Measure the shared inference cache on recurring categorize and find_task requests: latency with
+the cache disabled, with token encodings only, with token encodings and logits, and after a restart
+with the logits on disk, plus the hit rates and sizes of the caches.
+
+Requests draw their texts from a small pool with a Zipf-like skew, as in recurring-task workflows.
+
+Usage (from the repository root):
+    python -m benchmarks.inference_cache [--requests 300] [--distinct-texts 50] [--categories 30] [--tasks 40]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_data import MOOD_CATEGORIES, generate_tasks
+from benchmarks.tiny_model import build_tiny_checkpoint, generate_sentences
+from core.config import Config
+from core.inference_cache import inference_cache
+from core.lru_cache import LRUCache
+
+
+def recurring(pool, count, seed=0):
+    """
+    Draw count items from the pool, the i-th most frequent with a probability proportional to 1 / (i + 1).
+    """
+    weights = 1.0 / np.arange(1, len(pool) + 1)
+    indices = np.random.default_rng(seed).choice(len(pool), size=count, p=weights / weights.sum())
+    return [pool[index] for index in indices]
+
+
+def configure(mode, cache_dir):
+    """
+    Set up the shared cache for a mode: 'off', 'tokens' (logits never kept), 'on' or 'restart'
+    (empty memory, logits on disk from the previous mode).
+    """
+    inference_cache.enabled = mode != 'off'
+    inference_cache.logits = LRUCache(0 if mode == 'tokens' else Config.INFERENCE_CACHE_LOGIT_SIZE, max_bytes=Config.INFERENCE_CACHE_LOGIT_MAX_BYTES, sizeof=inference_cache.logits.sizeof)
+    inference_cache.cache_dir = cache_dir if mode in ('on', 'restart') else None
+    inference_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--distinct-texts', type=int, default=50)
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--tasks', type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        Config.CATEGORIZER_MODEL_NAME = Config.TASK_SEARCH_MODEL_NAME = build_tiny_checkpoint(f"{directory}/model")
+        Config.TASK_SEARCH_LEXICAL_ENABLED = False
+        from services.categorizer_service import CategorizerService
+        from services.task_search_service import TaskSearchService
+
+        categorizer = CategorizerService()
+        task_search = TaskSearchService()
+        categories = MOOD_CATEGORIES[:args.categories]
+        tasks = generate_tasks(args.tasks)
+        texts = recurring(generate_sentences(args.distinct_texts), args.requests, seed=1)
+        queries = recurring(generate_sentences(args.distinct_texts, min_words=2, max_words=6, seed=2), args.requests, seed=3)
+        categorizer.warmup(categories)
+        task_search.warmup()
+
+        requests = {
+            'categorize': lambda index: categorizer.categorize(texts[index], categories),
+            'find_task': lambda index: task_search.find_task(queries[index], tasks),
+        }
+        print(f"{'scenario':12} {'mode':8} {'median ms':>10} {'mean ms':>9} {'token hits':>11} {'logit hits':>11} {'disk hits':>10} {'token MB':>9} {'logit MB':>9}")
+        for name, request in requests.items():
+            for mode in ('off', 'tokens', 'on', 'restart'):
+                configure(mode, f"{directory}/{name}")
+                latencies = []
+                for index in range(args.requests):
+                    start = time.perf_counter()
+                    request(index)
+                    latencies.append(time.perf_counter() - start)
+                stats = inference_cache.stats()
+                print(
+                    f"{name:12} {mode:8} {statistics.median(latencies) * 1000:10.2f} {statistics.mean(latencies) * 1000:9.2f} "
+                    f"{stats['tokens']['hit_rate']:11.1%} {stats['logits']['hit_rate']:11.1%} {stats['logits']['disk_hit_rate']:10.1%} "
+                    f"{stats['tokens']['bytes'] / 2 ** 20:9.2f} {stats['logits']['bytes'] / 2 ** 20:9.2f}"
+                )
+    configure('on', Config.INFERENCE_CACHE_DIR)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Measure the overhead of the stage timers on categorize, analyze_mood (lite) and recommend, with
+instrumentation disabled and enabled.
+
+The disabled overhead is estimated as the number of hook calls per request times the cost of a
+disabled hook, relative to the request latency, since the hooks cannot be compiled out.
+
+Usage (from the repository root):
+    python -m benchmarks.instrumentation_overhead [--requests 200] [--categories 30]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+import timeit
+
+from benchmarks.synthetic_data import MOOD_CATEGORIES, generate_advice_catalogue, generate_mood_history, generate_user_profiles
+from benchmarks.tiny_model import build_tiny_checkpoint, generate_sentences
+from core.config import Config
+from core.inference_cache import inference_cache
+from core.instrumentation import instrumentation
+
+
+def hook_cost(enabled, number=200000):
+    """
+    Return the seconds per timer() block with instrumentation enabled or disabled.
+    """
+    instrumentation.enabled = enabled
+    seconds = timeit.timeit("with timer('benchmark', 'noop'): pass", globals={'timer': instrumentation.timer}, number=number)
+    instrumentation.reset()
+    return seconds / number
+
+
+def median_latencies(function, count):
+    """
+    Time every request with instrumentation disabled and enabled, alternating so that drift affects both alike.
+
+    Returns:
+    tuple: The median disabled and enabled latencies.
+    """
+    latencies = {False: [], True: []}
+    for index in range(count):
+        for enabled in (False, True):
+            instrumentation.enabled = enabled
+            start = time.perf_counter()
+            function(index)
+            latencies[enabled].append(time.perf_counter() - start)
+    instrumentation.reset()
+    return statistics.median(latencies[False]), statistics.median(latencies[True])
+
+
+def hook_calls(function):
+    """
+    Count the timer and counter calls of one request.
+    """
+    instrumentation.enabled = True
+    instrumentation.reset()
+    function(0)
+    snapshot = instrumentation.snapshot()
+    instrumentation.reset()
+    return sum(stage['calls'] for stage in snapshot['stages'].values()) + len(snapshot['counters'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--categories', type=int, default=30)
+    args = parser.parse_args()
+
+    disabled_cost, enabled_cost = hook_cost(False), hook_cost(True)
+    print(f"timer block: disabled {disabled_cost * 1e9:6.0f} ns, enabled {enabled_cost * 1e9:6.0f} ns")
+
+    with tempfile.TemporaryDirectory() as directory:
+        Config.CATEGORIZER_MODEL_NAME = build_tiny_checkpoint(f"{directory}/model")
+        # Every text is categorized with instrumentation disabled and then enabled, so the second
+        # request would be answered by the inference cache.
+        inference_cache.enabled = False
+        from services.categorizer_service import CategorizerService
+        from services.mood_analyzer_service import MoodAnalyzerService
+        from services.reccomendation_service import RecommendationService
+
+        categorizer = CategorizerService()
+        categories = MOOD_CATEGORIES[:args.categories]
+        texts = generate_sentences(args.requests)
+        mood_analyzer = MoodAnalyzerService()
+        history = generate_mood_history(365, categories=10)
+        recommender = RecommendationService()
+        advice_objects = generate_advice_catalogue(300)
+        profiles = list(generate_user_profiles(100))
+        categorizer.categorize(texts[0], categories)
+
+        requests = {
+            'categorize': lambda index: categorizer.categorize(texts[index % len(texts)], categories),
+            'analyze_mood lite': lambda index: mood_analyzer.analyze_mood(history, mode='lite'),
+            'recommend': lambda index: recommender.recommend(*profiles[index % len(profiles)][1:], advice_objects, k=5),
+        }
+        for name, function in requests.items():
+            calls = hook_calls(function)
+            disabled, enabled = median_latencies(function, args.requests)
+            print(
+                f"{name:18} {calls:3d} hooks/request  disabled {disabled * 1000:8.3f} ms "
+                f"(estimated hook overhead {100 * calls * disabled_cost / disabled:.3f}%)  "
+                f"enabled {enabled * 1000:8.3f} ms ({100 * (enabled - disabled) / disabled:+.2f}%)"
+            )
+    instrumentation.enabled = Config.INSTRUMENTATION_ENABLED
+    inference_cache.enabled = Config.INFERENCE_CACHE_ENABLED
+
+
+if __name__ == '__main__':
+    main()
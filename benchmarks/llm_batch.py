@@ -0,0 +1,45 @@
+"""
+Compare one-at-a-time completion requests with the pooled, concurrency-limited AsyncLLMClient
+against the local stub LLM server.
+
+Usage (from the repository root):
+    python -m benchmarks.llm_batch [--requests 500] [--latency-ms 50] [--concurrency 16] [--error-rate 0.05]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.stub_llm_server import StubLLMServer
+from core.config import Config
+from services.llm_client import AsyncLLMClient
+
+
+async def run(args):
+    prompts = [Config.TASK_PARSER_CREATE_PROMPT.format(text=f"задача номер {i}") for i in range(args.requests)]
+    async with StubLLMServer(latency_ms=args.latency_ms, error_rate=args.error_rate) as server:
+        async with AsyncLLMClient(server.url, 'stub', max_concurrency=1, backoff_base=0.01) as client:
+            start = time.perf_counter()
+            for prompt in prompts:
+                await client.complete(prompt, Config.TASK_PARSER_ENGINE, Config.TASK_PARSER_MAX_TOKENS)
+            sequential = time.perf_counter() - start
+
+        async with AsyncLLMClient(server.url, 'stub', max_concurrency=args.concurrency, backoff_base=0.01) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(client.complete(prompt, Config.TASK_PARSER_ENGINE, Config.TASK_PARSER_MAX_TOKENS) for prompt in prompts))
+            concurrent = time.perf_counter() - start
+
+    print(f"sequential:            {sequential:.2f}s ({args.requests / sequential:.1f} req/s)")
+    print(f"concurrency={args.concurrency:<10}{concurrent:.2f}s ({args.requests / concurrent:.1f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
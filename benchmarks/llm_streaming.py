@@ -0,0 +1,79 @@
+"""
+Measure time-to-first-field of streamed task parsing against waiting for the whole completion,
+on the local streaming stub LLM server.
+
+The canned completions are followed by trailing text, as models often add, to show that the
+stream is closed as soon as all fields have been parsed.
+
+Usage (from the repository root):
+    python -m benchmarks.llm_streaming [--requests 20] [--latency-ms 50] [--token-latency-ms 10]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from benchmarks.stub_llm_server import CANNED_TASKS, StubLLMServer
+from core.config import Config
+from services.llm_client import AsyncLLMClient
+from services.task_stream_parser import IncrementalTaskParser
+
+TRAILING_TEXT = "\n\nПояснение: срок и приоритет определены по тексту запроса, оценка времени приблизительная."
+
+
+async def measure(client, prompt):
+    """
+    Stream one completion through the incremental parser.
+
+    Returns:
+    tuple: The seconds to the first field, to the last field and to the end of the stream
+    if it had been read to the end.
+    """
+    parser = IncrementalTaskParser()
+    start = time.perf_counter()
+    first_field = all_fields = None
+    async for chunk in client.stream(prompt, Config.TASK_PARSER_ENGINE, Config.TASK_PARSER_MAX_TOKENS):
+        if parser.feed(chunk) and first_field is None:
+            first_field = time.perf_counter() - start
+        if parser.finished and all_fields is None:
+            all_fields = time.perf_counter() - start
+    return first_field, all_fields, time.perf_counter() - start
+
+
+async def run(args):
+    completions = [json.dumps(task, ensure_ascii=False) + TRAILING_TEXT for task in CANNED_TASKS]
+    prompt = Config.TASK_PARSER_CREATE_PROMPT.format(text="купить молоко завтра в 10")
+    async with StubLLMServer(latency_ms=args.latency_ms, token_latency_ms=args.token_latency_ms, completions=completions) as server:
+        async with AsyncLLMClient(server.url, 'stub', max_concurrency=1) as client:
+            timings = [await measure(client, prompt) for _ in range(args.requests)]
+
+            tokens_before = server.tokens_streamed
+            for _ in range(args.requests):
+                parser = IncrementalTaskParser()
+                async for chunk in client.stream(prompt, Config.TASK_PARSER_ENGINE, Config.TASK_PARSER_MAX_TOKENS):
+                    parser.feed(chunk)
+                    if parser.finished:
+                        break
+            await asyncio.sleep(args.token_latency_ms / 1000 * 2)
+            early_stop_tokens = server.tokens_streamed - tokens_before
+
+    first_field, all_fields, full = (statistics.median(column) for column in zip(*timings))
+    full_tokens = sum(-(-len(text) // server.token_chars) for text in completions) * args.requests / len(completions)
+    print(f"time to first field (title): {first_field * 1000:7.1f} ms")
+    print(f"time to all fields:          {all_fields * 1000:7.1f} ms")
+    print(f"time to full completion:     {full * 1000:7.1f} ms")
+    print(f"tokens generated with early stop: {early_stop_tokens} of ~{full_tokens:.0f} "
+          f"({server.streams_cancelled} streams closed early)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--token-latency-ms', type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Compare sequential find_task calls with concurrent calls coalesced by the InferenceServer,
+on a tiny local checkpoint.
+
+Usage (from the repository root):
+    python -m benchmarks.micro_batching [--requests 200] [--tasks 8]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from benchmarks.tiny_model import build_tiny_checkpoint, generate_sentences
+from core.config import Config
+from core.inference_cache import inference_cache
+
+
+async def run_concurrent(server, queries, tasks):
+    async with server:
+        start = time.perf_counter()
+        await asyncio.gather(*(server.find_task(query, tasks) for query in queries))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        Config.TASK_SEARCH_MODEL_NAME = build_tiny_checkpoint(f"{directory}/model")
+        Config.TASK_SEARCH_LEXICAL_ENABLED = False
+        # Both passes score the same queries, so the second would be answered by the inference cache.
+        inference_cache.enabled = False
+
+        from services.inference_server import InferenceServer
+        from services.task_search_service import TaskSearchService
+
+        service = TaskSearchService()
+        queries = generate_sentences(args.requests, seed=1)
+        tasks = [
+            {'task_id': str(i), 'task_title': title, 'list_title': '', 'description': ''}
+            for i, title in enumerate(generate_sentences(args.tasks, seed=2))
+        ]
+
+        start = time.perf_counter()
+        for query in queries:
+            service.find_task(query, tasks)
+        sequential = time.perf_counter() - start
+
+        server = InferenceServer(task_search_service=service)
+        concurrent = asyncio.run(run_concurrent(server, queries, tasks))
+
+    print(f"sequential: {sequential:.3f}s ({args.requests / sequential:.1f} req/s)")
+    print(f"batched:    {concurrent:.3f}s ({args.requests / concurrent:.1f} req/s)")
+    stats = server.stats()['find_task']
+    print(f"latency p50={stats['latency_p50_seconds'] * 1000:.1f}ms p99={stats['latency_p99_seconds'] * 1000:.1f}ms")
+    print(f"batch sizes: {stats['batch_size_histogram']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Compare sequential analyze_mood calls with analyze_mood_many over synthetic user histories.
+
+The sequential baseline runs on the first --sample users and is extrapolated; the results of
+those users are checked to be identical in both modes.
+
+Usage (from the repository root):
+    python -m benchmarks.mood_bulk [--users 10000] [--sample 200] [--workers N] [--min-days 30] [--max-days 365]
+"""
+import argparse
+import time
+
+from benchmarks.synthetic_data import generate_mood_histories
+from services.mood_analyzer_service import MoodAnalyzerService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--sample', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--min-days', type=int, default=30)
+    parser.add_argument('--max-days', type=int, default=365)
+    parser.add_argument('--categories', type=int, default=10)
+    args = parser.parse_args()
+
+    def histories():
+        return generate_mood_histories(args.users, args.min_days, args.max_days, args.categories)
+
+    sample = min(args.sample, args.users)
+    service = MoodAnalyzerService()
+    sequential_results = {}
+    start = time.perf_counter()
+    for user_id, history in histories():
+        if user_id >= sample:
+            break
+        sequential_results[user_id] = service.analyze_mood(history)
+    sequential = (time.perf_counter() - start) / sample
+
+    start = time.perf_counter()
+    first_result = None
+    mismatches = 0
+    for user_id, impact_map in service.analyze_mood_many(histories(), max_workers=args.workers):
+        first_result = first_result or time.perf_counter() - start
+        if user_id in sequential_results and impact_map != sequential_results[user_id]:
+            mismatches += 1
+    pooled = time.perf_counter() - start
+
+    print(f"sequential: {sequential * 1000:.1f} ms/user, ~{sequential * args.users:.1f}s for {args.users} users (from {sample})")
+    print(f"pooled:     {pooled:.1f}s for {args.users} users ({args.users / pooled:.1f} users/s, "
+          f"first result after {first_result:.2f}s, speedup {sequential * args.users / pooled:.2f}x)")
+    print(f"mismatching results in the sample: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Measure the latency and peak traced memory of analyze_mood for different history formats,
+against the previous DataFrame-based pipeline.
+
+Usage (from the repository root):
+    python -m benchmarks.mood_ingestion [--days 1825] [--categories 40] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
+
+from benchmarks.synthetic_data import generate_mood_history
+from core.config import Config
+from services.mood_analyzer_service import MoodAnalyzerService
+
+
+def legacy_analyze_mood(user_history):
+    """
+    The DataFrame-based pipeline analyze_mood used before it ingested columnar float32 data.
+    """
+    df = pd.DataFrame(user_history)
+    y = df['mood_rate']
+    X = df.drop(['mood_rate'], axis=1)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=Config.MOOD_ANALYZER_TEST_SIZE, random_state=Config.MOOD_ANALYZER_RANDOM_STATE)
+    model = RandomForestRegressor(n_estimators=Config.MOOD_ANALYZER_N_ESTIMATORS, random_state=Config.MOOD_ANALYZER_RANDOM_STATE)
+    model.fit(X_train, y_train)
+    model.score(X_test, y_test)
+    importances = pd.Series(model.feature_importances_, index=X.columns).sort_values(ascending=False)
+    correlation_with_mood = df.corr()['mood_rate'].sort_values(ascending=False)
+    importances_df = importances.reset_index()
+    importances_df.columns = ['Feature', 'Importance']
+    correlation_with_mood_df = correlation_with_mood.reset_index()
+    correlation_with_mood_df.columns = ['Feature', 'Correlation']
+    combined_df = importances_df.merge(correlation_with_mood_df, on='Feature')
+    combined_df['Impact'] = combined_df['Importance'] * combined_df['Correlation']
+    important_features_df = combined_df[combined_df['Importance'] >= Config.MOOD_ANALYZER_TRESHOLD_IMPORTANCE]
+    return important_features_df.sort_values(by='Impact', ascending=False).set_index('Feature')['Impact'].to_dict()
+
+
+def measure(function, repeat):
+    """
+    Returns:
+    tuple: The best latency in seconds and the peak traced memory in bytes.
+    """
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(latencies), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=1825)
+    parser.add_argument('--categories', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    history = generate_mood_history(args.days, args.categories)
+    arrays = {name: np.asarray(values, dtype=np.float32) for name, values in history.items()}
+    structured = np.zeros(args.days, dtype=[(name, np.float32) for name in history])
+    for name, values in history.items():
+        structured[name] = values
+
+    with tempfile.TemporaryDirectory() as directory:
+        inputs = [('dict of lists', history), ('dict of float32 arrays', arrays), ('structured array', structured)]
+        npy_path = os.path.join(directory, 'history.npy')
+        with warnings.catch_warnings():
+            # Non-ASCII field names need version 3.0 of the .npy format.
+            warnings.simplefilter('ignore', UserWarning)
+            np.save(npy_path, structured)
+        inputs.append(('memory-mapped .npy', npy_path))
+        try:
+            import pyarrow
+            import pyarrow.feather
+            import pyarrow.parquet
+            table = pyarrow.table(arrays)
+            parquet_path = os.path.join(directory, 'history.parquet')
+            feather_path = os.path.join(directory, 'history.arrow')
+            pyarrow.parquet.write_table(table, parquet_path)
+            pyarrow.feather.write_feather(table, feather_path, compression='uncompressed')
+            inputs += [('Arrow table', table), ('Parquet file', parquet_path), ('memory-mapped Arrow file', feather_path)]
+        except ImportError:
+            print("pyarrow is not installed, skipping the Arrow and Parquet inputs")
+
+        print(f"{args.days} days x {args.categories} categories")
+        latency, peak = measure(lambda: legacy_analyze_mood(history), args.repeat)
+        print(f"{'before: DataFrame pipeline':32} {latency * 1000:8.1f} ms  peak {peak / 2 ** 20:7.2f} MiB")
+        for name, user_history in inputs:
+            # A fresh service per call so that the model cache does not answer the repeats.
+            latency, peak = measure(lambda: MoodAnalyzerService().analyze_mood(user_history), args.repeat)
+            print(f"{'after: ' + name:32} {latency * 1000:8.1f} ms  peak {peak / 2 ** 20:7.2f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare the 'lite' and 'forest' modes of MoodAnalyzerService: rank agreement of the impact maps
+and speedup across history sizes.
+
+Rank agreement is the Spearman correlation of the impacts of the features both modes report;
+overlap is the Jaccard index of the reported features.
+
+Usage (from the repository root):
+    python -m benchmarks.mood_lite [--days 30 90 365 1825] [--categories 20] [--users 10]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_data import generate_mood_history
+from services.mood_analyzer_service import MoodAnalyzerService
+
+
+def spearman(first, second):
+    if len(first) < 2:
+        return float('nan')
+    ranks = [np.argsort(np.argsort(values)) for values in (first, second)]
+    return float(np.corrcoef(*ranks)[0, 1])
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 90, 365, 1825])
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--users', type=int, default=10)
+    args = parser.parse_args()
+
+    service = MoodAnalyzerService()
+    print(f"{'days':>6} {'forest ms':>10} {'lite ms':>8} {'speedup':>8} {'spearman':>9} {'overlap':>8} {'same top':>9}")
+    for days in args.days:
+        forest_times, lite_times, correlations, overlaps, same_top = [], [], [], [], []
+        for user in range(args.users):
+            history = generate_mood_history(days, args.categories, seed=user)
+            forest, forest_time = timed(lambda: service.analyze_mood(history, mode='forest'))
+            lite, lite_time = timed(lambda: service.analyze_mood(history, mode='lite'))
+            forest_times.append(forest_time)
+            lite_times.append(lite_time)
+            common = [feature for feature in forest if feature in lite]
+            correlation = spearman([forest[feature] for feature in common], [lite[feature] for feature in common])
+            if correlation == correlation:
+                correlations.append(correlation)
+            union = set(forest) | set(lite)
+            overlaps.append(len(common) / len(union) if union else 1.0)
+            same_top.append(bool(forest) and bool(lite) and next(iter(forest)) == next(iter(lite)))
+        forest_ms = statistics.median(forest_times) * 1000
+        lite_ms = statistics.median(lite_times) * 1000
+        print(f"{days:>6} {forest_ms:>10.1f} {lite_ms:>8.2f} {forest_ms / lite_ms:>7.0f}x "
+              f"{statistics.mean(correlations) if correlations else float('nan'):>9.2f} "
+              f"{statistics.mean(overlaps):>8.2f} {statistics.mean(same_top):>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Measure the per-event latency of online fold-in (record_shown/record_agreed/record_completed)
+against an offline factorization model trained on synthetic users and advice.
+
+Usage (from the repository root):
+    python -m benchmarks.recommendation_events [--users 1000] [--advice 300] [--events 2000]
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic_data import generate_advice_catalogue, generate_user_profiles
+from services.reccomendation_service import RecommendationService
+from services.recommendation_trainer import train_recommendation_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--advice', type=int, default=300)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    advice_objects = generate_advice_catalogue(args.advice)
+    advice_names = list(advice_objects)
+    profiles = list(generate_user_profiles(args.users))
+    with tempfile.TemporaryDirectory() as directory:
+        train_recommendation_model(profiles, advice_objects, directory)
+        service = RecommendationService()
+        service.load_model(directory)
+
+        events = (service.record_shown, service.record_agreed, service.record_completed)
+        for name, user_ids in (('known users', [user_id for user_id, _, _ in profiles]), ('new users', [f"new-{i}" for i in range(100)])):
+            latencies = []
+            for _ in range(args.events):
+                record = rng.choice(events)
+                user_id = rng.choice(user_ids)
+                start = time.perf_counter()
+                record(user_id, rng.choice(advice_names), advice_objects)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            print(f"{name:12} median {statistics.median(latencies) * 1e6:7.1f} us  p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1e6:7.1f} us")
+
+        before = service.recommend(set(), {}, advice_objects, user_id='cold-start', k=5)
+        for advice_name in rng.sample(advice_names, 3):
+            service.record_completed('cold-start', advice_name, advice_objects)
+        after = service.recommend(set(), {}, advice_objects, user_id='cold-start', k=5)
+        print(f"new user top-5 before events: {before}")
+        print(f"new user top-5 after 3 completions: {after}")
+
+
+if __name__ == '__main__':
+    main()
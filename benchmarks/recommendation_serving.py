@@ -0,0 +1,79 @@
+"""
+Train the offline factorization model on synthetic users and advice, then compare serve-time
+recommendation latency with the previous per-request SVD training.
+
+Usage (from the repository root):
+    python -m benchmarks.recommendation_serving [--users 2000] [--advice 500] [--requests 200]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+from surprise import Dataset, Reader, SVD
+from surprise.model_selection import train_test_split
+
+from benchmarks.synthetic_data import generate_advice_catalogue, generate_user_profiles
+from core.config import Config
+from services.reccomendation_service import RecommendationService
+from services.recommendation_trainer import train_recommendation_model
+
+
+def legacy_recommendation(service, user_categories, user_category_impact, advice_objects):
+    """
+    The previous request path: train an SVD on a one-user dataset and predict every advice.
+    """
+    ratings = service.score_advice([(user_categories, user_category_impact)], advice_objects)[0]
+    dataframe = pd.DataFrame({'userID': 'user', 'itemID': list(advice_objects), 'rating': ratings})
+    dataset = Dataset.load_from_df(dataframe, Reader(rating_scale=(Config.RECOMMENDATION_MIN_SCALE, Config.RECOMMENDATION_MAX_SCALE)))
+    trainset, testset = train_test_split(dataset, test_size=Config.RECCOMENDATION_TEST_SIZE)
+    model = SVD()
+    model.fit(trainset)
+    model.test(testset)
+    return max(advice_objects, key=lambda advice_name: model.predict('user', advice_name).est)
+
+
+def timed(function, count):
+    latencies = []
+    for index in range(count):
+        start = time.perf_counter()
+        function(index)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies), sorted(latencies)[int(0.99 * (len(latencies) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--advice', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    advice_objects = generate_advice_catalogue(args.advice)
+    profiles = list(generate_user_profiles(args.users))
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        rmse = train_recommendation_model(profiles, advice_objects, directory)
+        print(f"offline training: {time.perf_counter() - start:.1f}s, held-out RMSE {rmse:.3f}")
+
+        service = RecommendationService()
+        start = time.perf_counter()
+        service.load_model(directory)
+        print(f"model load:       {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        def serve(index):
+            user_id, user_categories, user_category_impact = profiles[index % len(profiles)]
+            service.recommend(user_categories, user_category_impact, advice_objects, user_id=user_id, k=10)
+
+        def legacy(index):
+            _, user_categories, user_category_impact = profiles[index % len(profiles)]
+            legacy_recommendation(service, user_categories, user_category_impact, advice_objects)
+
+        for name, function, count in (('served top-10', serve, args.requests), ('per-request SVD', legacy, min(args.requests, 20))):
+            median, p99 = timed(function, count)
+            print(f"{name:17} median {median * 1000:8.2f} ms  p99 {p99 * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Measure the import time of every service module and the latency of the first request with and
+without warmup(), and check them against the startup budgets in Config.
+
+Every measurement runs in a fresh interpreter, with the scenarios and inputs of benchmarks.suite.
+The import time excludes numpy and core.config, which the benchmark itself imports first.
+
+Usage (from the repository root):
+    python -m benchmarks.startup [--scenarios categorize,find_task] [--scale small] [--steady-requests 20]
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import suite
+from benchmarks.synthetic_data import provide_private_config
+from core.config import Config
+
+SERVICE_MODULES = {
+    'categorize': 'services.categorizer_service',
+    'find_task': 'services.task_search_service',
+    'create_task': 'services.task_parser_service',
+    'edit_task': 'services.task_parser_service',
+    'analyze_mood': 'services.mood_analyzer_service',
+    'analyze_mood_lite': 'services.mood_analyzer_service',
+    'get_recommendations': 'services.reccomendation_service',
+}
+HEAVY_MODULES = ('torch', 'transformers', 'sklearn', 'pandas', 'surprise', 'openai')
+
+
+def measure(name, scale_name, options, warm, steady_requests):
+    """
+    Import the service, set up the scenario, optionally warm it up and time the first and the
+    following requests. Runs in the child process.
+
+    Returns:
+    dict: The import time, the heavy modules loaded by the import, the warm-up time, the first
+    request latency and the steady-state median latency.
+    """
+    start = time.perf_counter()
+    importlib.import_module(SERVICE_MODULES[name])
+    import_seconds = time.perf_counter() - start
+    heavy_modules = [module for module in HEAVY_MODULES if module in sys.modules]
+
+    # torch reads its thread count from OMP_NUM_THREADS, set by the parent, so it is not imported here.
+    server = suite.prepare(name, options, configure_torch=False)
+    try:
+        scale = dict(suite.SCALES[scale_name], requests=steady_requests + 1)
+        request, warmup = suite.SCENARIOS[name](scale, options)
+        warmup_seconds = None
+        if warm:
+            start = time.perf_counter()
+            warmup()
+            warmup_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        request(0)
+        first_request = time.perf_counter() - start
+        latencies = []
+        for index in range(1, steady_requests + 1):
+            start = time.perf_counter()
+            request(index)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        if server is not None:
+            server.stop_in_thread()
+    return {
+        'import_seconds': import_seconds,
+        'heavy_modules_after_import': heavy_modules,
+        'warmup_seconds': warmup_seconds,
+        'first_request_ms': first_request * 1000,
+        'steady_median_ms': statistics.median(latencies) * 1000,
+    }
+
+
+def run_in_child(name, scale_name, options, warm, steady_requests):
+    command = [
+        sys.executable, '-m', 'benchmarks.startup', '--child', name, scale_name,
+        '--options', json.dumps(options), '--steady-requests', str(steady_requests),
+    ] + (['--warm'] if warm else [])
+    environment = dict(os.environ, OMP_NUM_THREADS=str(options['threads']))
+    completed = subprocess.run(command, capture_output=True, text=True, env=environment)
+    if completed.returncode:
+        raise RuntimeError(f"{name} failed: {completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(suite.SCENARIOS), help=f"Comma-separated, of: {', '.join(suite.SCENARIOS)}.")
+    parser.add_argument('--scale', default='small', choices=list(suite.SCALES))
+    parser.add_argument('--steady-requests', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--llm-latency-ms', type=float, default=20.0)
+    parser.add_argument('--child', nargs=2, metavar=('SCENARIO', 'SCALE'), help=argparse.SUPPRESS)
+    parser.add_argument('--options', help=argparse.SUPPRESS)
+    parser.add_argument('--warm', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Registered before the import is timed; it does not import any service.
+        provide_private_config()
+        print(json.dumps(measure(*args.child, json.loads(args.options), args.warm, args.steady_requests)))
+        return
+
+    scenarios = args.scenarios.split(',')
+    unknown = [name for name in scenarios if name not in suite.SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    from benchmarks.tiny_model import build_tiny_checkpoint
+
+    violations = []
+    print(f"{'scenario':20} {'import s':>8} {'cold 1st ms':>11} {'warmup s':>9} {'warm 1st ms':>11} {'steady ms':>9}  heavy modules after import")
+    with tempfile.TemporaryDirectory() as work_dir:
+        options = {
+            'model': build_tiny_checkpoint(os.path.join(work_dir, 'model')),
+            'work_dir': work_dir,
+            'threads': args.threads,
+            'llm_latency_ms': args.llm_latency_ms,
+        }
+        for name in scenarios:
+            cold = run_in_child(name, args.scale, options, False, args.steady_requests)
+            warm = run_in_child(name, args.scale, options, True, args.steady_requests)
+            print(
+                f"{name:20} {cold['import_seconds']:8.2f} {cold['first_request_ms']:11.1f} {warm['warmup_seconds']:9.2f} "
+                f"{warm['first_request_ms']:11.2f} {warm['steady_median_ms']:9.2f}  {', '.join(cold['heavy_modules_after_import']) or '-'}"
+            )
+            if cold['import_seconds'] > Config.STARTUP_IMPORT_BUDGET_SECONDS:
+                violations.append(f"{name}: import took {cold['import_seconds']:.2f}s, budget {Config.STARTUP_IMPORT_BUDGET_SECONDS}s")
+            slowdown = warm['first_request_ms'] / warm['steady_median_ms']
+            budget_ms = max(Config.STARTUP_FIRST_REQUEST_MAX_SLOWDOWN * warm['steady_median_ms'], Config.STARTUP_FIRST_REQUEST_MIN_BUDGET_MS)
+            if warm['first_request_ms'] > budget_ms:
+                violations.append(
+                    f"{name}: first request after warmup() took {slowdown:.1f}x the steady-state median, "
+                    f"budget {Config.STARTUP_FIRST_REQUEST_MAX_SLOWDOWN}x or {Config.STARTUP_FIRST_REQUEST_MIN_BUDGET_MS} ms"
+                )
+
+    for violation in violations:
+        print(f"OVER BUDGET {violation}")
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
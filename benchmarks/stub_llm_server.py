@@ -0,0 +1,167 @@
+"""
+A local stand-in for the OpenAI completions endpoint that replays canned JSON task completions.
+
+Usage (from the repository root):
+    python -m benchmarks.stub_llm_server [--port 8089] [--latency-ms 50] [--token-latency-ms 10] [--error-rate 0.0]
+
+Then point Config.TASK_PARSER_API_BASE at http://127.0.0.1:8089/v1.
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+
+from aiohttp import web
+
+CANNED_TASKS = [
+    {"title": "Купить молоко", "description": "Купить молоко в магазине", "deadline": "2024-06-02T10:00",
+     "priority": "high", "estimated_time": 15, "spent_time": 0},
+    {"title": "Созвон с Петей", "description": "Обсудить проект", "deadline": "2024-06-03T12:30",
+     "priority": "medium", "estimated_time": 30, "spent_time": 0},
+    {"title": "Пробежка", "description": "Утренняя пробежка в парке", "deadline": "2024-06-01T07:00",
+     "priority": "low", "estimated_time": 45, "spent_time": 10},
+]
+
+
+class StubLLMServer:
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=50.0, error_rate=0.0, completions=None, seed=0,
+                 token_latency_ms=10.0, token_chars=4):
+        """
+        Initialize the stub server.
+
+        Args:
+        host (str): The host to bind to.
+        port (int): The port to bind to. 0 picks a free port.
+        latency_ms (float): The simulated generation latency of every request, or the time to the first token when streaming.
+        error_rate (float): The fraction of requests answered with HTTP 429 or 503, to exercise retries.
+        completions (list of str, optional): The completion texts to replay in turn. Defaults to the canned tasks.
+        seed (int): The random seed for injected errors.
+        token_latency_ms (float): The simulated latency of every further token of a streamed completion.
+        token_chars (int): The number of characters of a streamed token.
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.completions = completions or [json.dumps(task, ensure_ascii=False) for task in CANNED_TASKS]
+        self.token_latency = token_latency_ms / 1000
+        self.token_chars = token_chars
+        self.requests = 0
+        self.tokens_streamed = 0
+        self.streams_cancelled = 0
+        self.model_list_authorizations = []
+        self._random = random.Random(seed)
+        self._runner = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def _completions(self, request):
+        payload = await request.json()
+        index = self.requests
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if self._random.random() < self.error_rate:
+            status = self._random.choice([429, 503])
+            return web.json_response({'error': {'message': 'Injected error'}}, status=status, headers={'retry-after': '0.01'})
+        text = self.completions[index % len(self.completions)]
+        if payload.get('stream'):
+            return await self._stream(request, payload, text)
+        return web.json_response({
+            'object': 'text_completion',
+            'model': payload.get('model'),
+            'choices': [{'index': 0, 'text': text, 'finish_reason': 'stop'}],
+        })
+
+    async def _stream(self, request, payload, text):
+        """
+        Send the completion as server-sent events, one token of token_chars characters at a time.
+        """
+        response = web.StreamResponse(headers={'content-type': 'text/event-stream'})
+        await response.prepare(request)
+        try:
+            for start in range(0, len(text), self.token_chars):
+                if start:
+                    await asyncio.sleep(self.token_latency)
+                event = {'object': 'text_completion', 'model': payload.get('model'),
+                         'choices': [{'index': 0, 'text': text[start:start + self.token_chars], 'finish_reason': None}]}
+                await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode())
+                self.tokens_streamed += 1
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            # The client closed the stream early, which stops the generation.
+            self.streams_cancelled += 1
+        except asyncio.CancelledError:
+            self.streams_cancelled += 1
+            raise
+        return response
+
+    async def _models(self, request):
+        self.model_list_authorizations.append(request.headers.get('Authorization'))
+        return web.json_response({'object': 'list', 'data': []})
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post('/v1/completions', self._completions)
+        # The legacy openai<1 client used by the synchronous TaskParserService path.
+        app.router.add_post('/v1/engines/{engine}/completions', self._completions)
+        # Requested by TaskParserService.warmup to open its connection.
+        app.router.add_get('/v1/models', self._models)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def start_in_thread(self):
+        """
+        Run the server on its own event loop in a daemon thread, for synchronous clients.
+
+        Returns:
+        StubLLMServer: The started server; call stop_in_thread() to stop it.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='stub-llm-server', daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self._loop).result()
+        return self
+
+    def stop_in_thread(self):
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--token-latency-ms', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = StubLLMServer(args.host, args.port, args.latency_ms, args.error_rate, token_latency_ms=args.token_latency_ms)
+    web.run_app(server.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
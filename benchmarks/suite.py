@@ -0,0 +1,357 @@
+"""
+Offline benchmark suite: latency, throughput and peak RSS of every service at several scales,
+compared against a stored baseline.
+
+No network access is needed. The NLI models are a tiny randomly initialized XLM-R-shaped
+checkpoint built on the fly, the LLM is the local stub server and all inputs come from the
+synthetic generators. Without core/private_config.py, placeholder secrets are used.
+
+Every scenario runs in a fresh interpreter so that its peak RSS and model loads are its own.
+
+Usage (from the repository root):
+    python -m benchmarks.suite [--scales small,medium] [--scenarios categorize,find_task] [--output results.json]
+    python -m benchmarks.suite --save-baseline                     # store the results as the baseline
+    python -m benchmarks.suite --baseline benchmarks/baseline.json  # flag regressions, exit status 1 if any
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_data import (
+    generate_advice_catalogue, generate_categories, generate_mood_history, generate_tasks, generate_user_profiles,
+    provide_private_config
+)
+from core.config import Config
+
+DEFAULT_BASELINE = os.path.join('benchmarks', 'baseline.json')
+
+# Per scale: categories per categorize request, tasks per find_task/edit_task request, days per
+# mood history, advice in the catalogue, users of the factorization model and timed requests.
+SCALES = {
+    'small': {'categories': 10, 'tasks': 20, 'days': 60, 'advice': 100, 'users': 200, 'requests': 100},
+    'medium': {'categories': 30, 'tasks': 100, 'days': 365, 'advice': 500, 'users': 1000, 'requests': 50},
+    'large': {'categories': 60, 'tasks': 500, 'days': 1500, 'advice': 2000, 'users': 5000, 'requests': 20},
+}
+
+# Metrics compared with the baseline, and whether higher values are better.
+COMPARED_METRICS = {'median_ms': False, 'p95_ms': False, 'throughput_rps': True, 'peak_rss_mb': False}
+
+
+# Every scenario sets up its service and inputs and returns (request, warmup): request(index)
+# runs one request and warmup() runs the service's warm-up for these inputs.
+def _categorize(scale, options):
+    from benchmarks.tiny_model import generate_sentences
+    from services.categorizer_service import CategorizerService
+
+    service = CategorizerService()
+    categories = generate_categories(scale['categories'])
+    texts = generate_sentences(scale['requests'] + 1, seed=1)
+    return (lambda index: service.categorize(texts[index], categories)), (lambda: service.warmup(categories))
+
+
+def _search_queries(tasks, count):
+    """
+    Alternate queries close to a task title with unrelated ones, so that both the lexical and the
+    cross-encoder stages are exercised.
+    """
+    from benchmarks.tiny_model import generate_sentences
+
+    unrelated = generate_sentences(count, seed=2)
+    return [f"{tasks[index % len(tasks)]['task_title']} срочно" if index % 2 else unrelated[index] for index in range(count)]
+
+
+def _find_task(scale, options):
+    from services.task_search_service import TaskSearchService
+
+    service = TaskSearchService()
+    tasks = generate_tasks(scale['tasks'])
+    queries = _search_queries(tasks, scale['requests'] + 1)
+    return (lambda index: service.find_task(queries[index], tasks)), (lambda: service.warmup(tasks))
+
+
+def _create_task(scale, options):
+    from benchmarks.tiny_model import generate_sentences
+    from services.task_parser_service import TaskParserService
+
+    service = TaskParserService()
+    # Unique inputs, so that neither the fast path nor the response cache answers.
+    inputs = [f"{sentence} и еще {index} подробностей" for index, sentence in enumerate(generate_sentences(scale['requests'] + 1, 8, 16, seed=3))]
+    return (lambda index: service.create_task(inputs[index])), (lambda: service.warmup(search=False))
+
+
+def _edit_task(scale, options):
+    from services.task_parser_service import TaskParserService
+
+    service = TaskParserService()
+    tasks = generate_tasks(scale['tasks'])
+    # Every edit quotes an existing task, so that the lexical stage finds it, and is unique, so that
+    # every request reaches the LLM.
+    return (lambda index: service.edit_task(f"{service.task_search_service.task_text(tasks[index % len(tasks)])} правка {index}", tasks)), (lambda: service.warmup(all_tasks=tasks))
+
+
+def _analyze_mood(scale, options, mode='forest'):
+    from services.mood_analyzer_service import MoodAnalyzerService
+
+    service = MoodAnalyzerService()
+    # A new history per request, so that the per-user model cache does not answer.
+    histories = [generate_mood_history(scale['days'], seed=index) for index in range(scale['requests'] + 1)]
+    return (lambda index: service.analyze_mood(histories[index], mode=mode)), service.warmup
+
+
+def _analyze_mood_lite(scale, options):
+    return _analyze_mood(scale, options, mode='lite')
+
+
+def _get_recommendations(scale, options):
+    from services.reccomendation_service import RecommendationService
+    from services.recommendation_trainer import train_recommendation_model
+
+    advice_objects = generate_advice_catalogue(scale['advice'])
+    profiles = list(generate_user_profiles(scale['users']))
+    model_path = os.path.join(options['work_dir'], 'recommendation_model')
+    train_recommendation_model(profiles, advice_objects, model_path)
+    service = RecommendationService()
+    service.load_model(model_path)
+    # Every other request comes from a user unknown to the model and is scored content-based.
+    requests = [
+        (user_id if index % 2 else None, user_categories, user_category_impact)
+        for index, (user_id, user_categories, user_category_impact) in enumerate(profiles[:scale['requests'] + 1])
+    ]
+    request = lambda index: service.get_recommendations(requests[index][1], requests[index][2], advice_objects, user_id=requests[index][0])
+    return request, (lambda: service.warmup(advice_objects))
+
+
+SCENARIOS = {
+    'categorize': _categorize,
+    'find_task': _find_task,
+    'create_task': _create_task,
+    'edit_task': _edit_task,
+    'analyze_mood': _analyze_mood,
+    'analyze_mood_lite': _analyze_mood_lite,
+    'get_recommendations': _get_recommendations,
+}
+# Scenarios that load the NLI model; the others do not import torch, so that their peak RSS is their own.
+MODEL_SCENARIOS = {'categorize', 'find_task', 'create_task', 'edit_task'}
+
+
+def peak_rss_mb():
+    """
+    Return the peak resident set size of this process in MB.
+
+    On Linux VmHWM is used: unlike ru_maxrss it is reset by exec, so it does not include the
+    peak of the parent that built the checkpoint.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def prepare(name, options, configure_torch=True):
+    """
+    Point the configuration at the tiny checkpoint, disable the inference cache and start the stub
+    LLM server if the scenario needs it.
+
+    Args:
+    name (str): The scenario.
+    options (dict): The suite options.
+    configure_torch (bool): Whether to seed torch and set its threads. This imports torch.
+
+    Returns:
+    StubLLMServer: The running stub server, or None.
+    """
+    if configure_torch and name in MODEL_SCENARIOS:
+        import torch
+        torch.manual_seed(0)
+        torch.set_num_threads(options['threads'])
+    Config.CATEGORIZER_MODEL_NAME = Config.TASK_SEARCH_MODEL_NAME = options['model']
+    if name in MODEL_SCENARIOS:
+        # Every request must reach the model, as in the baseline: the recurring categories and
+        # task titles would otherwise be answered by the inference cache, which
+        # benchmarks.inference_cache measures on its own.
+        from core.inference_cache import inference_cache
+        inference_cache.enabled = False
+        inference_cache.clear()
+    Config.RECOMMENDATION_MODEL_PATH = os.path.join(options['work_dir'], 'missing_model')
+    if name not in ('create_task', 'edit_task'):
+        return None
+    from benchmarks.stub_llm_server import StubLLMServer
+    server = StubLLMServer(latency_ms=options['llm_latency_ms']).start_in_thread()
+    Config.TASK_PARSER_API_BASE = server.url
+    return server
+
+
+def run_scenario(name, scale_name, options):
+    """
+    Set up a scenario, run one untimed warm-up request and time the rest. Runs in the child process.
+
+    Returns:
+    dict: The setup time, request count, median and p95 latency, throughput and peak RSS.
+    """
+    server = prepare(name, options)
+    try:
+        scale = SCALES[scale_name]
+        start = time.perf_counter()
+        request, _ = SCENARIOS[name](scale, options)
+        request(scale['requests'])
+        setup_seconds = time.perf_counter() - start
+
+        latencies = []
+        started_at = time.perf_counter()
+        for index in range(scale['requests']):
+            start = time.perf_counter()
+            request(index)
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started_at
+    finally:
+        if server is not None:
+            server.stop_in_thread()
+
+    latencies.sort()
+    return {
+        'setup_seconds': setup_seconds,
+        'requests': len(latencies),
+        'median_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        'throughput_rps': len(latencies) / elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_in_child(name, scale_name, options):
+    command = [sys.executable, '-m', 'benchmarks.suite', '--child', name, scale_name, '--options', json.dumps(options)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f"exit status {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with the baseline.
+
+    A metric regresses when it is worse than the baseline by more than the tolerance, e.g. a
+    median latency above (1 + tolerance) times the baseline or a throughput below 1 / (1 + tolerance) times it.
+
+    Returns:
+    list of str: One message per regression.
+    """
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None or 'error' in result or 'error' in reference:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            value, expected = result[metric], reference[metric]
+            if not expected:
+                continue
+            ratio = expected / value if higher_is_better else value / expected
+            if ratio > 1 + tolerance:
+                regressions.append(f"{key} {metric}: {value:.2f} vs baseline {expected:.2f} ({(ratio - 1) * 100:.0f}% worse)")
+    return regressions
+
+
+def print_table(results, baseline):
+    print(f"{'scenario':32} {'median ms':>10} {'p95 ms':>10} {'req/s':>9} {'peak RSS MB':>12}  vs baseline (median)")
+    for key, result in results.items():
+        if 'error' in result:
+            print(f"{key:32} error: {result['error']}")
+            continue
+        reference = baseline.get(key, {})
+        delta = f"{(result['median_ms'] / reference['median_ms'] - 1) * 100:+.1f}%" if reference.get('median_ms') else '-'
+        print(f"{key:32} {result['median_ms']:10.2f} {result['p95_ms']:10.2f} {result['throughput_rps']:9.1f} {result['peak_rss_mb']:12.1f}  {delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='small,medium', help=f"Comma-separated, of: {', '.join(SCALES)}.")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma-separated, of: {', '.join(SCENARIOS)}.")
+    parser.add_argument('--output', help="Write the results as JSON to this path.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the baseline instead of comparing.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="The relative slowdown that counts as a regression.")
+    parser.add_argument('--threads', type=int, default=1, help="The torch intra-op threads of every scenario.")
+    parser.add_argument('--llm-latency-ms', type=float, default=20.0)
+    parser.add_argument('--child', nargs=2, metavar=('SCENARIO', 'SCALE'), help=argparse.SUPPRESS)
+    parser.add_argument('--options', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        provide_private_config()
+        print(json.dumps(run_scenario(*args.child, json.loads(args.options))))
+        return
+
+    scales = args.scales.split(',')
+    scenarios = args.scenarios.split(',')
+    unknown = [name for name in scales if name not in SCALES] + [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scales or scenarios: {', '.join(unknown)}")
+
+    from benchmarks.tiny_model import build_tiny_checkpoint
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        options = {
+            'model': build_tiny_checkpoint(os.path.join(work_dir, 'model')),
+            'work_dir': work_dir,
+            'threads': args.threads,
+            'llm_latency_ms': args.llm_latency_ms,
+        }
+        for scale_name in scales:
+            for name in scenarios:
+                results[f"{name}/{scale_name}"] = run_in_child(name, scale_name, options)
+                print(f"finished {name}/{scale_name}", file=sys.stderr)
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'threads': args.threads,
+            'llm_latency_ms': args.llm_latency_ms,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print_table(results, {})
+        print(f"Saved the baseline to {args.baseline}.")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != report['environment']:
+            print("Warning: the baseline was recorded in a different environment:", baseline.get('environment'))
+        baseline = baseline.get('results', {})
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+    print_table(results, baseline)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    failures = [key for key, result in results.items() if 'error' in result]
+    if regressions or failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Synthetic data generators for the offline benchmarks.
+"""
+import sys
+from types import ModuleType, SimpleNamespace
+
+import numpy as np
+
+from benchmarks.tiny_model import generate_sentences
+
+MOOD_CATEGORIES = [
+    "Командный спорт", "Экстремальный спорт", "Водный спорт", "Индивидуальный спорт", "Силовой спорт",
+    "Созвоны и видеоконференции", "Проектная работа", "Деловые встречи", "Ментальное здоровье",
+    "Физическое здоровье", "Лекции и семинары", "Домашние задания", "Онлайн-курсы", "Общение с друзьями",
+    "Романтика", "Время с детьми", "Общение с родственниками", "Общение с коллегами", "Сон", "Игры",
+    "Просмотр фильмов и сериалов", "Чтение книг", "Поход в музей", "Поход в лес", "Туризм", "Уборка",
+    "Шоппинг", "Рукоделие", "Философия", "Танцы и хореография",
+]
+
+
+def provide_private_config():
+    """
+    Register placeholder secrets as core.private_config if the untracked module is missing, so
+    that the services can be imported on a clean checkout. The benchmarks never reach a real API.
+    """
+    try:
+        import core.private_config  # noqa: F401
+    except ModuleNotFoundError:
+        module = ModuleType('core.private_config')
+        module.PrivateConfig = type('PrivateConfig', (), {'CATEGORIZER_AUTH_TOKEN': None, 'TASK_PARSER_OPEN_AI_API_KEY': 'sk-benchmark'})
+        sys.modules['core.private_config'] = module
+
+
+TASK_LISTS = ["Работа", "Дом", "Покупки", "Здоровье", "Учеба", "Семья", "Хобби", "Путешествия"]
+
+
+def generate_categories(count):
+    """
+    Return count category names: MOOD_CATEGORIES first, then numbered variants of them.
+    """
+    return [MOOD_CATEGORIES[i % len(MOOD_CATEGORIES)] + ('' if i < len(MOOD_CATEGORIES) else f" {i}") for i in range(count)]
+
+
+def generate_tasks(count, seed=0):
+    """
+    Generate task dictionaries in the format of TaskSearchService.find_task.
+
+    Args:
+    count (int): The number of tasks.
+    seed (int): The random seed.
+
+    Returns:
+    list of dict: The tasks, with task ids "task-0", "task-1", ...
+    """
+    rng = np.random.default_rng(seed)
+    titles = generate_sentences(count, min_words=2, max_words=5, seed=seed)
+    descriptions = generate_sentences(count, min_words=4, max_words=15, seed=seed + 1)
+    return [
+        {
+            'task_id': f"task-{index}",
+            'task_title': title,
+            'list_title': TASK_LISTS[int(rng.integers(len(TASK_LISTS)))],
+            'description': description,
+            'deadline': f"2024-06-{int(rng.integers(1, 31)):02d}T{int(rng.integers(8, 21)):02d}:00",
+            'estimation': f"{int(rng.integers(1, 9))}h",
+            'spent': f"{int(rng.integers(0, 5))}h",
+            'priority': ('none', 'low', 'medium', 'high')[int(rng.integers(4))],
+        }
+        for index, (title, description) in enumerate(zip(titles, descriptions))
+    ]
+
+
+def generate_mood_history(days, categories=10, seed=0):
+    """
+    Generate a daily history of activity counts and a mood rating that depends on a few of them.
+
+    Args:
+    days (int): The number of days.
+    categories (int): The number of category columns.
+    seed (int): The random seed.
+
+    Returns:
+    dict: The history in the format of MoodAnalyzerService.analyze_mood.
+    """
+    rng = np.random.default_rng(seed)
+    names = generate_categories(categories)
+    counts = rng.poisson(1.0, size=(days, categories))
+    weights = np.zeros(categories)
+    weights[:min(4, categories)] = rng.normal(0, 0.6, size=min(4, categories))
+    mood = np.clip(np.rint(3 + counts @ weights - weights.sum() + rng.normal(0, 0.7, size=days)), 1, 5)
+    history = {name: counts[:, i].tolist() for i, name in enumerate(names)}
+    history['mood_rate'] = mood.astype(int).tolist()
+    return history
+
+
+def generate_mood_histories(users, min_days=30, max_days=365, categories=10, seed=0):
+    """
+    Generate (user_id, history) pairs lazily.
+
+    Args:
+    users (int): The number of users.
+    min_days (int): The minimum number of days of a history.
+    max_days (int): The maximum number of days of a history.
+    categories (int): The number of category columns.
+    seed (int): The random seed.
+
+    Yields:
+    tuple: (user_id, history) pairs.
+    """
+    rng = np.random.default_rng(seed)
+    for user_id in range(users):
+        yield user_id, generate_mood_history(int(rng.integers(min_days, max_days + 1)), categories, seed + user_id + 1)
+
+
+def generate_advice_catalogue(advice_count, categories=None, max_categories=3, seed=0):
+    """
+    Generate advice objects with random categories and interaction counters.
+
+    Args:
+    advice_count (int): The number of advice.
+    categories (list of str, optional): The category names. Defaults to MOOD_CATEGORIES.
+    max_categories (int): The maximum number of categories of an advice.
+    seed (int): The random seed.
+
+    Returns:
+    dict: Advice names mapped to objects with categories, showed_count, agreed_count and completed_count.
+    """
+    rng = np.random.default_rng(seed)
+    categories = categories or MOOD_CATEGORIES
+    catalogue = {}
+    for index in range(advice_count):
+        size = int(rng.integers(1, max_categories + 1))
+        showed = int(rng.integers(0, 30))
+        agreed = int(rng.integers(0, showed + 1))
+        catalogue[f"Совет {index}"] = SimpleNamespace(
+            categories=[categories[i] for i in rng.choice(len(categories), size=size, replace=False)],
+            showed_count=showed,
+            agreed_count=agreed,
+            completed_count=int(rng.integers(0, agreed + 1))
+        )
+    return catalogue
+
+
+def generate_user_profiles(users, categories=None, liked=3, impactful=5, seed=0):
+    """
+    Generate (user_id, user_categories, user_category_impact) triples lazily.
+
+    Args:
+    users (int): The number of users.
+    categories (list of str, optional): The category names. Defaults to MOOD_CATEGORIES.
+    liked (int): The number of liked categories of a user.
+    impactful (int): The number of categories with an impact on a user's mood.
+    seed (int): The random seed.
+
+    Yields:
+    tuple: (user_id, user_categories, user_category_impact) triples.
+    """
+    rng = np.random.default_rng(seed)
+    categories = categories or MOOD_CATEGORIES
+    for user_id in range(users):
+        user_categories = {categories[i] for i in rng.choice(len(categories), size=liked, replace=False)}
+        user_category_impact = {
+            categories[i]: float(rng.normal(0, 0.02)) for i in rng.choice(len(categories), size=impactful, replace=False)
+        }
+        yield user_id, user_categories, user_category_impact
@@ -0,0 +1,95 @@
+import random
+
+# Same special token ids as XLM-R: <s>=0, <pad>=1, </s>=2, <unk>=3.
+SPECIAL_TOKENS = ['<s>', '<pad>', '</s>', '<unk>', '<mask>']
+
+WORDS = [
+    "созвон", "встреча", "проект", "отчет", "купить", "молоко", "завтра", "сегодня", "утром", "вечером",
+    "пробежка", "йога", "медитация", "уборка", "кулинария", "шоппинг", "музей", "лес", "туризм", "сон",
+    "игры", "фильм", "сериал", "книга", "лекция", "семинар", "курс", "друзья", "дети", "родственники",
+    "коллеги", "спорт", "музыка", "рисование", "танцы", "театр", "фото", "видео", "философия", "здоровье",
+    "это", "пример", "с", "на", "в", "и", "для", "по", "приоритет", "высокий", "низкий", "срочно",
+    "call", "meeting", "project", "report", "buy", "milk", "tomorrow", "today", "run", "read",
+]
+
+
+def generate_sentences(count, min_words=3, max_words=12, seed=0):
+    """
+    Generate random sentences from a small Russian/English vocabulary.
+
+    Args:
+    count (int): The number of sentences.
+    min_words (int): The minimum number of words per sentence.
+    max_words (int): The maximum number of words per sentence.
+    seed (int): The random seed.
+
+    Returns:
+    list of str: The generated sentences.
+    """
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))) for _ in range(count)]
+
+
+def build_tiny_checkpoint(path, hidden_size=32, num_hidden_layers=2, num_attention_heads=2, vocab_size=500, seed=0, weight_std=0.3):
+    """
+    Build a tiny, randomly initialized XLM-R-shaped NLI checkpoint with a matching fast tokenizer.
+
+    The checkpoint has the same input/output contract as joeddav/xlm-roberta-large-xnli
+    (three labels, XLM-R special tokens, pair encoding '<s> A </s></s> B </s>') and loads with
+    AutoTokenizer / AutoModelForSequenceClassification, without any network access.
+
+    Args:
+    path (str): The directory to save the checkpoint to.
+    hidden_size (int): The hidden size of the encoder.
+    num_hidden_layers (int): The number of encoder layers.
+    num_attention_heads (int): The number of attention heads.
+    vocab_size (int): The maximum vocabulary size of the tokenizer.
+    seed (int): The random seed for the weights.
+    weight_std (float): The standard deviation of the weight matrices. With the default
+        transformers initialization every pair scores about 0.5, so decisions would not depend on the input.
+
+    Returns:
+    str: The path of the checkpoint.
+    """
+    # Imported here, so that generate_sentences does not load torch for benchmarks that measure it.
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors, trainers
+    from transformers import PreTrainedTokenizerFast, XLMRobertaConfig, XLMRobertaForSequenceClassification
+
+    tokenizer = Tokenizer(models.WordPiece(unk_token='<unk>'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    trainer = trainers.WordPieceTrainer(vocab_size=vocab_size, special_tokens=SPECIAL_TOKENS)
+    tokenizer.train_from_iterator(WORDS + generate_sentences(200, seed=seed), trainer)
+    tokenizer.post_processor = processors.RobertaProcessing(('</s>', 2), ('<s>', 0))
+    fast_tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        bos_token='<s>', eos_token='</s>', sep_token='</s>', cls_token='<s>',
+        unk_token='<unk>', pad_token='<pad>', mask_token='<mask>',
+        model_max_length=512,
+        model_input_names=['input_ids', 'attention_mask'],
+    )
+    fast_tokenizer.save_pretrained(path)
+
+    torch.manual_seed(seed)
+    config = XLMRobertaConfig(
+        vocab_size=len(fast_tokenizer),
+        hidden_size=hidden_size,
+        num_hidden_layers=num_hidden_layers,
+        num_attention_heads=num_attention_heads,
+        intermediate_size=hidden_size * 4,
+        max_position_embeddings=514,
+        type_vocab_size=1,
+        pad_token_id=1,
+        bos_token_id=0,
+        eos_token_id=2,
+        num_labels=3,
+        id2label={0: 'contradiction', 1: 'neutral', 2: 'entailment'},
+        label2id={'contradiction': 0, 'neutral': 1, 'entailment': 2},
+    )
+    model = XLMRobertaForSequenceClassification(config)
+    with torch.no_grad():
+        for parameter in model.parameters():
+            if parameter.dim() > 1:
+                parameter.normal_(0.0, weight_std)
+    model.save_pretrained(path)
+    return path
@@ -1,13 +1,62 @@
 class Config:
+    # Inference backend shared by CategorizerService and TaskSearchService: 'torch', 'torch_int8' or 'onnx'
+    INFERENCE_BACKEND = 'torch'
+    INFERENCE_ONNX_CACHE_DIR = 'onnx_models'
+    INFERENCE_ONNX_OPSET = 14
+    # Inference cache shared by CategorizerService and TaskSearchService (core.inference_cache): token encodings
+    # by string and NLI logits by (model, text hash, hypothesis), bounded by entries and bytes;
+    # INFERENCE_CACHE_DIR additionally keeps the logits in a SQLite file
+    INFERENCE_CACHE_ENABLED = True
+    INFERENCE_CACHE_TOKEN_SIZE = 100000
+    INFERENCE_CACHE_TOKEN_MAX_BYTES = 64 * 1024 * 1024
+    INFERENCE_CACHE_LOGIT_SIZE = 1000000
+    INFERENCE_CACHE_LOGIT_MAX_BYTES = 128 * 1024 * 1024
+    INFERENCE_CACHE_DIR = None
+
+    # Instrumentation (core.instrumentation): stage timers and counters exported in the Prometheus text format
+    INSTRUMENTATION_ENABLED = False
+    INSTRUMENTATION_NAMESPACE = 'app'
+    INSTRUMENTATION_EXPORTER_PORT = None
+    INSTRUMENTATION_PROFILE_EVERY = 0  # run every n-th call of each stage under cProfile, 0 disables
+
+    # Startup budgets checked by python -m benchmarks.startup: import time of a service module in a
+    # fresh interpreter, and the first request after warmup() relative to the steady-state median,
+    # with a floor for requests that take only a few milliseconds
+    STARTUP_IMPORT_BUDGET_SECONDS = 0.5
+    STARTUP_FIRST_REQUEST_MAX_SLOWDOWN = 2.0
+    STARTUP_FIRST_REQUEST_MIN_BUDGET_MS = 5
+
     # CategorizerService Configurations
     CATEGORIZER_MODEL_NAME = "joeddav/xlm-roberta-large-xnli"
     CATEGORIZER_TRESHOLD_CLASSIFICATION = 0.95
+    CATEGORIZER_HYPOTHESIS_TEMPLATE = "Это пример {category}."
+    CATEGORIZER_BATCH_SIZE = 32
+    # Embedding prefilter: only the top-k most similar categories are checked with the NLI model
+    CATEGORIZER_PREFILTER_ENABLED = False
+    CATEGORIZER_PREFILTER_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    CATEGORIZER_PREFILTER_TOP_K = 8
     
     # MoodAnalyzerService Configurations
     MOOD_ANALYZER_N_ESTIMATORS = 100
     MOOD_ANALYZER_RANDOM_STATE = 42
     MOOD_ANALYZER_TEST_SIZE = 0.2
     MOOD_ANALYZER_TRESHOLD_IMPORTANCE = 0.05
+    # Per-user model cache: unchanged histories reuse the cached result, appended days add trees
+    MOOD_ANALYZER_CACHE_SIZE = 256
+    # Approximate memory budget of the cached forests, per process; bulk workers run under WORKER_MEMORY_MB
+    MOOD_ANALYZER_CACHE_MAX_BYTES = 512 * 1024 * 1024
+    MOOD_ANALYZER_CACHE_DIR = None
+    MOOD_ANALYZER_WARM_START_TREES = 10
+    MOOD_ANALYZER_MAX_ESTIMATORS = 200
+    # Bulk analysis: None uses every CPU; histories of at least LARGE_HISTORY_ROWS days are fitted with n_jobs
+    MOOD_ANALYZER_MAX_WORKERS = None
+    MOOD_ANALYZER_WORKER_MEMORY_MB = 2048
+    MOOD_ANALYZER_WORKER_MAX_TASKS = 1000
+    MOOD_ANALYZER_LARGE_HISTORY_ROWS = 2000
+    MOOD_ANALYZER_LARGE_HISTORY_N_JOBS = -1
+    # 'forest' fits the random forest; 'lite' uses standardized ridge coefficients as importances
+    MOOD_ANALYZER_MODE = 'forest'
+    MOOD_ANALYZER_LITE_RIDGE_ALPHA = 1.0
     
     # RecommendationService Configurations
     RECOMMENDATION_MIN_SCALE = 1
@@ -18,12 +67,50 @@ class Config:
     RECOMMENDATION_AGREED_COUNT_WEIGHT = 2
     RECOMMENDATION_SHOWED_COUNT_WEIGHT = -1
     RECCOMENDATION_TEST_SIZE = 0.25
+    # Offline factorization model (python -m services.recommendation_trainer), memory-mapped at serve time
+    RECOMMENDATION_MODEL_PATH = 'recommendation_model'
+    RECOMMENDATION_N_FACTORS = 50
+    RECOMMENDATION_N_EPOCHS = 20
+    RECOMMENDATION_RANDOM_STATE = 42
+    RECOMMENDATION_TRAIN_BATCH_SIZE = 1024
+    # Online fold-in: events become implicit ratings and refit the user's vector against fixed item factors
+    RECOMMENDATION_SHOWN_RATING = 2
+    RECOMMENDATION_AGREED_RATING = 4
+    RECOMMENDATION_COMPLETED_RATING = 5
+    RECOMMENDATION_FOLD_IN_STEPS = 3
+    RECOMMENDATION_FOLD_IN_REGULARIZATION = 0.5
+    RECOMMENDATION_FOLD_IN_MAX_ITEMS = 50
+    RECOMMENDATION_FOLD_IN_MAX_USERS = 100000
     
+    # InferenceServer Configurations (async micro-batching of categorize/find_task)
+    INFERENCE_SERVER_MAX_BATCH_SIZE = 64
+    INFERENCE_SERVER_MAX_WAIT_MS = 5
+    INFERENCE_SERVER_MAX_QUEUE_SIZE = 1024
+    INFERENCE_SERVER_REJECT_WHEN_FULL = False
+    # Threads running the service pipelines of concurrent requests; only their model forward passes are batched.
+    INFERENCE_SERVER_REQUEST_THREADS = 8
+
     # TaskSearchService Configurations
     TASK_SEARCH_MODEL_NAME = "joeddav/xlm-roberta-large-xnli"
     TASK_SEARCH_THRESHOLD = 0.9
     TASK_SEARCH_MAX_TOKEN_LENGTH = 512
-    TASK_SEARCH_PADDING_STRATEGY = 'max_length'
+    TASK_SEARCH_PADDING_STRATEGY = 'longest'
+    TASK_SEARCH_BATCH_SIZE = 32
+    TASK_SEARCH_TOP_K = 5
+    # Persistent task embedding index: one query encoding plus a matrix-vector product per search
+    TASK_SEARCH_INDEX_ENABLED = False
+    TASK_SEARCH_INDEX_PATH = 'task_index'
+    TASK_SEARCH_INDEX_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    TASK_SEARCH_INDEX_THRESHOLD = 0.5
+    TASK_SEARCH_RERANK_TOP_K = 5  # 0 answers from the index alone, without cross-encoder reranking
+    # Lexical TF-IDF stage: answers near-verbatim matches directly, otherwise shortlists candidates.
+    # Enabled by default, so find_task may answer without the cross-encoder and its threshold;
+    # set to False for cross-encoder-only results
+    TASK_SEARCH_LEXICAL_ENABLED = True
+    TASK_SEARCH_LEXICAL_NGRAM_RANGE = (3, 5)
+    TASK_SEARCH_LEXICAL_CONFIDENCE = 0.6
+    TASK_SEARCH_LEXICAL_MARGIN = 0.15
+    TASK_SEARCH_LEXICAL_CANDIDATES = 20
     
     # TaskParserService Configurations
     TASK_PARSER_ENGINE = "gpt-4o"
@@ -39,4 +126,22 @@ class Config:
         "Please provide the updated title, description, deadline (YYYY-MM-DDTHH:MM), priority (none, low, medium, high), "
         "estimated_time (in minutes), and spent_time (in minutes) in a JSON format."
     )
-    TASK_PARSER_MAX_TOKENS = 150
\ No newline at end of file
+    TASK_PARSER_MAX_TOKENS = 150
+    TASK_PARSER_API_BASE = "https://api.openai.com/v1"
+    TASK_PARSER_MAX_CONCURRENCY = 8
+    TASK_PARSER_TIMEOUT_SECONDS = 30
+    TASK_PARSER_MAX_RETRIES = 3
+    TASK_PARSER_BACKOFF_BASE_SECONDS = 0.5
+    TASK_PARSER_BACKOFF_MAX_SECONDS = 8
+    # Rule-based fast path and LLM response cache
+    TASK_PARSER_FAST_PATH_ENABLED = True
+    TASK_PARSER_FAST_PATH_MAX_TITLE_WORDS = 8
+    TASK_PARSER_CACHE_SIZE = 10000
+    TASK_PARSER_CACHE_TTL_SECONDS = 3600
+
+    # Batch pipeline (python -m services.pipeline_runner); PIPELINE_WORKERS = None uses every CPU
+    PIPELINE_BATCH_SIZE = 64
+    PIPELINE_QUEUE_SIZE = 256
+    PIPELINE_WORKERS = None
+    PIPELINE_TOP_K = 3
+    PIPELINE_CHECKPOINT_EVERY = 1000
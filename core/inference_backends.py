@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+import torch
+
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TorchBackend:
+    name = 'torch'
+
+    def __init__(self, model, tokenizer, model_name):
+        """
+        Run the model with plain fp32 PyTorch.
+
+        Args:
+        model (PreTrainedModel): The loaded model in eval mode.
+        tokenizer (PreTrainedTokenizer): The tokenizer of the model.
+        model_name (str): The name or path of the pretrained checkpoint.
+        """
+        self.model = model
+
+    def __call__(self, **inputs):
+        """
+        Run a forward pass.
+
+        Args:
+        **inputs: The tokenizer output as PyTorch tensors.
+
+        Returns:
+        ModelOutput: The model output, e.g. with a `logits` attribute.
+        """
+        with torch.inference_mode():
+            return self.model(**inputs)
+
+    @property
+    def config(self):
+        return self.model.config
+
+
+class QuantizedTorchBackend(TorchBackend):
+    name = 'torch_int8'
+
+    def __init__(self, model, tokenizer, model_name):
+        """
+        Run the model with PyTorch after dynamically quantizing its linear layers to int8.
+        """
+        super().__init__(torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8), tokenizer, model_name)
+
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, model, tokenizer, model_name):
+        """
+        Export the model to ONNX (once, cached on disk) and run it with onnxruntime on CPU.
+        """
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The 'onnx' inference backend requires the onnxruntime package.") from e
+
+        self._config = model.config
+        path = self._export(model, tokenizer, model_name)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [session_input.name for session_input in self.session.get_inputs()]
+        self.output_names = [session_output.name for session_output in self.session.get_outputs()]
+
+    @staticmethod
+    def _fingerprint(model, model_name, input_names, output_name):
+        """
+        Hash everything the exported graph depends on: the model config and hub revision, the
+        modification times and sizes of the files of a local checkpoint, the export inputs and
+        outputs, the opset and the torch version.
+
+        Returns:
+        str: A short hex digest.
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        for part in (model.config.to_json_string(), getattr(model.config, '_commit_hash', None), input_names, output_name, Config.INFERENCE_ONNX_OPSET, torch.__version__):
+            digest.update(repr(part).encode('utf-8'))
+        if os.path.isdir(model_name):
+            for file_name in sorted(os.listdir(model_name)):
+                status = os.stat(os.path.join(model_name, file_name))
+                digest.update(f"{file_name}:{status.st_mtime_ns}:{status.st_size}".encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _export(model, tokenizer, model_name):
+        """
+        Export the model to an ONNX graph with dynamic batch and sequence axes unless it is already cached.
+
+        The file name contains a fingerprint of the checkpoint and the export options, so a changed
+        checkpoint, opset or torch version is exported again instead of reusing a stale graph.
+
+        Returns:
+        str: The path of the ONNX file.
+        """
+        dummy = tokenizer("example", "example", return_tensors='pt')
+        input_names = [name for name in ('input_ids', 'attention_mask') if name in dummy]
+        with torch.inference_mode():
+            output_name = next(iter(model(**{name: dummy[name] for name in input_names}).keys()))
+
+        os.makedirs(Config.INFERENCE_ONNX_CACHE_DIR, exist_ok=True)
+        fingerprint = OnnxBackend._fingerprint(model, model_name, input_names, output_name)
+        file_name = f"{model_name.strip('/').replace('/', '__')}.{output_name}.{fingerprint}.onnx"
+        path = os.path.join(Config.INFERENCE_ONNX_CACHE_DIR, file_name)
+        if os.path.exists(path):
+            return path
+
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+        dynamic_axes[output_name] = {0: 'batch', 1: 'sequence'} if output_name == 'last_hidden_state' else {0: 'batch'}
+        logger.info("Exporting '%s' to ONNX at %s.", model_name, path)
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            path,
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=Config.INFERENCE_ONNX_OPSET,
+            dynamo=False
+        )
+        return path
+
+    def __call__(self, **inputs):
+        feeds = {name: inputs[name].numpy() for name in self.input_names}
+        outputs = self.session.run(self.output_names, feeds)
+        return SimpleNamespace(**{name: torch.from_numpy(output) for name, output in zip(self.output_names, outputs)})
+
+    @property
+    def config(self):
+        return self._config
+
+
+BACKENDS = {backend.name: backend for backend in (TorchBackend, QuantizedTorchBackend, OnnxBackend)}
+
+
+def create_backend(name, model, tokenizer, model_name):
+    """
+    Wrap a loaded model into the inference backend with the given name.
+
+    Args:
+    name (str): One of 'torch', 'torch_int8' or 'onnx'.
+    model (PreTrainedModel): The loaded fp32 model in eval mode.
+    tokenizer (PreTrainedTokenizer): The tokenizer of the model.
+    model_name (str): The name or path of the pretrained checkpoint.
+
+    Returns:
+    object: A callable taking tokenizer outputs and returning the model output.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}'. Expected one of: {', '.join(BACKENDS)}.")
+    return BACKENDS[name](model, tokenizer, model_name)
+
+
+def compare_backends(model_name, pairs, threshold=None, backends=('torch_int8', 'onnx'), batch_size=32, registry=None):
+    """
+    Check the parity and latency of inference backends against plain fp32 PyTorch.
+
+    Every backend scores the same (premise, hypothesis) pairs with the categorizer's entailment
+    probability, and its thresholded decisions are compared with those of the fp32 model. The
+    default threshold is the median fp32 probability, so that half of the decisions are positive
+    and agreement cannot be trivially perfect.
+
+    Args:
+    model_name (str): The name or path of the pretrained checkpoint.
+    pairs (list of tuple): The (premise, hypothesis) pairs to score.
+    threshold (float, optional): The probability threshold for a positive decision. Defaults to the median fp32 probability.
+    backends (tuple of str): The backends to compare against 'torch'.
+    batch_size (int): The number of pairs per forward pass.
+    registry (ModelRegistry, optional): The registry to load models from. Defaults to the shared registry.
+
+    Returns:
+    list of dict: One report per backend with the threshold, the decision agreement, the mean and
+    maximum absolute probability difference, the total scoring time and the speedup over fp32.
+    """
+    if registry is None:
+        from core.model_registry import model_registry as registry
+
+    def score(tokenizer, backend):
+        # One warm-up batch so that lazy initialization is not counted.
+        warmup = pairs[:batch_size]
+        backend(**tokenizer([p for p, _ in warmup], [h for _, h in warmup], return_tensors='pt', truncation=True, padding=True))
+        probabilities = []
+        start = time.perf_counter()
+        for offset in range(0, len(pairs), batch_size):
+            batch = pairs[offset:offset + batch_size]
+            inputs = tokenizer([p for p, _ in batch], [h for _, h in batch], return_tensors='pt', truncation=True, padding=True)
+            logits = backend(**inputs).logits
+            probabilities.extend(logits[:, [0, 2]].softmax(dim=1)[:, 1].tolist())
+        return probabilities, time.perf_counter() - start
+
+    tokenizer, reference = registry.get(model_name, backend='torch')
+    reference_probs, reference_time = score(tokenizer, reference)
+    if threshold is None:
+        threshold = statistics.median(reference_probs)
+    reference_decisions = [prob > threshold for prob in reference_probs]
+
+    reports = [{
+        'backend': 'torch', 'threshold': threshold, 'agreement': 1.0, 'mean_abs_diff': 0.0, 'max_abs_diff': 0.0,
+        'seconds': reference_time, 'speedup': 1.0,
+    }]
+    for name in backends:
+        tokenizer, backend = registry.get(model_name, backend=name)
+        probs, seconds = score(tokenizer, backend)
+        decisions = [prob > threshold for prob in probs]
+        differences = [abs(a - b) for a, b in zip(probs, reference_probs)]
+        reports.append({
+            'backend': name,
+            'threshold': threshold,
+            'agreement': sum(a == b for a, b in zip(decisions, reference_decisions)) / max(len(pairs), 1),
+            'mean_abs_diff': sum(differences) / max(len(differences), 1),
+            'max_abs_diff': max(differences, default=0.0),
+            'seconds': seconds,
+            'speedup': reference_time / seconds if seconds else float('inf'),
+        })
+    return reports
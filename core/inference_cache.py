@@ -0,0 +1,300 @@
+"""
+Tokenization and NLI result caches shared by CategorizerService and TaskSearchService.
+
+Category hypotheses and task texts recur in almost every request, so their token encodings are
+cached by string and the pair inputs are assembled from the cached encodings with the tokenizer's
+post-processor, instead of tokenizing every (text, hypothesis) pair again.
+
+The logits of every scored pair are cached by (model, text hash, hypothesis). The services turn
+them into probabilities and apply their thresholds afterwards, so changing a threshold does not
+invalidate the cache, and both services share the entries when they use the same model. Logits can
+additionally be kept in a SQLite file (INFERENCE_CACHE_DIR), which survives restarts and evictions
+and is shared by the processes of a host.
+
+Both in-memory caches are LRU caches bounded by entry count and bytes; stats() reports their hit
+rates and sizes.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+
+from core.config import Config
+from core.instrumentation import instrumentation
+from core.lru_cache import LRUCache, approximate_size
+
+logger = logging.getLogger(__name__)
+
+# Approximate memory of one token in a tokenizers.Encoding: id, type id, token string, offsets,
+# word id and masks.
+_ENCODING_BYTES_PER_TOKEN = 64
+# Keys per SELECT, below SQLite's limit on the number of query parameters.
+_DISK_BATCH_SIZE = 500
+
+
+def _encoding_size(key, encoding):
+    return sys.getsizeof(key[1]) + _ENCODING_BYTES_PER_TOKEN * len(encoding)
+
+
+def _logit_size(key, logits):
+    # The model key is shared by all entries of a model and not counted.
+    return sys.getsizeof(key) + sys.getsizeof(key[1]) + sys.getsizeof(key[2]) + approximate_size(logits)
+
+
+class InferenceCache:
+    def __init__(self, enabled=True, token_maxsize=100000, token_max_bytes=None, logit_maxsize=1000000, logit_max_bytes=None, cache_dir=None):
+        """
+        Initialize the token encoding and logit caches.
+
+        Args:
+        enabled (bool): Whether to cache anything. When disabled, pairs are tokenized and scored as usual.
+        token_maxsize (int): The maximum number of cached token encodings.
+        token_max_bytes (int, optional): The approximate memory budget of the token encodings.
+        logit_maxsize (int): The maximum number of cached logit rows in memory.
+        logit_max_bytes (int, optional): The approximate memory budget of the logit rows.
+        cache_dir (str, optional): The directory of the SQLite file of logits. None keeps logits in memory only.
+        """
+        self.enabled = enabled
+        self.tokens = LRUCache(token_maxsize, max_bytes=token_max_bytes, sizeof=_encoding_size)
+        self.logits = LRUCache(logit_maxsize, max_bytes=logit_max_bytes, sizeof=_logit_size)
+        self.cache_dir = cache_dir
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._disk_lock = threading.Lock()
+        self._connection = None
+        self._connection_key = None
+        self._backends = {}
+        self._backends_lock = threading.Lock()
+
+    def encode_pairs(self, tokenizer, pairs, padding=True, max_length=None):
+        """
+        Build the model inputs of (text, hypothesis) pairs, equal to those of
+        tokenizer(texts, hypotheses, return_tensors='pt', truncation=True, padding=padding, max_length=max_length),
+        from cached token encodings.
+
+        Batches with a pair that needs truncation, tokenizers without a tokenizers backend and
+        padding strategies other than 'longest' and 'max_length' are tokenized by the tokenizer.
+
+        Args:
+        tokenizer (PreTrainedTokenizerBase): The tokenizer of the model.
+        pairs (list of tuple): The (text, hypothesis) pairs.
+        padding (bool or str): True or 'longest' pads to the longest pair, 'max_length' to max_length.
+        max_length (int, optional): The maximum length of a pair. Defaults to the tokenizer's model_max_length.
+
+        Returns:
+        dict: The input tensors, keyed by the tokenizer's model input names.
+        """
+        import torch
+
+        if not self.enabled or getattr(tokenizer, 'backend_tokenizer', None) is None or padding not in (True, 'longest', 'max_length'):
+            return self._tokenize(tokenizer, pairs, padding, max_length)
+        backend = self._backend(tokenizer.backend_tokenizer)
+
+        limit = max_length or tokenizer.model_max_length
+        special_tokens = tokenizer.num_special_tokens_to_add(pair=True)
+        encodings = []
+        for text, hypothesis in pairs:
+            first = self._encoding(backend, tokenizer.name_or_path, text)
+            second = self._encoding(backend, tokenizer.name_or_path, hypothesis)
+            if len(first) + len(second) + special_tokens > limit:
+                return self._tokenize(tokenizer, pairs, padding, max_length)
+            encodings.append(backend.post_process(first, second))
+
+        length = limit if padding == 'max_length' else max(len(encoding) for encoding in encodings)
+        inputs = {
+            'input_ids': np.full((len(encodings), length), tokenizer.pad_token_id, dtype=np.int64),
+            'attention_mask': np.zeros((len(encodings), length), dtype=np.int64),
+        }
+        if 'token_type_ids' in tokenizer.model_input_names:
+            inputs['token_type_ids'] = np.full((len(encodings), length), tokenizer.pad_token_type_id, dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            columns = slice(0, len(encoding)) if tokenizer.padding_side == 'right' else slice(length - len(encoding), length)
+            inputs['input_ids'][row, columns] = encoding.ids
+            inputs['attention_mask'][row, columns] = encoding.attention_mask
+            if 'token_type_ids' in inputs:
+                inputs['token_type_ids'][row, columns] = encoding.type_ids
+        return {name: torch.from_numpy(array) for name, array in inputs.items()}
+
+    @staticmethod
+    def _tokenize(tokenizer, pairs, padding, max_length):
+        return tokenizer(
+            [text for text, _ in pairs],
+            [hypothesis for _, hypothesis in pairs],
+            return_tensors='pt',
+            truncation=True,
+            padding=padding,
+            max_length=max_length
+        )
+
+    def _backend(self, backend):
+        """
+        Return a private copy of a tokenizers backend without truncation and padding.
+
+        Every call of the tokenizer sets the truncation and padding of its shared backend, so
+        encodings made with it would depend on the previous call.
+        """
+        with self._backends_lock:
+            entry = self._backends.get(id(backend))
+            if entry is None or entry[0] is not backend:
+                from tokenizers import Tokenizer
+
+                private = Tokenizer.from_str(backend.to_str())
+                private.no_truncation()
+                private.no_padding()
+                entry = self._backends[id(backend)] = (backend, private)
+            return entry[1]
+
+    def _encoding(self, backend, tokenizer_name, text):
+        """
+        Return the encoding of the text without special tokens, tokenizing it on a cache miss.
+        """
+        key = (tokenizer_name, text)
+        encoding = self.tokens.get(key)
+        if encoding is None:
+            encoding = backend.encode(text, add_special_tokens=False)
+            self.tokens.set(key, encoding)
+        return encoding
+
+    def get_logits(self, model_key, pairs, compute):
+        """
+        Return the logits of (text, hypothesis) pairs, computing only the distinct pairs found
+        neither in memory nor on disk.
+
+        Args:
+        model_key (tuple): Identifies the model and everything else that changes its logits, e.g.
+            (model name, backend, maximum length).
+        pairs (list of tuple): The (text, hypothesis) pairs.
+        compute (callable): Takes a list of pairs and returns their logits as sequences of floats.
+
+        Returns:
+        list of tuple: The logits of every pair, in order.
+        """
+        if not self.enabled:
+            return compute(pairs)
+
+        keys = [self._logit_key(model_key, text, hypothesis) for text, hypothesis in pairs]
+        rows = {}
+        for key in keys:
+            if key not in rows:
+                rows[key] = self.logits.get(key)
+        missing = [key for key, row in rows.items() if row is None]
+        if missing and self.cache_dir:
+            for key, row in self._load(missing).items():
+                rows[key] = row
+                self.logits.set(key, row)
+            missing = [key for key in missing if rows[key] is None]
+
+        instrumentation.increment('inference_cache', 'logit_hits', len(pairs) - len(missing))
+        instrumentation.increment('inference_cache', 'logit_misses', len(missing))
+        if missing:
+            pairs_by_key = dict(zip(keys, pairs))
+            computed = [tuple(row) for row in compute([pairs_by_key[key] for key in missing])]
+            for key, row in zip(missing, computed):
+                rows[key] = row
+                self.logits.set(key, row)
+            if self.cache_dir:
+                self._store(dict(zip(missing, computed)))
+            instrumentation.set_gauge('inference_cache', 'logit_bytes', self.logits.bytes)
+            instrumentation.set_gauge('inference_cache', 'token_bytes', self.tokens.bytes)
+        return [rows[key] for key in keys]
+
+    @staticmethod
+    def _logit_key(model_key, text, hypothesis):
+        return (model_key, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest(), hypothesis)
+
+    @staticmethod
+    def _disk_key(key):
+        return hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).digest()
+
+    def _disk(self):
+        """
+        Open the SQLite file of logits, once per process and directory, since connections must not cross a fork.
+        """
+        if self._connection_key != (os.getpid(), self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._connection = sqlite3.connect(os.path.join(self.cache_dir, 'logits.sqlite'), check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS logits (key BLOB PRIMARY KEY, logits BLOB)')
+            self._connection_key = (os.getpid(), self.cache_dir)
+        return self._connection
+
+    def _load(self, keys):
+        """
+        Read the logits of the keys from disk.
+
+        Returns:
+        dict: The logits of the keys found on disk.
+        """
+        disk_keys = {self._disk_key(key): key for key in keys}
+        found = {}
+        try:
+            with self._disk_lock:
+                connection = self._disk()
+                disk_key_list = list(disk_keys)
+                for start in range(0, len(disk_key_list), _DISK_BATCH_SIZE):
+                    chunk = disk_key_list[start:start + _DISK_BATCH_SIZE]
+                    placeholders = ','.join('?' * len(chunk))
+                    for disk_key, logits in connection.execute(f'SELECT key, logits FROM logits WHERE key IN ({placeholders})', chunk):
+                        found[disk_keys[disk_key]] = tuple(np.frombuffer(logits, dtype=np.float32).tolist())
+        except sqlite3.Error as e:
+            logger.warning("Could not read cached logits from %s: %s", self.cache_dir, e)
+        self.disk_hits += len(found)
+        self.disk_misses += len(keys) - len(found)
+        return found
+
+    def _store(self, rows):
+        """
+        Write logits to disk.
+
+        Args:
+        rows (dict): The logits keyed by their cache keys.
+        """
+        records = [(self._disk_key(key), np.asarray(row, dtype=np.float32).tobytes()) for key, row in rows.items()]
+        try:
+            with self._disk_lock:
+                connection = self._disk()
+                connection.executemany('INSERT OR REPLACE INTO logits VALUES (?, ?)', records)
+                connection.commit()
+        except sqlite3.Error as e:
+            logger.warning("Could not write cached logits to %s: %s", self.cache_dir, e)
+
+    def stats(self):
+        """
+        Report the entries, bytes, hits, misses, evictions and hit rates of both caches, and the
+        disk hits and misses of the logits.
+        """
+        disk_lookups = self.disk_hits + self.disk_misses
+        return {
+            'enabled': self.enabled,
+            'tokens': self.tokens.stats(),
+            'logits': dict(
+                self.logits.stats(),
+                disk_hits=self.disk_hits,
+                disk_misses=self.disk_misses,
+                disk_hit_rate=self.disk_hits / disk_lookups if disk_lookups else 0.0
+            ),
+        }
+
+    def clear(self):
+        """
+        Drop the in-memory entries and reset the counters. The SQLite file is kept.
+        """
+        for cache in (self.tokens, self.logits):
+            cache.clear()
+            cache.hits = cache.misses = cache.evictions = 0
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+
+inference_cache = InferenceCache(
+    enabled=Config.INFERENCE_CACHE_ENABLED,
+    token_maxsize=Config.INFERENCE_CACHE_TOKEN_SIZE,
+    token_max_bytes=Config.INFERENCE_CACHE_TOKEN_MAX_BYTES,
+    logit_maxsize=Config.INFERENCE_CACHE_LOGIT_SIZE,
+    logit_max_bytes=Config.INFERENCE_CACHE_LOGIT_MAX_BYTES,
+    cache_dir=Config.INFERENCE_CACHE_DIR
+)
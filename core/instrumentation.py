@@ -0,0 +1,288 @@
+"""
+Process-wide stage timers, counters and gauges shared by all services.
+
+Services time their hot-path stages with
+
+    with instrumentation.timer('categorizer', 'forward'):
+        ...
+
+and count events with instrumentation.increment(service, event). While instrumentation is
+disabled (INSTRUMENTATION_ENABLED = False) timer() returns a shared no-op context manager, so
+the hooks cost one attribute check per stage call. The collected metrics are exported in the
+Prometheus text format, over HTTP by start_exporter or as a string by prometheus_text.
+
+Every INSTRUMENTATION_PROFILE_EVERY-th call of a stage can additionally be run under cProfile;
+the accumulated profiles are written by dump_profiles as .pstats files for pstats or snakeviz.
+For whole-process sampling, attach py-spy to the running process instead: the timers add no
+threads or signal handlers that would interfere with it.
+
+Metrics are per process: pool workers (e.g. MoodAnalyzerService.analyze_mood_many) collect their own.
+"""
+import cProfile
+import http.server
+import json
+import os
+import pstats
+import threading
+import time
+
+from core.config import Config
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ('instrumentation', 'key', 'start', 'profiler')
+
+    def __init__(self, instrumentation, key):
+        self.instrumentation = instrumentation
+        self.key = key
+        self.profiler = None
+
+    def __enter__(self):
+        self.profiler = self.instrumentation._start_profile(self.key)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.instrumentation._stop_profile(self.key, self.profiler)
+        self.instrumentation.observe(*self.key, elapsed)
+        return False
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Instrumentation:
+    def __init__(self, enabled=False, namespace='app', profile_every=0):
+        """
+        Initialize the registry of stage timings, event counters and gauges.
+
+        Args:
+        enabled (bool): Whether timers and counters record anything.
+        namespace (str): The prefix of the exported metric names.
+        profile_every (int): Run every n-th call of each stage under cProfile. 0 disables profiling.
+        """
+        self.enabled = enabled
+        self.namespace = namespace
+        self.profile_every = profile_every
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+        self._profiles = {}
+
+    def timer(self, service, stage):
+        """
+        Return a context manager that records the duration of a stage of a service.
+
+        Args:
+        service (str): The service, e.g. 'categorizer'.
+        stage (str): The stage, e.g. 'tokenize' or 'forward'.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, (service, stage))
+
+    def observe(self, service, stage, seconds):
+        """
+        Record one call of a stage that took the given number of seconds.
+        """
+        if not self.enabled:
+            return
+        key = (service, stage)
+        with self._lock:
+            stage_stats = self._stages.get(key)
+            if stage_stats is None:
+                stage_stats = self._stages[key] = [0, 0.0, 0.0]
+            stage_stats[0] += 1
+            stage_stats[1] += seconds
+            if seconds > stage_stats[2]:
+                stage_stats[2] = seconds
+
+    def increment(self, service, event, value=1):
+        """
+        Add value to the counter of an event of a service.
+        """
+        if not self.enabled:
+            return
+        key = (service, event)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, service, name, value):
+        """
+        Set a gauge of a service to the given value.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(service, name)] = value
+
+    def snapshot(self):
+        """
+        Report everything recorded so far.
+
+        Returns:
+        dict: 'stages' maps (service, stage) to its calls, total, mean and max seconds; 'counters'
+        and 'gauges' map (service, name) to their values.
+        """
+        with self._lock:
+            stages = {key: list(stage_stats) for key, stage_stats in self._stages.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        return {
+            'stages': {
+                key: {'calls': calls, 'seconds': seconds, 'mean_seconds': seconds / calls if calls else 0.0, 'max_seconds': max_seconds}
+                for key, (calls, seconds, max_seconds) in stages.items()
+            },
+            'counters': counters,
+            'gauges': gauges,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self._profiles.clear()
+
+    def prometheus_text(self):
+        """
+        Render the recorded metrics in the Prometheus text exposition format.
+
+        Stages are exported as a summary <namespace>_stage_seconds and a gauge
+        <namespace>_stage_max_seconds, counters as <namespace>_events_total and gauges as
+        <namespace>_gauge, all labelled by service and stage, event or name.
+        """
+        snapshot = self.snapshot()
+        prefix = self.namespace
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each stage of a service.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for (service, stage), stage_stats in sorted(snapshot['stages'].items()):
+            labels = f'service="{_escape(service)}",stage="{_escape(stage)}"'
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {stage_stats['calls']}")
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {stage_stats['seconds']!r}")
+        lines += [
+            f"# HELP {prefix}_stage_max_seconds The longest call of each stage of a service.",
+            f"# TYPE {prefix}_stage_max_seconds gauge",
+        ]
+        for (service, stage), stage_stats in sorted(snapshot['stages'].items()):
+            lines.append(f'{prefix}_stage_max_seconds{{service="{_escape(service)}",stage="{_escape(stage)}"}} {stage_stats["max_seconds"]!r}')
+        lines += [
+            f"# HELP {prefix}_events_total Events counted by a service.",
+            f"# TYPE {prefix}_events_total counter",
+        ]
+        for (service, event), value in sorted(snapshot['counters'].items()):
+            lines.append(f'{prefix}_events_total{{service="{_escape(service)}",event="{_escape(event)}"}} {value!r}')
+        lines += [
+            f"# HELP {prefix}_gauge Values last reported by a service.",
+            f"# TYPE {prefix}_gauge gauge",
+        ]
+        for (service, name), value in sorted(snapshot['gauges'].items()):
+            lines.append(f'{prefix}_gauge{{service="{_escape(service)}",name="{_escape(name)}"}} {float(value)!r}')
+        return '\n'.join(lines) + '\n'
+
+    def start_exporter(self, port, host='0.0.0.0', probe=None):
+        """
+        Serve prometheus_text at /metrics from a daemon thread.
+
+        Args:
+        port (int): The port to listen on. 0 picks a free port.
+        host (str): The interface to listen on.
+        probe (ReadinessProbe, optional): Also serve its status at /ready, with HTTP 503 until it is ready.
+
+        Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+        """
+        instrumentation = self
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/metrics':
+                    status, content_type = 200, 'text/plain; version=0.0.4; charset=utf-8'
+                    body = instrumentation.prometheus_text().encode('utf-8')
+                elif path == '/ready' and probe is not None:
+                    probe_status = probe.status()
+                    status, content_type = (200 if probe_status['ready'] else 503), 'application/json'
+                    body = json.dumps(probe_status).encode('utf-8')
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True).start()
+        return server
+
+    def _start_profile(self, key):
+        """
+        Start a profiler for every profile_every-th call of the stage, unless another call is already profiled.
+        """
+        if not self.profile_every:
+            return None
+        with self._lock:
+            calls = self._stages[key][0] if key in self._stages else 0
+        if calls % self.profile_every or not self._profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profile(self, key, profiler):
+        profiler.disable()
+        self._profile_lock.release()
+        with self._lock:
+            if key in self._profiles:
+                self._profiles[key].add(profiler)
+            else:
+                self._profiles[key] = pstats.Stats(profiler)
+
+    def dump_profiles(self, directory):
+        """
+        Write the accumulated profile of every sampled stage to <service>.<stage>.pstats.
+
+        Returns:
+        list of str: The written paths.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        with self._lock:
+            profiles = dict(self._profiles)
+        for (service, stage), stats in profiles.items():
+            path = os.path.join(directory, f"{service}.{stage}.pstats")
+            stats.dump_stats(path)
+            paths.append(path)
+        return paths
+
+
+instrumentation = Instrumentation(
+    enabled=Config.INSTRUMENTATION_ENABLED,
+    namespace=Config.INSTRUMENTATION_NAMESPACE,
+    profile_every=Config.INSTRUMENTATION_PROFILE_EVERY
+)
@@ -0,0 +1,110 @@
+import collections
+import sys
+import threading
+import time
+
+_MISSING = object()
+
+
+def approximate_size(value):
+    """
+    Estimate the memory held by a value in bytes: sys.getsizeof of the value and, for tuples,
+    lists and dicts, of their items; at least the data buffer for arrays with nbytes.
+    """
+    if hasattr(value, 'nbytes'):
+        return max(sys.getsizeof(value), value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(approximate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approximate_size(key) + approximate_size(item) for key, item in value.items())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=None, max_bytes=None, sizeof=None):
+        """
+        Initialize a thread-safe least-recently-used cache with an optional time to live and memory budget.
+
+        Args:
+        maxsize (int): The maximum number of entries. The least recently used entry is evicted first.
+        ttl (float, optional): The number of seconds after which an entry expires. None keeps entries until evicted.
+        max_bytes (int, optional): The maximum total size of the entries, as measured by sizeof.
+            None limits the number of entries only.
+        sizeof (callable, optional): Returns the size in bytes of a (key, value) entry. Defaults to
+            approximate_size of the key plus the value.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda key, value: approximate_size(key) + approximate_size(value))
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for the key and mark it as recently used, or default on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                self.bytes -= entry[2]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """
+        Store the value for the key, evicting the least recently used entries when the cache is full.
+        A value larger than max_bytes on its own is not stored.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        size = self.sizeof(key, value) if self.max_bytes is not None else 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted[2]
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            return entry is not _MISSING and (self.ttl is None or entry[1] >= time.monotonic())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """
+        Report the number of entries, their size in bytes (0 without max_bytes), hits, misses and
+        evictions and the hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
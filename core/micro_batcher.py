@@ -0,0 +1,182 @@
+import asyncio
+import collections
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BatcherOverloadedError(Exception):
+    """
+    Raised when a request is rejected because the batcher queue is full.
+    """
+
+
+class _Request:
+    __slots__ = ('items', 'future', 'submitted_at')
+
+    def __init__(self, items, future):
+        self.items = items
+        self.future = future
+        self.submitted_at = time.perf_counter()
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size=64, max_wait_ms=5.0, max_queue_size=1024, reject_when_full=False, name='batcher'):
+        """
+        Coalesce concurrent requests into batches that are processed by batch_fn in a dedicated thread.
+
+        A batch is closed when it holds max_batch_size items or max_wait_ms after its first request
+        was submitted, whichever comes first. Requests arriving while a batch runs in the inference
+        thread queue up and form the next batch.
+
+        Args:
+        batch_fn (callable): Takes a list of items and returns a list of results in the same order.
+        max_batch_size (int): The maximum number of items per batch. A larger request is processed alone.
+        max_wait_ms (float): The maximum time to wait for more requests after the first one of a batch.
+        max_queue_size (int): The maximum number of requests waiting for a batch.
+        reject_when_full (bool): Whether to raise BatcherOverloadedError instead of waiting when the queue is full.
+        name (str): The name used in the statistics.
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.reject_when_full = reject_when_full
+        self.name = name
+        self._queue = None
+        self._not_empty = None
+        self._worker = None
+        self._executor = None
+        self._carry = None
+        self._latencies = collections.deque(maxlen=10000)
+        self._batch_sizes = collections.Counter()
+        self._rejected = 0
+
+    async def start(self):
+        """
+        Start collecting batches on the running event loop.
+        """
+        if self._worker is None:
+            self._queue = asyncio.Queue(self.max_queue_size)
+            self._not_empty = asyncio.Event()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.name}-inference")
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the batcher after the queued requests have been processed.
+        """
+        if self._worker is not None:
+            await self._queue.join()
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._executor.shutdown(wait=True)
+            self._worker = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def submit(self, items):
+        """
+        Submit the items of one request and wait for their results.
+
+        Args:
+        items (list): The items of the request.
+
+        Returns:
+        list: The results of batch_fn for the items, in the same order.
+        """
+        await self.start()
+        request = _Request(list(items), asyncio.get_running_loop().create_future())
+        if self.reject_when_full and self._queue.full():
+            self._rejected += 1
+            raise BatcherOverloadedError(f"The {self.name} queue is full ({self.max_queue_size} requests).")
+        await self._queue.put(request)
+        self._not_empty.set()
+        return await request.future
+
+    async def _collect(self):
+        """
+        Wait for the first request and then for more until the batch is full or the wait time is over.
+        A request that would overflow the batch is carried over to the next one.
+        """
+        if self._carry is not None:
+            batch, self._carry = [self._carry], None
+        else:
+            while self._queue.empty():
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            batch = [self._queue.get_nowait()]
+        size = len(batch[0].items)
+        deadline = batch[0].submitted_at + self.max_wait
+        while size < self.max_batch_size:
+            if self._queue.empty():
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._not_empty.clear()
+                try:
+                    await asyncio.wait_for(self._not_empty.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                continue
+            request = self._queue.get_nowait()
+            if size + len(request.items) > self.max_batch_size:
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request.items)
+        return batch, size
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch, size = await self._collect()
+            items = [item for request in batch for item in request.items]
+            try:
+                results = await loop.run_in_executor(self._executor, self.batch_fn, items)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            else:
+                offset = 0
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_result(results[offset:offset + len(request.items)])
+                    offset += len(request.items)
+            finally:
+                now = time.perf_counter()
+                self._batch_sizes[size] += 1
+                for request in batch:
+                    self._latencies.append(now - request.submitted_at)
+                    self._queue.task_done()
+
+    def stats(self):
+        """
+        Report the request latency percentiles, the batch size histogram and the current queue depth.
+
+        Returns:
+        dict: p50/p99 latency in seconds over the last 10000 requests, the number of batches per
+        batch size, the queue depth and the number of rejected requests.
+        """
+        latencies = sorted(self._latencies)
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+
+        return {
+            'name': self.name,
+            'requests': len(latencies),
+            'latency_p50_seconds': percentile(0.50),
+            'latency_p99_seconds': percentile(0.99),
+            'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'rejected': self._rejected,
+        }
@@ -0,0 +1,151 @@
+import gc
+import logging
+import os
+import threading
+import time
+
+from core.config import Config
+from core.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+def _resident_memory_bytes():
+    """
+    Return the resident set size of the current process in bytes, or None if it cannot be determined.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelRegistry:
+    def __init__(self):
+        """
+        Initialize an empty registry of shared models and tokenizers.
+        """
+        self._entries = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @staticmethod
+    def _key(model_name, options):
+        return (model_name, tuple(sorted(options.items())))
+
+    def _load(self, model_name, auth_token, backend, head, options):
+        """
+        Load the tokenizer and model from the pretrained checkpoint, freeze the model for inference
+        and wrap it into the requested inference backend.
+
+        Args:
+        model_name (str): The name or path of the pretrained checkpoint.
+        auth_token (str, optional): The authorization token used to download the checkpoint.
+        backend (str): The inference backend, one of 'torch', 'torch_int8' or 'onnx'.
+        head (str): 'classification' for a sequence classification model, 'embedding' for the bare encoder.
+        options (dict): Extra keyword arguments passed to from_pretrained.
+
+        Returns:
+        tuple: The tokenizer, the backend and the fp32 parameter size in bytes.
+        """
+        # transformers and torch are imported on the first load, so that importing a service stays cheap.
+        from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+        from core.inference_backends import create_backend
+
+        model_class = AutoModel if head == 'embedding' else AutoModelForSequenceClassification
+        tokenizer = AutoTokenizer.from_pretrained(model_name, token=auth_token)
+        model = model_class.from_pretrained(model_name, token=auth_token, **options)
+        model.eval()
+        model.requires_grad_(False)
+        parameter_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+        return tokenizer, create_backend(backend, model, tokenizer, model_name), parameter_bytes
+
+    def get(self, model_name, auth_token=None, backend=None, head='classification', **options):
+        """
+        Return the shared tokenizer and model for the given name and options, loading them on first use.
+
+        The returned model is an inference backend callable like the underlying model. It must be
+        treated as read-only.
+
+        Args:
+        model_name (str): The name or path of the pretrained checkpoint.
+        auth_token (str, optional): The authorization token used to download the checkpoint. Not part of the cache key.
+        backend (str, optional): The inference backend. Defaults to Config.INFERENCE_BACKEND.
+        head (str): 'classification' for a sequence classification model (output has `logits`),
+            'embedding' for the bare encoder (output has `last_hidden_state`).
+        **options: Extra keyword arguments passed to from_pretrained. Part of the cache key.
+
+        Returns:
+        tuple: The tokenizer and the model.
+        """
+        backend = backend or Config.INFERENCE_BACKEND
+        key = self._key(model_name, dict(options, backend=backend, head=head))
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                rss_before = _resident_memory_bytes()
+                start = time.perf_counter()
+                tokenizer, model, parameter_bytes = self._load(model_name, auth_token, backend, head, options)
+                load_time = time.perf_counter() - start
+                instrumentation.observe('model_registry', 'load', load_time)
+                rss_after = _resident_memory_bytes()
+                self._stats[key] = {
+                    'model_name': model_name,
+                    'backend': backend,
+                    'head': head,
+                    'options': dict(options),
+                    'load_time_seconds': load_time,
+                    'resident_memory_bytes': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+                    'parameter_bytes': parameter_bytes,
+                }
+                entry = self._entries[key] = (tokenizer, model)
+                logger.info("Loaded model '%s' with the '%s' backend in %.2fs.", model_name, backend, load_time)
+        return entry
+
+    def preload(self, model_names, auth_token=None, backend=None, freeze=True, **options):
+        """
+        Load the given models eagerly, e.g. in a master process before forking workers so that
+        the weights are shared copy-on-write.
+
+        Args:
+        model_names (list of str): The names or paths of the pretrained checkpoints.
+        auth_token (str, optional): The authorization token used to download the checkpoints.
+        backend (str, optional): The inference backend. Defaults to Config.INFERENCE_BACKEND.
+        freeze (bool): Whether to move all objects allocated so far into the permanent GC generation,
+            so that garbage collection in the workers does not touch (and copy) the shared pages.
+        **options: Extra keyword arguments passed to from_pretrained.
+        """
+        for model_name in model_names:
+            self.get(model_name, auth_token=auth_token, backend=backend, **options)
+        if freeze:
+            gc.freeze()
+
+    def stats(self):
+        """
+        Report the load time and memory footprint of every loaded model.
+
+        Returns:
+        list of dict: One entry per loaded model with its name, backend, options, load time,
+        resident memory growth during loading and fp32 parameter size in bytes.
+        """
+        return [dict(stat) for stat in self._stats.values()]
+
+    def clear(self):
+        """
+        Drop all shared models and tokenizers so they can be garbage collected.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+            self._key_locks.clear()
+
+
+model_registry = ModelRegistry()
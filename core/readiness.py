@@ -0,0 +1,75 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessProbe:
+    def __init__(self):
+        """
+        Initialize an empty probe. Services are registered with register and warmed up with warmup;
+        the process is ready once at least one service is registered and every registered service
+        warmed up successfully.
+        """
+        self._services = {}
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, service, **warmup_arguments):
+        """
+        Register a service whose warmup() must succeed before the process is ready.
+
+        Args:
+        name (str): The name reported by status.
+        service (object): An object with a warmup() method and optionally an is_ready() method.
+        **warmup_arguments: Keyword arguments passed to warmup.
+        """
+        with self._lock:
+            self._services[name] = (service, warmup_arguments)
+            self._status[name] = {'warmed_up': False, 'warmup_seconds': None, 'error': None}
+
+    def warmup(self):
+        """
+        Warm up every registered service that has not warmed up yet, one after the other.
+
+        Returns:
+        dict: The status, see status.
+        """
+        for name, (service, warmup_arguments) in list(self._services.items()):
+            if self._status[name]['warmed_up']:
+                continue
+            start = time.perf_counter()
+            try:
+                service.warmup(**warmup_arguments)
+            except Exception as e:
+                logger.error("Warm-up of %s failed: %s", name, e)
+                self._status[name].update(error=f"{type(e).__name__}: {e}")
+                continue
+            self._status[name].update(warmed_up=True, warmup_seconds=time.perf_counter() - start, error=None)
+            logger.info("Warmed up %s in %.2fs.", name, self._status[name]['warmup_seconds'])
+        return self.status()
+
+    def status(self):
+        """
+        Report whether every registered service is warmed up and still has its models loaded. A probe
+        without registered services is not ready.
+
+        Returns:
+        dict: 'ready' and, per service, 'ready', 'warmed_up', 'warmup_seconds' and 'error'.
+        """
+        services = {}
+        for name, (service, _) in list(self._services.items()):
+            status = dict(self._status[name])
+            is_ready = getattr(service, 'is_ready', None)
+            status['ready'] = status['warmed_up'] and (is_ready is None or bool(is_ready()))
+            services[name] = status
+        ready = bool(services) and all(status['ready'] for status in services.values())
+        return {'ready': ready, 'services': services}
+
+    @property
+    def ready(self):
+        return self.status()['ready']
+
+
+readiness = ReadinessProbe()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from core.instrumentation import instrumentation
+from core.model_registry import model_registry
+
+
+class TextEncoder:
+    def __init__(self, model_name, batch_size=64, max_length=128, auth_token=None):
+        """
+        Initialize the TextEncoder that turns texts into L2-normalized sentence embeddings.
+
+        Args:
+        model_name (str): The name or path of the pretrained encoder checkpoint.
+        batch_size (int): The number of texts per forward pass.
+        max_length (int): The maximum number of tokens per text.
+        auth_token (str, optional): The authorization token used to download the checkpoint.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.auth_token = auth_token
+        self.tokenizer = None
+        self.model = None
+
+    def load_model_and_tokenizer(self):
+        """
+        Load the shared encoder and its tokenizer from the model registry.
+        """
+        self.tokenizer, self.model = model_registry.get(self.model_name, auth_token=self.auth_token, head='embedding')
+
+    def is_ready(self):
+        return self.model is not None
+
+    def warmup(self):
+        """
+        Load the encoder and encode a single text and a full batch of dummy texts, so that the
+        first request does not pay for lazy initialization and allocator growth.
+        """
+        self.encode(["warmup"])
+        self.encode(["warmup text " * 8] * self.batch_size)
+
+    def encode(self, texts):
+        """
+        Encode texts as mean-pooled, L2-normalized embeddings, so that a dot product is the cosine similarity.
+
+        Args:
+        texts (list of str): The texts to encode.
+
+        Returns:
+        ndarray: A float32 matrix with one row per text.
+        """
+        import torch
+
+        if not self.tokenizer or not self.model:
+            self.load_model_and_tokenizer()
+
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.model.config.hidden_size), dtype=np.float32)
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = np.empty((len(texts), self.model.config.hidden_size), dtype=np.float32)
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch_indices = order[start:start + self.batch_size]
+                with instrumentation.timer('text_encoder', 'tokenize'):
+                    inputs = self.tokenizer(
+                        [texts[i] for i in batch_indices],
+                        return_tensors='pt',
+                        truncation=True,
+                        padding=True,
+                        max_length=self.max_length
+                    )
+                with instrumentation.timer('text_encoder', 'forward'):
+                    hidden_states = self.model(**inputs).last_hidden_state
+                with instrumentation.timer('text_encoder', 'pool'):
+                    mask = inputs['attention_mask'].unsqueeze(-1).to(hidden_states.dtype)
+                    pooled = (hidden_states * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+                    embeddings[batch_indices] = torch.nn.functional.normalize(pooled, dim=1).numpy()
+        return embeddings
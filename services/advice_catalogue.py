@@ -0,0 +1,61 @@
+import numpy as np
+from scipy import sparse
+
+
+def catalogue_signature(advice_objects):
+    """
+    Identify an advice set by the advice names and their categories, ignoring the interaction counts.
+    """
+    return hash(tuple((advice_name, tuple(advice.categories)) for advice_name, advice in advice_objects.items()))
+
+
+class AdviceCatalogue:
+    def __init__(self, advice_objects):
+        """
+        Compile the advice set into a sparse advice x category matrix.
+
+        Every advice row holds a 1 for each of its categories, in the order of advice.categories,
+        so a matrix-vector product sums per-category values exactly like a loop over the categories.
+
+        Args:
+        advice_objects (dict): A dictionary of advice objects.
+        """
+        self.signature = catalogue_signature(advice_objects)
+        self.advice_names = list(advice_objects)
+        self.category_index = {}
+        indices, indptr = [], [0]
+        for advice in advice_objects.values():
+            for category in advice.categories:
+                indices.append(self.category_index.setdefault(category, len(self.category_index)))
+            indptr.append(len(indices))
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(indices)), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(self.advice_names), len(self.category_index))
+        )
+
+    def category_vector(self, values):
+        """
+        Build a dense category vector from a mapping of category to value, or an iterable of categories (value 1).
+        """
+        vector = np.zeros(len(self.category_index))
+        items = values.items() if isinstance(values, dict) else ((category, 1) for category in values)
+        for category, value in items:
+            index = self.category_index.get(category)
+            if index is not None:
+                vector[index] = value
+        return vector
+
+    @staticmethod
+    def interaction_counts(advice_objects):
+        """
+        Read the live interaction counters of every advice.
+
+        Returns:
+        ndarray: The (advice, 3) array of agreed, completed and showed counts.
+        """
+        counts = np.fromiter(
+            (count for advice in advice_objects.values() for count in (advice.agreed_count, advice.completed_count, advice.showed_count)),
+            dtype=np.float64,
+            count=3 * len(advice_objects)
+        )
+        return counts.reshape(-1, 3)
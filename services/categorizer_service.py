@@ -1,7 +1,11 @@
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
+import numpy as np
 
 from core.config import Config
+from core.inference_cache import inference_cache
+from core.instrumentation import instrumentation
+from core.model_registry import model_registry
 from core.private_config import PrivateConfig
+from core.text_encoder import TextEncoder
 
 class CategorizerService:
     def __init__(self):
@@ -11,16 +15,149 @@ class CategorizerService:
         self.model_name = Config.CATEGORIZER_MODEL_NAME
         self.auth_token = PrivateConfig.CATEGORIZER_AUTH_TOKEN
         self.threshold_classification = Config.CATEGORIZER_TRESHOLD_CLASSIFICATION
+        self.hypothesis_template = Config.CATEGORIZER_HYPOTHESIS_TEMPLATE
+        self.batch_size = Config.CATEGORIZER_BATCH_SIZE
+        self.prefilter_top_k = Config.CATEGORIZER_PREFILTER_TOP_K if Config.CATEGORIZER_PREFILTER_ENABLED else 0
+        self.prefilter_encoder = TextEncoder(Config.CATEGORIZER_PREFILTER_MODEL_NAME, auth_token=self.auth_token)
+        self.hypothesis_embeddings = {}
         self.tokenizer = None
         self.model = None
 
     def load_model_and_tokenizer(self):
         """
         Load the tokenizer and model based on the initialized model name and authorization token.
+        The model is shared process-wide through the model registry.
         """
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_auth_token=self.auth_token)
-        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name, use_auth_token=self.auth_token)
-        
+        self.tokenizer, self.model = model_registry.get(self.model_name, auth_token=self.auth_token)
+
+    def is_ready(self):
+        """
+        Check whether the models needed by categorize are loaded.
+        """
+        return self.model is not None and (not self.prefilter_top_k or self.prefilter_encoder.is_ready())
+
+    def warmup(self, categories=None):
+        """
+        Load the models and score dummy batches of one pair and of a full batch, so that the first
+        request does not pay for model loading, lazy initialization and allocator growth.
+
+        Args:
+        categories (list of str, optional): The categories that will be used, to warm up with
+            hypotheses of realistic length.
+        """
+        hypotheses = [self.hypothesis_template.format(category=category) for category in categories or ["Пример"]]
+        # _forward bypasses the inference cache, so the model is run even if the pairs were scored before.
+        self._forward([("warmup", hypotheses[0])])
+        self._forward([("warmup text " * 8, hypotheses[i % len(hypotheses)]) for i in range(self.batch_size)])
+        if self.prefilter_top_k:
+            self.prefilter_encoder.warmup()
+            if categories:
+                self._embed_hypotheses(hypotheses)
+
+    def score_pairs(self, pairs, batch_size=None, forward=None):
+        """
+        Compute entailment probabilities for (text, hypothesis) pairs.
+
+        The logits of pairs scored before are taken from the shared inference cache; the others
+        are computed by forward.
+
+        Args:
+        pairs (list of tuple): A list of (text, hypothesis) pairs.
+        batch_size (int, optional): The number of pairs per forward pass. Defaults to the configured batch size.
+        forward (callable, optional): Takes a list of pairs and returns their logits. Defaults to _forward.
+
+        Returns:
+        list of float: The probability that each text entails its hypothesis.
+        """
+        import torch
+
+        if not self.tokenizer or not self.model:
+            self.load_model_and_tokenizer()
+
+        cache_key = (self.model_name, Config.INFERENCE_BACKEND, self.tokenizer.model_max_length)
+        logits = inference_cache.get_logits(cache_key, pairs, forward or (lambda missing: self._forward(missing, batch_size)))
+        instrumentation.increment('categorizer', 'pairs_scored', len(pairs))
+        if not logits:
+            return []
+        with instrumentation.timer('categorizer', 'softmax'):
+            entail_contradiction_logits = torch.tensor(logits)[:, [0, 2]]
+            probs = entail_contradiction_logits.softmax(dim=1)
+            return probs[:, 1].tolist()
+
+    def _forward(self, pairs, batch_size=None):
+        """
+        Compute the NLI logits of (text, hypothesis) pairs in padded batches.
+
+        Pairs are sorted by length before batching so that each batch is padded only up to its
+        longest member; the logits are returned in the original order.
+
+        Args:
+        pairs (list of tuple): A list of (text, hypothesis) pairs.
+        batch_size (int, optional): The number of pairs per forward pass. Defaults to the configured batch size.
+
+        Returns:
+        list of list of float: The logits of every pair.
+        """
+        import torch
+
+        if not self.tokenizer or not self.model:
+            self.load_model_and_tokenizer()
+
+        batch_size = batch_size or self.batch_size
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        logits = [None] * len(pairs)
+        with torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                batch_indices = order[start:start + batch_size]
+                with instrumentation.timer('categorizer', 'tokenize'):
+                    inputs = inference_cache.encode_pairs(self.tokenizer, [pairs[i] for i in batch_indices])
+                with instrumentation.timer('categorizer', 'forward'):
+                    batch_logits = self.model(**inputs).logits.tolist()
+                for i, pair_logits in zip(batch_indices, batch_logits):
+                    logits[i] = pair_logits
+        instrumentation.increment('categorizer', 'pairs_computed', len(pairs))
+        return logits
+
+    def _embed_hypotheses(self, hypotheses):
+        """
+        Return the prefilter embeddings of the hypotheses, encoding only those not seen before.
+
+        Args:
+        hypotheses (list of str): The category hypotheses.
+
+        Returns:
+        ndarray: A float32 matrix with one row per hypothesis.
+        """
+        missing = [hypothesis for hypothesis in dict.fromkeys(hypotheses) if hypothesis not in self.hypothesis_embeddings]
+        if missing:
+            self.hypothesis_embeddings.update(zip(missing, self.prefilter_encoder.encode(missing)))
+        return np.stack([self.hypothesis_embeddings[hypothesis] for hypothesis in hypotheses])
+
+    def _prefilter(self, texts, hypotheses, top_k):
+        """
+        Select the top-k candidate hypotheses for every text by cosine similarity of their embeddings.
+
+        Args:
+        texts (list of str): The texts to be categorized.
+        hypotheses (list of str): The category hypotheses.
+        top_k (int): The number of candidates per text.
+
+        Returns:
+        list of ndarray: For each text, the sorted indices of its candidate hypotheses.
+        """
+        similarities = self.prefilter_encoder.encode(texts) @ self._embed_hypotheses(hypotheses).T
+        with instrumentation.timer('categorizer', 'prefilter'):
+            candidates = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+        return [np.sort(row) for row in candidates]
+
+    def _candidates(self, texts, hypotheses, top_k):
+        """
+        Return the hypothesis indices to check with the NLI model for every text.
+        """
+        if top_k and top_k < len(hypotheses):
+            return self._prefilter(texts, hypotheses, top_k)
+        return [range(len(hypotheses))] * len(texts)
+
     def categorize(self, text, categories):
         """
         Categorize the given text into the provided categories.
@@ -32,18 +169,70 @@ class CategorizerService:
         Returns:
         list of str: List of categories that are applicable to the text based on the classification threshold.
         """
-        if not self.tokenizer or not self.model:
-            self.load_model_and_tokenizer()
+        return self.categorize_many([text], categories)[0]
+
+    def categorize_many(self, texts, categories, batch_size=None, top_k=None, forward=None):
+        """
+        Categorize several texts into the provided categories, scoring all (text, category) pairs together.
+
+        Args:
+        texts (list of str): The texts to be categorized.
+        categories (list of str): A list of category names to which the texts could belong.
+        batch_size (int, optional): The number of pairs per forward pass. Defaults to the configured batch size.
+        top_k (int, optional): The number of candidate categories per text selected by the embedding prefilter
+            before the NLI check. 0 checks every category. Defaults to the configured prefilter setting.
+        forward (callable, optional): Computes the logits of the pairs not in the inference cache, see score_pairs.
+
+        Returns:
+        list of list of str: For each text, the categories that are applicable to it based on the classification threshold.
+        """
+        texts = list(texts)
+        categories = list(categories)
+        hypotheses = [self.hypothesis_template.format(category=category) for category in categories]
+        candidates = self._candidates(texts, hypotheses, self.prefilter_top_k if top_k is None else top_k)
+        pairs = [(text, hypotheses[index]) for text, text_candidates in zip(texts, candidates) for index in text_candidates]
+        probabilities = iter(self.score_pairs(pairs, batch_size, forward))
 
         results = []
-        for category in categories:
-            hypothesis = f"Это пример {category}."
-            inputs = self.tokenizer.encode(text, hypothesis, return_tensors='pt', truncation=True)
-            outputs = self.model(inputs)
-            logits = outputs.logits
-            entail_contradiction_logits = logits[:, [0, 2]]
-            probs = entail_contradiction_logits.softmax(dim=1)
-            prob_label_is_true = probs[:, 1].item()
-            if prob_label_is_true > self.threshold_classification:
-                results.append(category)
+        with instrumentation.timer('categorizer', 'threshold'):
+            for text_candidates in candidates:
+                results.append([
+                    categories[index] for index, prob_label_is_true in zip(text_candidates, probabilities)
+                    if prob_label_is_true > self.threshold_classification
+                ])
+        instrumentation.increment('categorizer', 'texts', len(texts))
         return results
+
+    def prefilter_recall(self, texts, categories, top_k=None, batch_size=None):
+        """
+        Measure how many of the categories found by the full scan survive the embedding prefilter.
+
+        Args:
+        texts (list of str): The texts to be categorized.
+        categories (list of str): A list of category names to which the texts could belong.
+        top_k (int, optional): The number of candidate categories per text. Defaults to the configured value.
+        batch_size (int, optional): The number of pairs per forward pass. Defaults to the configured batch size.
+
+        Returns:
+        dict: The recall@k of the prefilter against the full scan, the number of positive categories
+        found by the full scan and the number of NLI pairs scored with and without the prefilter.
+        """
+        texts = list(texts)
+        categories = list(categories)
+        top_k = top_k or Config.CATEGORIZER_PREFILTER_TOP_K
+        hypotheses = [self.hypothesis_template.format(category=category) for category in categories]
+        full_results = self.categorize_many(texts, categories, batch_size, top_k=0)
+        candidates = self._candidates(texts, hypotheses, top_k)
+
+        positives = sum(len(applicable) for applicable in full_results)
+        retrieved = sum(
+            len(set(applicable) & {categories[index] for index in text_candidates})
+            for applicable, text_candidates in zip(full_results, candidates)
+        )
+        return {
+            'top_k': top_k,
+            'recall': retrieved / positives if positives else 1.0,
+            'positives': positives,
+            'pairs_full': len(texts) * len(categories),
+            'pairs_prefiltered': sum(len(text_candidates) for text_candidates in candidates),
+        }
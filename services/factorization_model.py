@@ -0,0 +1,131 @@
+import json
+import os
+
+import numpy as np
+
+FACTOR_FILES = ('user_factors', 'item_factors', 'user_biases', 'item_biases')
+
+
+def save_factorization_model(path, user_ids, advice_names, user_factors, item_factors, user_biases, item_biases, global_mean, rating_scale):
+    """
+    Persist the factor matrices as .npy files that can be memory-mapped, plus the id mappings.
+
+    Args:
+    path (str): The model directory.
+    user_ids (list): The user ids, in the row order of user_factors.
+    advice_names (list of str): The advice names, in the row order of item_factors.
+    user_factors (ndarray): The (users, factors) user factor matrix.
+    item_factors (ndarray): The (advice, factors) item factor matrix.
+    user_biases (ndarray): The user biases.
+    item_biases (ndarray): The item biases.
+    global_mean (float): The mean rating.
+    rating_scale (tuple): The (min, max) rating.
+    """
+    os.makedirs(path, exist_ok=True)
+    arrays = dict(zip(FACTOR_FILES, (user_factors, item_factors, user_biases, item_biases)))
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array, dtype=np.float32))
+    with open(os.path.join(path, 'metadata.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'user_ids': list(user_ids),
+            'advice_names': list(advice_names),
+            'global_mean': float(global_mean),
+            'rating_scale': list(rating_scale),
+            'factors': int(item_factors.shape[1]),
+        }, f, ensure_ascii=False)
+
+
+class FactorizationModel:
+    def __init__(self, path):
+        """
+        Load a factorization model saved by save_factorization_model, memory-mapping the factor matrices.
+
+        Args:
+        path (str): The model directory.
+        """
+        self.path = path
+        with open(os.path.join(path, 'metadata.json'), encoding='utf-8') as f:
+            metadata = json.load(f)
+        self.global_mean = metadata['global_mean']
+        self.rating_scale = tuple(metadata['rating_scale'])
+        self.advice_names = metadata['advice_names']
+        self.user_index = {user_id: index for index, user_id in enumerate(metadata['user_ids'])}
+        self.advice_index = {advice_name: index for index, advice_name in enumerate(self.advice_names)}
+        self.user_factors, self.item_factors, self.user_biases, self.item_biases = (
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in FACTOR_FILES
+        )
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, 'metadata.json'))
+
+    def __contains__(self, user_id):
+        return user_id in self.user_index
+
+    def user_vector(self, user_id):
+        """
+        Returns:
+        tuple: The factor vector and the bias of the user.
+        """
+        index = self.user_index[user_id]
+        return self.user_factors[index], self.user_biases[index]
+
+    def fold_in(self, item_rows, ratings, prior_vector=None, prior_bias=0.0, regularization=0.5, steps=3):
+        """
+        Fit a user's vector and bias to observed ratings with a few alternating least squares steps
+        against the fixed item factors, shrunk towards the prior.
+
+        The cost is O(len(item_rows) * factors^2 + factors^3) per step and does not depend on the
+        number of users or advice.
+
+        Args:
+        item_rows (ndarray): The item rows of the observed ratings.
+        ratings (ndarray): The observed ratings.
+        prior_vector (ndarray, optional): The trained vector of the user. Defaults to zeros for new users.
+        prior_bias (float): The trained bias of the user.
+        regularization (float): The weight of the shrinkage towards the prior.
+        steps (int): The number of alternating steps.
+
+        Returns:
+        tuple: The user's factor vector and bias.
+        """
+        item_factors = np.asarray(self.item_factors[item_rows], dtype=np.float64)
+        residuals = np.asarray(ratings, dtype=np.float64) - self.global_mean - self.item_biases[item_rows]
+        factors = item_factors.shape[1]
+        prior_vector = np.zeros(factors) if prior_vector is None else np.asarray(prior_vector, dtype=np.float64)
+        normal_matrix = item_factors.T @ item_factors + regularization * np.eye(factors)
+        vector, bias = prior_vector, float(prior_bias)
+        for _ in range(steps):
+            vector = np.linalg.solve(normal_matrix, item_factors.T @ (residuals - bias) + regularization * prior_vector)
+            bias = float((np.sum(residuals - item_factors @ vector) + regularization * prior_bias) / (len(residuals) + regularization))
+        return vector, bias
+
+    def candidate_indices(self, advice_names):
+        """
+        Map advice names to item rows, skipping advice the model was not trained on.
+        """
+        return np.fromiter((self.advice_index[name] for name in advice_names if name in self.advice_index), dtype=np.int64)
+
+    def top_k(self, user_vector, user_bias, k, candidates=None):
+        """
+        Return the k advice with the highest predicted rating for a user.
+
+        Args:
+        user_vector (ndarray): The factor vector of the user.
+        user_bias (float): The bias of the user.
+        k (int): The number of advice to return.
+        candidates (ndarray, optional): The item rows to rank. Defaults to all advice.
+
+        Returns:
+        list of str: The advice names, best first.
+        """
+        item_factors = self.item_factors if candidates is None else self.item_factors[candidates]
+        item_biases = self.item_biases if candidates is None else self.item_biases[candidates]
+        scores = self.global_mean + user_bias + item_biases + item_factors @ user_vector
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        rows = best if candidates is None else candidates[best]
+        return [self.advice_names[row] for row in rows]
@@ -0,0 +1,125 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import Config
+from core.micro_batcher import MicroBatcher
+
+
+class InferenceServer:
+    def __init__(self, categorizer_service=None, task_search_service=None):
+        """
+        Initialize the InferenceServer that answers concurrent categorize/find_task requests through
+        the services' own pipelines and coalesces their model forward passes into padded batches,
+        run in a dedicated inference thread per model.
+
+        Every request runs its service pipeline (category prefilter, lexical stage, embedding index,
+        inference cache and thresholds) in a request thread, so it gets the same answer as calling
+        the service directly. Only the logits of the pairs that reach the model are computed by the
+        batcher, in chunks of at most INFERENCE_SERVER_MAX_BATCH_SIZE pairs.
+
+        Args:
+        categorizer_service (CategorizerService, optional): The service answering categorize requests.
+        task_search_service (TaskSearchService, optional): The service answering find_task requests.
+        """
+        self.categorizer_service = categorizer_service
+        self.task_search_service = task_search_service
+        self.batchers = {}
+        if categorizer_service is not None:
+            self.batchers['categorize'] = self._create_batcher(categorizer_service._forward, 'categorize')
+        if task_search_service is not None:
+            self.batchers['find_task'] = self._create_batcher(task_search_service._forward, 'find_task')
+        self._loop = None
+        self._executor = None
+
+    @staticmethod
+    def _create_batcher(batch_fn, name):
+        return MicroBatcher(
+            batch_fn,
+            max_batch_size=Config.INFERENCE_SERVER_MAX_BATCH_SIZE,
+            max_wait_ms=Config.INFERENCE_SERVER_MAX_WAIT_MS,
+            max_queue_size=Config.INFERENCE_SERVER_MAX_QUEUE_SIZE,
+            reject_when_full=Config.INFERENCE_SERVER_REJECT_WHEN_FULL,
+            name=name
+        )
+
+    async def start(self):
+        if self._executor is None:
+            self._loop = asyncio.get_running_loop()
+            self._executor = ThreadPoolExecutor(max_workers=Config.INFERENCE_SERVER_REQUEST_THREADS, thread_name_prefix='inference-request')
+        for batcher in self.batchers.values():
+            await batcher.start()
+
+    async def stop(self):
+        if self._executor is not None:
+            # The request threads wait for batches run by this loop, so they are joined off the loop.
+            await self._loop.run_in_executor(None, self._executor.shutdown)
+            self._executor = None
+        for batcher in self.batchers.values():
+            await batcher.stop()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def _forward(self, name):
+        """
+        Return a forward callable for the service pipelines that computes logits through the batcher.
+        It is called in a request thread and blocks it until the event loop has the results.
+        """
+        batcher = self.batchers[name]
+
+        async def submit(pairs):
+            size = batcher.max_batch_size
+            chunks = await asyncio.gather(*(batcher.submit(pairs[start:start + size]) for start in range(0, len(pairs), size)))
+            return [logits for chunk in chunks for logits in chunk]
+
+        return lambda pairs: asyncio.run_coroutine_threadsafe(submit(pairs), self._loop).result()
+
+    async def _run(self, function, *args, **kwargs):
+        await self.start()
+        return await self._loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    async def categorize(self, text, categories):
+        """
+        Categorize the given text into the provided categories, see CategorizerService.categorize,
+        batched with concurrent requests.
+
+        Args:
+        text (str): The text to be categorized.
+        categories (list of str): A list of category names to which the text could belong.
+
+        Returns:
+        list of str: List of categories that are applicable to the text based on the classification threshold.
+        """
+        results = await self._run(self.categorizer_service.categorize_many, [text], categories, forward=self._forward('categorize'))
+        return results[0]
+
+    async def find_task(self, user_input, all_tasks):
+        """
+        Find the task matching the user input through the search stages of TaskSearchService.search,
+        batched with concurrent requests.
+
+        Unlike TaskSearchService.find_task, errors are raised, e.g. BatcherOverloadedError when the
+        queue is full and requests are rejected.
+
+        Args:
+        user_input (str): The text input from the user describing the edits.
+        all_tasks (list): The list of all tasks, see TaskSearchService.find_task.
+
+        Returns:
+        str: The task_id that best matches the user input, or None if no task matches.
+        """
+        if not all_tasks:
+            return None
+        result = await self._run(self.task_search_service.search, user_input, all_tasks, forward=self._forward('find_task'))
+        return result['task_id']
+
+    def stats(self):
+        """
+        Report the latency percentiles, batch size histogram and queue depth of every batcher.
+        """
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+
+import aiohttp
+
+from core.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """
+    Raised when a completion request fails permanently or runs out of retries.
+    """
+
+
+def _parse_duration(value):
+    """
+    Parse a rate-limit reset duration such as '20ms', '1s' or '6m0s' (or plain seconds) into seconds.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|s|m|h)', value)
+    return sum(float(amount) * units[unit] for amount, unit in parts) if parts else None
+
+
+class AsyncLLMClient:
+    def __init__(self, api_base, api_key, max_concurrency=8, timeout=30.0, max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        """
+        Initialize the AsyncLLMClient for an OpenAI-compatible completions endpoint.
+
+        The client keeps one pooled HTTP session, caps the number of in-flight requests, retries
+        transient failures with full-jitter exponential backoff (honouring Retry-After) and pauses
+        all requests when the rate-limit headers report that the request budget is exhausted.
+
+        Args:
+        api_base (str): The base URL of the API, e.g. "https://api.openai.com/v1".
+        api_key (str): The API key sent as a bearer token.
+        max_concurrency (int): The maximum number of requests in flight.
+        timeout (float): The timeout of a single request attempt in seconds.
+        max_retries (int): The number of retries after the first attempt.
+        backoff_base (float): The base delay of the exponential backoff in seconds.
+        backoff_max (float): The maximum backoff delay in seconds.
+        """
+        self.api_base = api_base.rstrip('/')
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session = None
+        self._semaphore = None
+        self._paused_until = 0.0
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'Authorization': f"Bearer {self.api_key}"}
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _update_rate_limit(self, headers):
+        """
+        Pause new requests until the reset time when the remaining request budget is exhausted.
+        """
+        remaining = headers.get('x-ratelimit-remaining-requests')
+        if remaining is not None and remaining.strip() == '0':
+            reset = _parse_duration(headers.get('x-ratelimit-reset-requests')) or self.backoff_base
+            self._paused_until = max(self._paused_until, time.monotonic() + reset)
+
+    async def _wait_for_rate_limit(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def complete(self, prompt, model, max_tokens, **parameters):
+        """
+        Request a completion for the prompt.
+
+        Args:
+        prompt (str): The prompt.
+        model (str): The model (engine) name.
+        max_tokens (int): The maximum number of generated tokens.
+        **parameters: Extra request parameters.
+
+        Returns:
+        str: The text of the first choice.
+        """
+        payload = dict(parameters, model=model, prompt=prompt, max_tokens=max_tokens)
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._wait_for_rate_limit()
+                retry_after = None
+                try:
+                    async with self._session.post(f"{self.api_base}/completions", json=payload) as response:
+                        self._update_rate_limit(response.headers)
+                        if response.status < 400:
+                            data = await response.json()
+                            return data['choices'][0]['text']
+                        error = f"HTTP {response.status}: {await response.text()}"
+                        if response.status not in RETRYABLE_STATUSES:
+                            raise LLMError(error)
+                        retry_after = _parse_duration(response.headers.get('retry-after'))
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = f"{type(e).__name__}: {e}"
+                except (KeyError, IndexError, ValueError) as e:
+                    raise LLMError(f"Malformed completion response: {e}") from e
+
+                if attempt == self.max_retries:
+                    break
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                instrumentation.increment('llm_client', 'retries')
+                logger.warning("Completion request failed (%s), retrying in %.2fs.", error, delay)
+                await asyncio.sleep(delay)
+        raise LLMError(f"Completion request failed after {self.max_retries + 1} attempts: {error}")
+
+    async def stream(self, prompt, model, max_tokens, **parameters):
+        """
+        Request a streamed completion for the prompt and yield the text as it is generated.
+
+        Failures before the first piece of text are retried like in complete; once text has been
+        yielded the request is not retried. Closing the iterator early closes the connection,
+        which stops the generation.
+
+        Args:
+        prompt (str): The prompt.
+        model (str): The model (engine) name.
+        max_tokens (int): The maximum number of generated tokens.
+        **parameters: Extra request parameters.
+
+        Yields:
+        str: The next piece of text of the first choice.
+        """
+        payload = dict(parameters, model=model, prompt=prompt, max_tokens=max_tokens, stream=True)
+        started = False
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._wait_for_rate_limit()
+                retry_after = None
+                try:
+                    async with self._session.post(f"{self.api_base}/completions", json=payload) as response:
+                        self._update_rate_limit(response.headers)
+                        if response.status < 400:
+                            async for line in response.content:
+                                text = self._parse_event(line)
+                                if text is None:
+                                    return
+                                if text:
+                                    started = True
+                                    yield text
+                            return
+                        error = f"HTTP {response.status}: {await response.text()}"
+                        if response.status not in RETRYABLE_STATUSES:
+                            raise LLMError(error)
+                        retry_after = _parse_duration(response.headers.get('retry-after'))
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if started:
+                        raise LLMError(f"Completion stream interrupted: {type(e).__name__}: {e}") from e
+                    error = f"{type(e).__name__}: {e}"
+
+                if attempt == self.max_retries:
+                    break
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                instrumentation.increment('llm_client', 'retries')
+                logger.warning("Completion request failed (%s), retrying in %.2fs.", error, delay)
+                await asyncio.sleep(delay)
+        raise LLMError(f"Completion request failed after {self.max_retries + 1} attempts: {error}")
+
+    @staticmethod
+    def _parse_event(line):
+        """
+        Parse one line of the server-sent event stream.
+
+        Returns:
+        str: The text of the event, an empty string for lines without text, or None at the end of the stream.
+        """
+        line = line.strip()
+        if not line.startswith(b'data:'):
+            return ''
+        data = line[len(b'data:'):].strip()
+        if data == b'[DONE]':
+            return None
+        try:
+            return json.loads(data)['choices'][0].get('text') or ''
+        except (KeyError, IndexError, ValueError) as e:
+            raise LLMError(f"Malformed completion event: {e}") from e
@@ -1,8 +1,38 @@
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+import concurrent.futures
+import copy
+import logging
+import os
+
+import numpy as np
 
 from core.config import Config
+from core.instrumentation import instrumentation
+from services.mood_history import history_length, load_history
+from services.mood_model_cache import MoodModelCache, history_fingerprint
+
+logger = logging.getLogger(__name__)
+
+_worker_service = None
+
+
+def _init_worker(memory_limit_mb):
+    """
+    Cap the address space of a pool worker and create its service.
+    """
+    global _worker_service
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            logger.warning("Could not limit worker memory to %d MB: %s", memory_limit_mb, e)
+    _worker_service = MoodAnalyzerService()
+
+
+def _analyze_in_worker(user_id, user_history, mode=None):
+    return _worker_service.analyze_mood(user_history, user_id=user_id, mode=mode)
+
 
 class MoodAnalyzerService:
     def __init__(self):
@@ -13,74 +43,283 @@ class MoodAnalyzerService:
         self.random_state = Config.MOOD_ANALYZER_RANDOM_STATE
         self.test_size = Config.MOOD_ANALYZER_TEST_SIZE
         self.threshold_importance = Config.MOOD_ANALYZER_TRESHOLD_IMPORTANCE
-        self.rf_model = RandomForestRegressor(n_estimators=self.n_estimators, random_state=self.random_state)
-        
-    def _prepare_data(self, df):
-        """
-        Prepare data for training and analysis.
+        self.warm_start_trees = Config.MOOD_ANALYZER_WARM_START_TREES
+        self.max_estimators = Config.MOOD_ANALYZER_MAX_ESTIMATORS
+        self.mode = Config.MOOD_ANALYZER_MODE
+        self.ridge_alpha = Config.MOOD_ANALYZER_LITE_RIDGE_ALPHA
+        # The forest of the last analysis; scikit-learn is imported on the first fit.
+        self.rf_model = None
+        self.model_cache = MoodModelCache(Config.MOOD_ANALYZER_CACHE_SIZE, Config.MOOD_ANALYZER_CACHE_DIR, Config.MOOD_ANALYZER_CACHE_MAX_BYTES)
 
-        Args:
-        df (DataFrame): The dataframe containing the user history data.
+    def _new_model(self, n_jobs=None):
+        from sklearn.ensemble import RandomForestRegressor
 
-        Returns:
-        tuple: Feature matrix X and target variable y.
-        """
-        y = df['mood_rate']
-        X = df.drop(['mood_rate'], axis=1)
-        return X, y
+        return RandomForestRegressor(n_estimators=self.n_estimators, random_state=self.random_state, n_jobs=n_jobs)
 
     def _train(self, X, y):
         """
         Train the RandomForestRegressor model on the provided data.
 
         Args:
-        X (DataFrame): The feature matrix.
-        y (Series): The target variable.
+        X (ndarray): The float32 feature matrix.
+        y (ndarray): The target variable.
 
         Returns:
         float: The R^2 score of the model on the test set.
         """
+        from sklearn.model_selection import train_test_split
+
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=self.test_size, random_state=self.random_state)
-        self.rf_model.fit(X_train, y_train)
-        return self.rf_model.score(X_test, y_test)
+        with instrumentation.timer('mood_analyzer', 'forest_fit'):
+            self.rf_model.fit(X_train, y_train)
+        with instrumentation.timer('mood_analyzer', 'forest_score'):
+            return self.rf_model.score(X_test, y_test)
     
-    def analyze_mood(self, user_history):
+    def warmup(self):
+        """
+        Import scikit-learn and run a forest and a lite analysis on dummy data, so that the first
+        request does not pay for imports and lazy initialization. The model cache is not touched.
+        """
+        rng = np.random.default_rng(0)
+        X = rng.poisson(1.0, size=(20, 3)).astype(np.float32)
+        y = rng.integers(1, 6, size=20).astype(np.float64)
+        feature_names = ['a', 'b', 'c']
+        model, self.rf_model = self.rf_model, self._new_model()
+        self._train(X, y)
+        self._impact_map(feature_names, X, y)
+        self._lite_impact_map(feature_names, X, y)
+        self.rf_model = model
+
+    def analyze_mood(self, user_history, user_id=None, n_jobs=None, mode=None):
         """
         Analyze mood based on user history.
 
+        Results are cached per user. An unchanged history returns the cached impact map, and a
+        history that only grew by appended days updates the cached forest with a few more trees
+        instead of refitting it, until the forest reaches MOOD_ANALYZER_MAX_ESTIMATORS trees.
+
         Args:
-        user_history (dict): The user's historical data with features and mood ratings.
+        user_history (dict): The user's historical data with features and mood ratings. NumPy
+        structured arrays, Arrow tables and Parquet, Arrow or .npy file paths are accepted too,
+        see load_history.
+        user_id (optional): The user the history belongs to. Without it, results are only
+        reused for identical histories.
+        n_jobs (int, optional): The number of threads used to fit the forest. This does not change the result.
+        mode (str, optional): 'forest', or 'lite' to replace the forest importances with normalized
+        standardized ridge coefficients computed in closed form, for interactive requests. Lite
+        results are not cached. Defaults to MOOD_ANALYZER_MODE.
 
         Returns:
         dict: A dictionary mapping feature names to their calculated impact on mood.
         """
-        df = pd.DataFrame(user_history)
-        if 'mood_rate' not in df.columns:
-            raise ValueError("The data must include a 'mood_rate' column.")
-        X, y = self._prepare_data(df)
-        
+        with instrumentation.timer('mood_analyzer', 'load_history'):
+            feature_names, X, y = load_history(user_history)
+        mode = mode or self.mode
+        if mode == 'lite':
+            with instrumentation.timer('mood_analyzer', 'lite_impact'):
+                return self._lite_impact_map(feature_names, X, y)
+        if mode != 'forest':
+            raise ValueError(f"Unknown mood analysis mode: {mode}")
+        columns = feature_names + ['mood_rate']
+        fingerprint = history_fingerprint(columns, X, y)
+        key = ('user', user_id) if user_id is not None else ('history', fingerprint)
+        entry = self.model_cache.get(key)
+        if entry is not None and entry['fingerprint'] == fingerprint:
+            self.model_cache.hits += 1
+            instrumentation.increment('mood_analyzer', 'cache_hits')
+            self.rf_model = entry['model']
+            return dict(entry['impact_map'])
+        self.model_cache.misses += 1
+
+        if self._can_warm_start(entry, columns, X, y):
+            # The cached forest is left untouched until the new one has been fitted: fit appends to
+            # estimators_, so the copy gets its own list.
+            self.rf_model = copy.copy(entry['model'])
+            self.rf_model.estimators_ = list(self.rf_model.estimators_)
+            self.rf_model.set_params(warm_start=True, n_estimators=self.rf_model.n_estimators + self.warm_start_trees, n_jobs=n_jobs)
+            self.model_cache.warm_starts += 1
+            instrumentation.increment('mood_analyzer', 'warm_starts')
+        else:
+            self.rf_model = self._new_model(n_jobs)
+            self.model_cache.refits += 1
+            instrumentation.increment('mood_analyzer', 'refits')
         self._train(X, y)
-       
-        feature_importances = self.rf_model.feature_importances_
-        feature_names = X.columns
-        
-        importances = pd.Series(feature_importances, index=feature_names).sort_values(ascending=False)
-        correlation_matrix = df.corr()
-        correlation_with_mood = correlation_matrix['mood_rate'].sort_values(ascending=False)
-        
-        importances_df = importances.reset_index()
-        importances_df.columns = ['Feature', 'Importance']
-
-        correlation_with_mood_df = correlation_with_mood.reset_index()
-        correlation_with_mood_df.columns = ['Feature', 'Correlation']
-
-        combined_df = importances_df.merge(correlation_with_mood_df, on='Feature')
-        combined_df['Impact'] = combined_df['Importance'] * combined_df['Correlation']
-
-        important_features_df = combined_df[combined_df['Importance'] >= self.threshold_importance]
-        important_features_df = important_features_df.sort_values(by='Impact', ascending=False)
-        important_features_df = important_features_df.reset_index(drop=True)
-
-        feature_impact_map = important_features_df.set_index('Feature')['Impact'].to_dict()
-
-        return feature_impact_map
+
+        with instrumentation.timer('mood_analyzer', 'impact_map'):
+            feature_impact_map = self._impact_map(feature_names, X, y)
+        self.model_cache.set(key, {
+            'fingerprint': fingerprint,
+            'rows': len(y),
+            'columns': columns,
+            'model': self.rf_model,
+            'impact_map': feature_impact_map,
+        })
+        return dict(feature_impact_map)
+
+    def analyze_mood_many(self, histories, max_workers=None, memory_limit_mb=None):
+        """
+        Analyze mood for many users across a process pool, yielding results as they finish.
+
+        Histories are submitted lazily, with a bounded number in flight. Histories of at least
+        MOOD_ANALYZER_LARGE_HISTORY_ROWS days are fitted in this process with
+        MOOD_ANALYZER_LARGE_HISTORY_N_JOBS threads once the pool has finished. For a fixed
+        random_state the results equal those of analyze_mood.
+
+        Args:
+        histories (dict or iterable): A mapping or (user_id, user_history) pairs, see analyze_mood.
+        max_workers (int, optional): The number of worker processes. Defaults to MOOD_ANALYZER_MAX_WORKERS or the CPU count.
+        memory_limit_mb (int, optional): The address space cap of every worker. Defaults to MOOD_ANALYZER_WORKER_MEMORY_MB.
+
+        Yields:
+        tuple: (user_id, feature_impact_map) pairs in completion order. The map is None if the analysis failed.
+        """
+        if isinstance(histories, dict):
+            histories = histories.items()
+        max_workers = max_workers or Config.MOOD_ANALYZER_MAX_WORKERS or os.cpu_count() or 1
+        memory_limit_mb = memory_limit_mb or Config.MOOD_ANALYZER_WORKER_MEMORY_MB
+        large_histories = []
+        pending = {}
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers,
+            initializer=_init_worker,
+            initargs=(memory_limit_mb,),
+            max_tasks_per_child=Config.MOOD_ANALYZER_WORKER_MAX_TASKS
+        ) as pool:
+            for user_id, user_history in histories:
+                if history_length(user_history) >= Config.MOOD_ANALYZER_LARGE_HISTORY_ROWS:
+                    large_histories.append((user_id, user_history))
+                    continue
+                pending[pool.submit(_analyze_in_worker, user_id, user_history)] = user_id
+                if len(pending) >= max_workers * 4:
+                    yield from self._collect(pending, concurrent.futures.FIRST_COMPLETED)
+            while pending:
+                yield from self._collect(pending, concurrent.futures.FIRST_COMPLETED)
+
+        for user_id, user_history in large_histories:
+            try:
+                yield user_id, self.analyze_mood(user_history, user_id=user_id, n_jobs=Config.MOOD_ANALYZER_LARGE_HISTORY_N_JOBS)
+            except Exception as e:
+                logger.error("Mood analysis failed for user %s: %s", user_id, e)
+                yield user_id, None
+
+    @staticmethod
+    def _collect(pending, return_when):
+        """
+        Wait for pending analyses and yield the finished ones, removing them from pending.
+        """
+        done, _ = concurrent.futures.wait(pending, return_when=return_when)
+        for future in done:
+            user_id = pending.pop(future)
+            try:
+                yield user_id, future.result()
+            except Exception as e:
+                logger.error("Mood analysis failed for user %s: %s", user_id, e)
+                yield user_id, None
+
+    def cache_stats(self):
+        """
+        Report the hits, misses, warm-start updates and full refits of the per-user model cache.
+        """
+        return self.model_cache.stats()
+
+    def _can_warm_start(self, entry, columns, X, y):
+        """
+        Check whether the history extends the cached one by appended rows and the forest may still grow.
+        """
+        return (
+            entry is not None
+            and entry['columns'] == columns
+            and len(y) > entry['rows']
+            and entry['model'].n_estimators + self.warm_start_trees <= self.max_estimators
+            and history_fingerprint(columns, X, y, entry['rows']) == entry['fingerprint']
+        )
+
+    def _impact_map(self, feature_names, X, y):
+        """
+        Combine the feature importances of the fitted model with the correlation of each feature with mood.
+
+        Args:
+        feature_names (list of str): The feature names.
+        X (ndarray): The float32 feature matrix.
+        y (ndarray): The mood ratings.
+
+        Returns:
+        dict: A dictionary mapping feature names to their calculated impact on mood, for the
+        features with an importance of at least the threshold, in descending order of impact.
+        """
+        _, covariance, squares, y_squares = self._centered_moments(X, y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = covariance / np.sqrt(squares * y_squares)
+        return self._rank_impacts(feature_names, self.rf_model.feature_importances_, correlation)
+
+    def _lite_impact_map(self, feature_names, X, y):
+        """
+        Compute the impact map from closed-form statistics instead of a fitted forest.
+
+        The importance of a feature is the absolute value of its standardized ridge coefficient,
+        normalized to sum to one like the forest importances, so the same threshold applies.
+
+        Args:
+        feature_names (list of str): The feature names.
+        X (ndarray): The float32 feature matrix.
+        y (ndarray): The mood ratings.
+
+        Returns:
+        dict: A dictionary mapping feature names to their calculated impact on mood, see _impact_map.
+        """
+        gram, covariance, squares, y_squares = self._centered_moments(X, y, full_gram=True)
+        scale = np.sqrt(squares)
+        varying = scale > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = covariance / (scale * np.sqrt(y_squares))
+        importances = np.zeros(len(feature_names))
+        if varying.any() and y_squares > 0:
+            # Ridge on standardized features: (R + alpha / n * I) beta = r, with R the feature correlation matrix.
+            standardized = gram[np.ix_(varying, varying)] / np.outer(scale[varying], scale[varying])
+            standardized[np.diag_indices_from(standardized)] += self.ridge_alpha / len(y)
+            coefficients = np.abs(np.linalg.solve(standardized, correlation[varying]))
+            total = coefficients.sum()
+            if total > 0:
+                importances[varying] = coefficients / total
+        return self._rank_impacts(feature_names, importances, correlation)
+
+    def _rank_impacts(self, feature_names, importances, correlation):
+        """
+        Multiply importances by correlations, keep the features above the importance threshold and sort by impact.
+        """
+        impacts = importances * correlation
+        important = np.flatnonzero(importances >= self.threshold_importance)
+        # Ties keep the order of descending importance; NaN impacts (constant columns) sort last.
+        important = important[np.argsort(-importances[important], kind='stable')]
+        important = important[np.argsort(-impacts[important], kind='stable')]
+        return {feature_names[index]: float(impacts[index]) for index in important}
+
+    @staticmethod
+    def _centered_moments(X, y, full_gram=False, block_rows=4096):
+        """
+        Compute centered second moments in float64 in one pass over the rows, a block at a time.
+
+        Args:
+        X (ndarray): The float32 feature matrix.
+        y (ndarray): The mood ratings.
+        full_gram (bool): Whether to compute the full centered Gram matrix of the features.
+
+        Returns:
+        tuple: The centered Gram matrix (None unless full_gram), the covariance sums of every
+        feature with mood, the sums of squares of every feature and the sum of squares of mood.
+        """
+        means = X.mean(axis=0, dtype=np.float64)
+        y_centered = y - y.mean()
+        gram = np.zeros((X.shape[1], X.shape[1])) if full_gram else None
+        covariance = np.zeros(X.shape[1])
+        squares = np.zeros(X.shape[1])
+        for start in range(0, len(X), block_rows):
+            block = X[start:start + block_rows].astype(np.float64) - means
+            covariance += y_centered[start:start + block_rows] @ block
+            if full_gram:
+                gram += block.T @ block
+            else:
+                squares += np.einsum('ij,ij->j', block, block)
+        if full_gram:
+            squares = gram.diagonal().copy()
+        return gram, covariance, squares, y_centered @ y_centered
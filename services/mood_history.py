@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+
+TARGET_COLUMN = 'mood_rate'
+
+
+def read_history_file(path):
+    """
+    Open a history file without loading it into Python objects.
+
+    Parquet files are read with pyarrow over a memory map, Arrow IPC/Feather files are mapped
+    zero-copy and .npy files holding a structured array are opened with numpy's mmap_mode.
+
+    Args:
+    path (str): The path of a .parquet, .arrow, .feather or .npy file.
+
+    Returns:
+    The Arrow table or structured array of the history.
+    """
+    path = os.fspath(path)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        return np.load(path, mmap_mode='r')
+    try:
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Reading Parquet and Arrow histories requires the pyarrow package.") from e
+    if extension in ('.parquet', '.pq'):
+        return pyarrow.parquet.read_table(path, memory_map=True)
+    if extension in ('.arrow', '.feather', '.ipc'):
+        return pyarrow.feather.read_table(path, memory_map=True)
+    raise ValueError(f"Unsupported history file format: {path}")
+
+
+def _columns(user_history):
+    """
+    Return the column names of a history and a function that returns a column as an array.
+    """
+    if hasattr(user_history, 'column_names') and hasattr(user_history, 'column'):
+        return list(user_history.column_names), lambda name: np.asarray(user_history.column(name))
+    if isinstance(user_history, np.ndarray):
+        if not user_history.dtype.names:
+            raise ValueError("A NumPy history must be a structured array with one field per column.")
+        return list(user_history.dtype.names), lambda name: user_history[name]
+    return list(user_history.keys()), lambda name: np.asarray(user_history[name])
+
+
+def load_history(user_history, target=TARGET_COLUMN):
+    """
+    Convert a history into a contiguous float32 feature matrix and a float64 target.
+
+    Every column is written straight into the preallocated feature matrix, without an
+    intermediate DataFrame or float64 copy. The forest trains on float32 features anyway.
+
+    Args:
+    user_history: The history as a dict of lists or arrays, a DataFrame, a NumPy structured
+    array, an Arrow table or record batch, or the path of a file accepted by read_history_file.
+    target (str): The name of the mood rating column.
+
+    Returns:
+    tuple: The feature names, the (days, features) float32 feature matrix and the float64 target.
+    """
+    if isinstance(user_history, (str, os.PathLike)):
+        user_history = read_history_file(user_history)
+    columns, column = _columns(user_history)
+    if target not in columns:
+        raise ValueError(f"The data must include a '{target}' column.")
+    feature_names = [name for name in columns if name != target]
+    y = np.asarray(column(target), dtype=np.float64)
+    X = np.empty((len(y), len(feature_names)), dtype=np.float32)
+    for index, name in enumerate(feature_names):
+        X[:, index] = column(name)
+    return feature_names, X, y
+
+
+def history_length(user_history, target=TARGET_COLUMN):
+    """
+    Return the number of days of a history without converting it.
+    """
+    if isinstance(user_history, (str, os.PathLike)):
+        path = os.fspath(user_history)
+        if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+            import pyarrow.parquet
+            return pyarrow.parquet.ParquetFile(path).metadata.num_rows
+        user_history = read_history_file(path)
+    if hasattr(user_history, 'num_rows'):
+        return user_history.num_rows
+    if isinstance(user_history, np.ndarray):
+        return len(user_history)
+    return len(user_history[target]) if target in user_history else 0
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from core.lru_cache import LRUCache, approximate_size
+
+logger = logging.getLogger(__name__)
+
+# Memory of a fitted tree: a node record (children, feature, threshold, impurity and sample
+# counts) plus its float64 value per node, and the estimator object itself.
+_TREE_NODE_BYTES = 72
+_TREE_OBJECT_BYTES = 1024
+
+
+def history_fingerprint(columns, X, y, count=None):
+    """
+    Hash the column names and the first count days of a history.
+
+    Args:
+    columns (list of str): The column names, in order.
+    X (ndarray): The row-major feature matrix.
+    y (ndarray): The mood ratings.
+    count (int, optional): The number of leading days to hash. Defaults to all days.
+
+    Returns:
+    str: The hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(list(columns)).encode())
+    digest.update(np.ascontiguousarray(X[:count]).tobytes())
+    digest.update(np.ascontiguousarray(y[:count]).tobytes())
+    return digest.hexdigest()
+
+
+def model_size(model):
+    """
+    Estimate the memory of a fitted forest (or single tree) in bytes from its node counts.
+    """
+    trees = getattr(model, 'estimators_', None)
+    if trees is None:
+        trees = [model] if hasattr(model, 'tree_') else []
+    return sum(_TREE_OBJECT_BYTES + _TREE_NODE_BYTES * tree.tree_.node_count for tree in trees)
+
+
+def _entry_size(key, entry):
+    return approximate_size(key) + model_size(entry['model']) + approximate_size(entry['impact_map']) + approximate_size(entry['columns'])
+
+
+class MoodModelCache:
+    def __init__(self, maxsize=256, cache_dir=None, max_bytes=None):
+        """
+        Initialize the per-user cache of fitted mood models and their impact maps.
+
+        Entries live in an LRU cache in memory and, when cache_dir is set, are also written to
+        disk so they survive restarts and evictions.
+
+        Args:
+        maxsize (int): The maximum number of users kept in memory.
+        cache_dir (str, optional): The directory of the on-disk copies. None keeps entries in memory only.
+        max_bytes (int, optional): The approximate memory budget of the cached models, see model_size.
+        """
+        self.cache_dir = cache_dir
+        self._entries = LRUCache(maxsize, max_bytes=max_bytes, sizeof=_entry_size)
+        self.hits = 0
+        self.misses = 0
+        self.warm_starts = 0
+        self.refits = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key):
+        """
+        Return the cached entry of the key from memory or disk, or None.
+
+        Returns:
+        dict: The entry with the fingerprint, row count, columns, model and impact map.
+        """
+        entry = self._entries.get(key)
+        if entry is None and self.cache_dir:
+            path = self._path(key)
+            if os.path.exists(path):
+                try:
+                    import joblib
+                    entry = joblib.load(path)
+                    self._entries.set(key, entry)
+                except Exception as e:
+                    logger.warning("Could not load cached mood model %s: %s", path, e)
+        return entry
+
+    def set(self, key, entry):
+        self._entries.set(key, entry)
+        if self.cache_dir:
+            import joblib
+            joblib.dump(entry, self._path(key))
+
+    def _path(self, key):
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.joblib")
+
+    def stats(self):
+        """
+        Report the cache hits, misses, warm-start updates and full refits, and the entries and bytes in memory.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'bytes': self._entries.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'warm_starts': self.warm_starts,
+            'refits': self.refits,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
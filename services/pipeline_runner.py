@@ -0,0 +1,371 @@
+"""
+Batch pipeline: categorize diary entries, analyze mood impact and recommend advice over a JSONL stream.
+
+Usage (from the repository root):
+    python -m services.pipeline_runner --input users.jsonl --output results.jsonl \\
+        --categories categories.json --advice advice.json [--checkpoint results.checkpoint] [--resume]
+
+Every input line is a user:
+    {"user_id": ..., "categories": [liked categories], "days": [{"entries": [texts], "mood_rate": 4}, ...]}
+Every output line holds the user_id, the record offset, the category_impact map and the
+recommendations, or an error.
+"""
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from core.config import Config
+from core.instrumentation import instrumentation
+from services.mood_analyzer_service import MoodAnalyzerService, _analyze_in_worker, _init_worker
+from services.reccomendation_service import RecommendationService
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class StageQueue(queue.Queue):
+    """
+    A bounded queue that records how long producers were blocked (backpressure) and consumers starved.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.put_wait_seconds = 0.0
+        self.get_wait_seconds = 0.0
+        self.max_depth = 0
+
+    def put(self, item, block=True, timeout=None):
+        start = time.perf_counter()
+        super().put(item, block, timeout)
+        self.put_wait_seconds += time.perf_counter() - start
+        self.max_depth = max(self.max_depth, self.qsize())
+
+    def get(self, block=True, timeout=None):
+        start = time.perf_counter()
+        item = super().get(block, timeout)
+        self.get_wait_seconds += time.perf_counter() - start
+        return item
+
+    def stats(self):
+        return {
+            'maxsize': self.maxsize,
+            'max_depth': self.max_depth,
+            'producer_blocked_seconds': self.put_wait_seconds,
+            'consumer_starved_seconds': self.get_wait_seconds,
+        }
+
+
+class PipelineRunner:
+    def __init__(self, categories, advice_objects, categorizer_service=None, mood_analyzer_service=None, recommendation_service=None,
+                 batch_size=None, queue_size=None, workers=None, mood_mode=None, top_k=None, checkpoint_every=None):
+        """
+        Initialize the pipeline runner.
+
+        Records flow through three stages connected by bounded queues: categorization in batches
+        on the model, mood analysis on a process pool and recommendation, which writes the output
+        in input order. A full queue blocks the stage before it, so memory stays bounded however
+        long the input is.
+
+        Args:
+        categories (list of str): The categories diary entries are sorted into.
+        advice_objects (dict): A dictionary of advice objects.
+        categorizer_service (CategorizerService, optional): Created on first use if omitted.
+        mood_analyzer_service (MoodAnalyzerService, optional): Created on first use if omitted.
+        recommendation_service (RecommendationService, optional): Created on first use if omitted.
+        batch_size (int, optional): The number of records categorized together. Defaults to PIPELINE_BATCH_SIZE.
+        queue_size (int, optional): The capacity of every queue between stages. Defaults to PIPELINE_QUEUE_SIZE.
+        workers (int, optional): The number of mood analysis processes; 0 analyzes in a thread of this process.
+        Defaults to PIPELINE_WORKERS or the CPU count.
+        mood_mode (str, optional): The mood analysis mode, see MoodAnalyzerService.analyze_mood.
+        top_k (int, optional): The number of recommendations per user. Defaults to PIPELINE_TOP_K.
+        checkpoint_every (int, optional): The number of written records between checkpoints. Defaults to PIPELINE_CHECKPOINT_EVERY.
+        """
+        self.categories = list(categories)
+        self.advice_objects = advice_objects
+        self.categorizer_service = categorizer_service
+        self.mood_analyzer_service = mood_analyzer_service
+        self.recommendation_service = recommendation_service
+        self.batch_size = batch_size or Config.PIPELINE_BATCH_SIZE
+        self.queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+        self.workers = (Config.PIPELINE_WORKERS or os.cpu_count() or 1) if workers is None else workers
+        self.mood_mode = mood_mode
+        self.top_k = top_k or Config.PIPELINE_TOP_K
+        self.checkpoint_every = checkpoint_every or Config.PIPELINE_CHECKPOINT_EVERY
+        self.stage_stats = {}
+
+    def _services(self):
+        if self.categorizer_service is None:
+            from services.categorizer_service import CategorizerService
+            self.categorizer_service = CategorizerService()
+        if self.mood_analyzer_service is None:
+            self.mood_analyzer_service = MoodAnalyzerService()
+        if self.recommendation_service is None:
+            self.recommendation_service = RecommendationService()
+
+    def run(self, input_path, output_path, checkpoint_path=None, resume=False):
+        """
+        Process the input JSONL file into the output JSONL file.
+
+        Args:
+        input_path (str): The input JSONL file.
+        output_path (str): The output JSONL file.
+        checkpoint_path (str, optional): Where the offset of the next record and the output size are saved.
+        resume (bool): Continue from the checkpoint, truncating output written after it.
+
+        Returns:
+        dict: Per-stage record counts, busy seconds and throughput, and per-queue backpressure statistics.
+        """
+        self._services()
+        start_offset, output_size = 0, 0
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            start_offset, output_size = checkpoint['offset'], checkpoint['output_size']
+            logger.info("Resuming from record %d.", start_offset)
+
+        self.stage_stats = {stage: {'records': 0, 'busy_seconds': 0.0} for stage in ('categorize', 'mood', 'recommend')}
+        self.stage_stats['recommend']['mood_wait_seconds'] = 0.0
+        categorized = StageQueue(self.queue_size)
+        analyzed = StageQueue(self.queue_size)
+        pool = None
+        if self.workers:
+            pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(Config.MOOD_ANALYZER_WORKER_MEMORY_MB,),
+                max_tasks_per_child=Config.MOOD_ANALYZER_WORKER_MAX_TASKS
+            )
+        threads = [
+            threading.Thread(target=self._categorize_stage, args=(input_path, start_offset, categorized), daemon=True),
+            threading.Thread(target=self._mood_stage, args=(categorized, analyzed, pool), daemon=True),
+        ]
+        started_at = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            with open(output_path, 'a+b') as output:
+                output.truncate(output_size)
+                output.seek(output_size)
+                self._recommend_stage(analyzed, output, checkpoint_path)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - started_at
+        for stats in self.stage_stats.values():
+            stats['records_per_second'] = stats['records'] / stats['busy_seconds'] if stats['busy_seconds'] else 0.0
+        return {
+            'records': self.stage_stats['recommend']['records'],
+            'seconds': elapsed,
+            'records_per_second': self.stage_stats['recommend']['records'] / elapsed if elapsed else 0.0,
+            'stages': self.stage_stats,
+            'queues': {'categorize->mood': categorized.stats(), 'mood->recommend': analyzed.stats()},
+        }
+
+    def _records(self, input_path, start_offset):
+        with open(input_path, encoding='utf-8') as f:
+            for offset, line in enumerate(f):
+                if offset >= start_offset and line.strip():
+                    yield offset, line
+
+    def _categorize_stage(self, input_path, start_offset, output_queue):
+        """
+        Categorize the entries of a batch of records at once and build each user's daily history.
+        """
+        try:
+            batch = []
+            for item in self._records(input_path, start_offset):
+                batch.append(item)
+                if len(batch) == self.batch_size:
+                    self._categorize_batch(batch, output_queue)
+                    batch = []
+            if batch:
+                self._categorize_batch(batch, output_queue)
+            output_queue.put(_END)
+        except Exception as e:
+            output_queue.put(_Failure(e))
+
+    def _categorize_batch(self, batch, output_queue):
+        start = time.perf_counter()
+        records, texts = [], []
+        for offset, line in batch:
+            try:
+                record, day_entries = self._parse_record(line)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                records.append((offset, None, f"Malformed record: {e}"))
+                continue
+            records.append((offset, record, day_entries))
+            for entries in day_entries:
+                texts.extend(entries)
+        text_categories = iter(self.categorizer_service.categorize_many(texts, self.categories) if texts else [])
+
+        category_index = {category: index for index, category in enumerate(self.categories)}
+        items = []
+        for offset, record, day_entries in records:
+            if record is None:
+                items.append((offset, None, None, day_entries))
+                continue
+            counts = [[0] * len(day_entries) for _ in self.categories]
+            for day_index, entries in enumerate(day_entries):
+                for _ in entries:
+                    for category in next(text_categories):
+                        counts[category_index[category]][day_index] += 1
+            history = dict(zip(self.categories, counts))
+            history['mood_rate'] = [day.get('mood_rate') for day in record['days']]
+            items.append((offset, record, history, None))
+        self._record_stage('categorize', len(batch), start)
+        for item in items:
+            output_queue.put(item)
+
+    @staticmethod
+    def _parse_record(line):
+        """
+        Parse an input line into the record and the entries of each of its days.
+
+        Raises:
+        ValueError: If the line is not a JSON object whose 'days' is a list of objects with a list of text 'entries'.
+        KeyError: If the record has no 'days'.
+        """
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("the record is not an object")
+        if not isinstance(record['days'], list):
+            raise ValueError("'days' is not a list")
+        day_entries = []
+        for day_index, day in enumerate(record['days']):
+            if not isinstance(day, dict):
+                raise ValueError(f"day {day_index} is not an object")
+            entries = day.get('entries', [])
+            if not isinstance(entries, list) or not all(isinstance(entry, str) for entry in entries):
+                raise ValueError(f"the entries of day {day_index} are not a list of texts")
+            day_entries.append(entries)
+        return record, day_entries
+
+    def _mood_stage(self, input_queue, output_queue, pool):
+        """
+        Submit every history to the process pool and pass the future on in input order.
+        """
+        try:
+            while True:
+                item = input_queue.get()
+                if item is _END or isinstance(item, _Failure):
+                    output_queue.put(item)
+                    return
+                offset, record, history, error = item
+                start = time.perf_counter()
+                if error is None:
+                    if pool is not None:
+                        result = pool.submit(_analyze_in_worker, record.get('user_id'), history, self.mood_mode)
+                    else:
+                        result = concurrent.futures.Future()
+                        try:
+                            result.set_result(self.mood_analyzer_service.analyze_mood(history, user_id=record.get('user_id'), mode=self.mood_mode))
+                        except Exception as e:
+                            result.set_exception(e)
+                    self._record_stage('mood', 1, start)
+                else:
+                    result = error
+                output_queue.put((offset, record, result))
+        except Exception as e:
+            output_queue.put(_Failure(e))
+
+    def _recommend_stage(self, input_queue, output, checkpoint_path):
+        """
+        Wait for each mood result in input order, recommend advice and write the output record.
+        """
+        since_checkpoint = 0
+        next_offset = None
+        while True:
+            item = input_queue.get()
+            if item is _END:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            offset, record, result = item
+            result_record = {'offset': offset, 'user_id': record.get('user_id') if record else None}
+            try:
+                if isinstance(result, str):
+                    raise ValueError(result)
+                waited_at = time.perf_counter()
+                category_impact = result.result()
+                start = time.perf_counter()
+                # With a process pool, time spent waiting here is time the mood stage is behind.
+                self.stage_stats['recommend']['mood_wait_seconds'] += start - waited_at
+                result_record['category_impact'] = category_impact
+                result_record['recommendations'] = self.recommendation_service.recommend(
+                    record.get('categories', []), category_impact, self.advice_objects, user_id=record.get('user_id'), k=self.top_k
+                )
+                self._record_stage('recommend', 1, start)
+            except Exception as e:
+                result_record['error'] = str(e)
+                self.stage_stats['recommend']['records'] += 1
+            output.write((json.dumps(result_record, ensure_ascii=False) + '\n').encode('utf-8'))
+            next_offset = offset + 1
+            since_checkpoint += 1
+            if checkpoint_path and since_checkpoint >= self.checkpoint_every:
+                self._write_checkpoint(checkpoint_path, next_offset, output)
+                since_checkpoint = 0
+        if checkpoint_path and next_offset is not None:
+            self._write_checkpoint(checkpoint_path, next_offset, output)
+
+    @staticmethod
+    def _write_checkpoint(checkpoint_path, next_offset, output):
+        output.flush()
+        os.fsync(output.fileno())
+        temporary_path = checkpoint_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump({'offset': next_offset, 'output_size': output.tell()}, f)
+        os.replace(temporary_path, checkpoint_path)
+
+    def _record_stage(self, stage, records, start):
+        stats = self.stage_stats[stage]
+        stats['records'] += records
+        stats['busy_seconds'] += time.perf_counter() - start
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    from services.recommendation_trainer import load_advice
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--input', required=True)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--categories', required=True, help="A JSON list of category names.")
+    parser.add_argument('--advice', required=True, help="Advice in the format of services.recommendation_trainer.")
+    parser.add_argument('--checkpoint')
+    parser.add_argument('--resume', action='store_true')
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('--queue-size', type=int)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--mood-mode', choices=['forest', 'lite'])
+    parser.add_argument('--metrics-port', type=int, default=Config.INSTRUMENTATION_EXPORTER_PORT,
+                        help="Enable instrumentation and serve Prometheus metrics at /metrics on this port.")
+    args = parser.parse_args()
+
+    if args.metrics_port is not None:
+        instrumentation.enabled = True
+        instrumentation.start_exporter(args.metrics_port)
+
+    with open(args.categories, encoding='utf-8') as f:
+        categories = json.load(f)
+    runner = PipelineRunner(categories, load_advice(args.advice), batch_size=args.batch_size, queue_size=args.queue_size,
+                            workers=args.workers, mood_mode=args.mood_mode)
+    stats = runner.run(args.input, args.output, args.checkpoint, args.resume)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
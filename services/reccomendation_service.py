@@ -1,8 +1,12 @@
-import pandas as pd
-from surprise import Dataset, Reader, SVD, accuracy
-from surprise.model_selection import train_test_split
+import collections
+
+import numpy as np
 
 from core.config import Config
+from core.instrumentation import instrumentation
+from core.lru_cache import LRUCache
+from services.advice_catalogue import AdviceCatalogue, catalogue_signature
+from services.factorization_model import FactorizationModel
 
 class RecommendationService:
     def __init__(self):
@@ -16,106 +20,235 @@ class RecommendationService:
         self.completed_count_weight = Config.RECOMMENDATION_COMPLETED_COUNT_WEIGHT
         self.agreed_count_weight = Config.RECOMMENDATION_AGREED_COUNT_WEIGHT
         self.showed_count_weight = Config.RECOMMENDATION_SHOWED_COUNT_WEIGHT
-        self.test_size = Config.RECCOMENDATION_TEST_SIZE
+        self.model_path = Config.RECOMMENDATION_MODEL_PATH
+        self.catalogue = None
+        self.factorization_model = None
+        self._model_checked = False
+        self._candidates = (None, None)
+        self.event_ratings = {
+            'showed_count': Config.RECOMMENDATION_SHOWN_RATING,
+            'agreed_count': Config.RECOMMENDATION_AGREED_RATING,
+            'completed_count': Config.RECOMMENDATION_COMPLETED_RATING,
+        }
+        # Per-user observed ratings and folded-in vectors, kept for the most recently active users.
+        self.user_states = LRUCache(Config.RECOMMENDATION_FOLD_IN_MAX_USERS)
     
-    def _scale_score(self, score):
+    def _scale_scores(self, scores):
         """
-        Scale the given score to be within the min and max scale.
+        Round the given scores and clip them to the min and max scale.
 
         Args:
-        score (float): The score to be scaled.
+        scores (ndarray): The scores to be scaled.
 
         Returns:
-        float: The scaled score.
+        ndarray: The scaled scores.
         """
-        return max(self.min_scale, min(self.max_scale, round(score)))
-    
-    def _calculate_advice_rating(self, advice, user_likes_categories, user_category_impact):
+        return np.clip(np.rint(scores), self.min_scale, self.max_scale)
+
+    def _get_catalogue(self, advice_objects):
+        """
+        Return the compiled advice catalogue, recompiling it only when the advice set changed.
         """
-        Calculate the advice rating based on user preferences and advice interactions.
+        if self.catalogue is None or self.catalogue.signature != catalogue_signature(advice_objects):
+            with instrumentation.timer('recommendation', 'compile_catalogue'):
+                self.catalogue = AdviceCatalogue(advice_objects)
+        return self.catalogue
+
+    def score_advice(self, users, advice_objects):
+        """
+        Rate every advice for a batch of users with two sparse matrix products.
 
         Args:
-        advice (object): The advice object.
-        user_likes_categories (list of str): List of categories the user likes.
-        user_category_impact (dict): A dictionary mapping category names to their impact on the user.
+        users (list of tuple): (user_categories, user_category_impact) pairs, see get_recommendations.
+        advice_objects (dict): A dictionary of advice objects.
 
         Returns:
-        float: The calculated advice rating.
-        """
-        impact_score = sum(user_category_impact.get(cat, 0) for cat in advice.categories)
-        user_preference_bonus = sum(1 for cat in advice.categories if cat in user_likes_categories)
-        interaction_score = self.agreed_count_weight * advice.agreed_count + self.completed_count_weight * advice.completed_count + self.showed_count_weight * advice.showed_count
-        total_score = self.impact_score_weight * impact_score + self.preference_bonus_weight * user_preference_bonus + interaction_score
-        scaled_score = self._scale_score(total_score)
-        return scaled_score
-    
-    def _prepare_surprise_data(self, user_categories, user_category_impact, advice_objects):
+        ndarray: The (users, advice) ratings in the order of advice_objects, within the min and max scale.
         """
-        Prepare data for training the Surprise model.
+        return self._scale_scores(self._total_scores(users, advice_objects))
+
+    def _total_scores(self, users, advice_objects):
+        """
+        Returns:
+        ndarray: The unscaled (users, advice) scores, see score_advice.
+        """
+        catalogue = self._get_catalogue(advice_objects)
+        impacts = np.stack([catalogue.category_vector(user_category_impact) for _, user_category_impact in users], axis=1)
+        preferences = np.stack([catalogue.category_vector(user_categories) for user_categories, _ in users], axis=1)
+        counts = catalogue.interaction_counts(advice_objects)
+        interaction_scores = (
+            self.agreed_count_weight * counts[:, 0]
+            + self.completed_count_weight * counts[:, 1]
+            + self.showed_count_weight * counts[:, 2]
+        )
+        total_scores = (
+            self.impact_score_weight * (catalogue.matrix @ impacts)
+            + self.preference_bonus_weight * (catalogue.matrix @ preferences)
+            + interaction_scores[:, None]
+        )
+        return total_scores.T
+
+    def load_model(self, path=None):
+        """
+        Load the factorization model trained offline by services.recommendation_trainer.
 
         Args:
-        user_categories (list of str): List of categories the user likes.
-        user_category_impact (dict): A dictionary mapping category names to their impact on the user.
-        advice_objects (dict): A dictionary of advice objects.
+        path (str, optional): The model directory. Defaults to RECOMMENDATION_MODEL_PATH.
 
         Returns:
-        DataFrame: The prepared data as a pandas DataFrame.
+        FactorizationModel: The loaded model.
         """
-        records = []
-        for advice_name, advice in advice_objects.items():
-            records.append(('user', advice_name, self._calculate_advice_rating(advice, user_categories, user_category_impact)))
-        return pd.DataFrame(records, columns=['userID', 'itemID', 'rating'])
-    
-    def _create_surprise_dataset(self, dataframe):
+        self.factorization_model = FactorizationModel(path or self.model_path)
+        self._model_checked = True
+        self._candidates = (None, None)
+        self.user_states.clear()
+        return self.factorization_model
+
+    def warmup(self, advice_objects=None):
         """
-        Create a Surprise dataset from the pandas DataFrame.
+        Load the factorization model if one was trained, page in its item factors and compile the
+        advice catalogue, so that the first request does not pay for them.
 
         Args:
-        dataframe (DataFrame): The pandas DataFrame containing the data.
+        advice_objects (dict, optional): The advice set that will be recommended from.
+        """
+        model = self._get_factorization_model()
+        if model is not None:
+            model.top_k(np.zeros(model.item_factors.shape[1]), 0.0, 1)
+        if advice_objects:
+            catalogue = self._get_catalogue(advice_objects)
+            if model is not None:
+                self._candidate_indices(model, catalogue)
+            self._total_scores([(set(), {})], advice_objects)
 
-        Returns:
-        Dataset: The prepared Surprise dataset.
+    def _get_factorization_model(self):
+        if not self._model_checked:
+            self._model_checked = True
+            if FactorizationModel.exists(self.model_path):
+                self.load_model()
+        return self.factorization_model
+
+    def _candidate_indices(self, model, catalogue):
         """
-        reader = Reader(rating_scale=(self.min_scale, self.max_scale))
-        return Dataset.load_from_df(dataframe[['userID', 'itemID', 'rating']], reader)
-    
-    def _train_and_evaluate_surprise_model(self, dataset):
+        Return the item rows of the current advice set, recomputed only when the advice set changes.
+        """
+        signature, indices = self._candidates
+        if signature != catalogue.signature:
+            indices = model.candidate_indices(catalogue.advice_names)
+            self._candidates = (catalogue.signature, indices)
+        return indices
+
+    def _user_vector(self, model, user_id):
+        """
+        Return the folded-in or trained (vector, bias) of the user, or None if the model does not know the user.
         """
-        Train and evaluate the Surprise model.
+        if model is None or user_id is None:
+            return None
+        state = self.user_states.get(user_id)
+        if state is not None and state['vector'] is not None:
+            return state['vector']
+        return model.user_vector(user_id) if user_id in model else None
+
+    def record_shown(self, user_id, advice_name, advice_objects):
+        """
+        Record that an advice was shown to a user, see _record_event.
+        """
+        self._record_event(user_id, advice_name, advice_objects, 'showed_count')
+
+    def record_agreed(self, user_id, advice_name, advice_objects):
+        """
+        Record that a user agreed to follow an advice, see _record_event.
+        """
+        self._record_event(user_id, advice_name, advice_objects, 'agreed_count')
+
+    def record_completed(self, user_id, advice_name, advice_objects):
+        """
+        Record that a user completed an advice, see _record_event.
+        """
+        self._record_event(user_id, advice_name, advice_objects, 'completed_count')
+
+    def _record_event(self, user_id, advice_name, advice_objects, counter):
+        """
+        Update the advice's interaction counter and fold the event into the user's vector.
+
+        The event becomes an implicit rating of the advice (the highest event rating so far). The
+        user's vector is refitted against the fixed item factors from the last
+        RECOMMENDATION_FOLD_IN_MAX_ITEMS ratings, so new users get personalized recommendations
+        immediately and the cost of an update stays bounded.
 
         Args:
-        dataset (Dataset): The Surprise dataset.
+        user_id: The user's ID.
+        advice_name (str): The advice the event refers to.
+        advice_objects (dict): A dictionary of advice objects.
+        counter (str): The counter to increment: 'showed_count', 'agreed_count' or 'completed_count'.
+        """
+        advice = advice_objects[advice_name]
+        setattr(advice, counter, getattr(advice, counter) + 1)
 
-        Returns:
-        SVD: The trained SVD model.
-        """
-        trainset, testset = train_test_split(dataset, test_size=self.test_size)
-        model = SVD()
-        model.fit(trainset)
-        predictions = model.test(testset)
-        accuracy.rmse(predictions)
-        return model
-    
-    def _get_surprise_recommendations(self, model, advice_objects, user_id='user'):
+        model = self._get_factorization_model()
+        if model is None or advice_name not in model.advice_index:
+            return
+        state = self.user_states.get(user_id)
+        if state is None:
+            state = {'ratings': collections.OrderedDict(), 'vector': None}
+            self.user_states.set(user_id, state)
+        ratings = state['ratings']
+        item_row = model.advice_index[advice_name]
+        ratings[item_row] = max(ratings.pop(item_row, 0), self.event_ratings[counter])
+        while len(ratings) > Config.RECOMMENDATION_FOLD_IN_MAX_ITEMS:
+            ratings.popitem(last=False)
+
+        prior_vector, prior_bias = model.user_vector(user_id) if user_id in model else (None, 0.0)
+        with instrumentation.timer('recommendation', 'fold_in'):
+            state['vector'] = model.fold_in(
+                np.fromiter(ratings.keys(), dtype=np.int64, count=len(ratings)),
+                np.fromiter(ratings.values(), dtype=np.float64, count=len(ratings)),
+                prior_vector,
+                prior_bias,
+                regularization=Config.RECOMMENDATION_FOLD_IN_REGULARIZATION,
+                steps=Config.RECOMMENDATION_FOLD_IN_STEPS
+            )
+        instrumentation.increment('recommendation', f"events_{counter}")
+
+    def recommend(self, user_categories, user_category_impact, advice_objects, user_id=None, k=1):
         """
-        Get recommendations for the user.
+        Recommend the k best advice for a user without any training on the request path.
+
+        Users known to the offline factorization model, or folded in from recorded events, are
+        ranked by their predicted ratings, restricted to the given advice set. Other users, or all users when no model has been
+        trained, are ranked by their content-based advice scores.
 
         Args:
-        model (SVD): The trained SVD model.
+        user_categories (list of str): List of categories the user likes.
+        user_category_impact (dict): A dictionary mapping category names to their impact on the user.
         advice_objects (dict): A dictionary of advice objects.
-        user_id (str): The user's ID.
+        user_id (optional): The user's ID in the factorization model.
+        k (int): The number of advice to return.
 
         Returns:
-        str: The name of the best advice.
+        list of str: The names of the best advice, best first.
         """
-        recommendations = []
-        for advice_name in advice_objects.keys():
-            prediction = model.predict(user_id, advice_name)
-            recommendations.append((prediction.iid, prediction.est))
-        best_advice = max(recommendations, key=lambda x: x[1])[0] 
-        return best_advice
-    
-    def get_recommendations(self, user_categories, user_category_impact, advice_objects):
+        catalogue = self._get_catalogue(advice_objects)
+        model = self._get_factorization_model()
+        user_vector = self._user_vector(model, user_id)
+        if user_vector is not None:
+            candidates = self._candidate_indices(model, catalogue)
+            if len(candidates):
+                instrumentation.increment('recommendation', 'factorization_requests')
+                with instrumentation.timer('recommendation', 'svd_predict'):
+                    return model.top_k(*user_vector, k, candidates)
+
+        instrumentation.increment('recommendation', 'content_requests')
+        with instrumentation.timer('recommendation', 'content_score'):
+            scores = self._total_scores([(user_categories, user_category_impact)], advice_objects)[0]
+            k = min(k, len(scores))
+            if k <= 0:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind='stable')]
+        return [catalogue.advice_names[index] for index in best]
+
+    def get_recommendations(self, user_categories, user_category_impact, advice_objects, user_id=None):
         """
         Get recommendations based on user preferences and past interactions with advice.
 
@@ -123,11 +256,11 @@ class RecommendationService:
         user_categories (list of str): List of categories the user likes.
         user_category_impact (dict): A dictionary mapping category names to their impact on the user.
         advice_objects (dict): A dictionary of advice objects.
+        user_id (optional): The user's ID in the factorization model, see recommend.
 
         Returns:
         str: The name of the best advice.
         """
-        surprise_data = self._prepare_surprise_data(user_categories, user_category_impact, advice_objects)
-        surprise_dataset = self._create_surprise_dataset(surprise_data)
-        model = self._train_and_evaluate_surprise_model(surprise_dataset)
-        return self._get_surprise_recommendations(model, advice_objects)
+        recommendations = self.recommend(user_categories, user_category_impact, advice_objects, user_id=user_id)
+        return recommendations[0] if recommendations else None
+
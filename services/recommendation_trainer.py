@@ -0,0 +1,148 @@
+"""
+Offline training of the global advice factorization model served by RecommendationService.
+
+Usage (from the repository root):
+    python -m services.recommendation_trainer --users users.jsonl --advice advice.json [--output recommendation_model]
+
+users.jsonl holds one {"user_id", "categories", "category_impact"} object per line and advice.json
+maps every advice name to {"categories", "showed_count", "agreed_count", "completed_count"}.
+"""
+import argparse
+import itertools
+import json
+import logging
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from surprise import Dataset, Reader, SVD, accuracy
+from surprise.model_selection import train_test_split
+
+from core.config import Config
+from core.instrumentation import instrumentation
+from services.factorization_model import save_factorization_model
+from services.reccomendation_service import RecommendationService
+
+logger = logging.getLogger(__name__)
+
+
+def build_ratings(users, advice_objects, batch_size=None):
+    """
+    Rate the advice relevant to every user, a batch of users at a time.
+
+    An advice is relevant to a user when it shares a category with the user's liked or
+    impactful categories; the other advice carry no signal about the user.
+
+    Args:
+    users (iterable): (user_id, user_categories, user_category_impact) triples.
+    advice_objects (dict): A dictionary of advice objects.
+    batch_size (int, optional): The number of users scored together. Defaults to RECOMMENDATION_TRAIN_BATCH_SIZE.
+
+    Returns:
+    DataFrame: The userID, itemID and rating columns.
+    """
+    service = RecommendationService()
+    batch_size = batch_size or Config.RECOMMENDATION_TRAIN_BATCH_SIZE
+    user_ids, item_ids, ratings = [], [], []
+    users = iter(users)
+    while True:
+        batch = list(itertools.islice(users, batch_size))
+        if not batch:
+            break
+        profiles = [(user_categories, user_category_impact) for _, user_categories, user_category_impact in batch]
+        batch_ratings = service.score_advice(profiles, advice_objects)
+        catalogue = service.catalogue
+        touched = np.stack([
+            (catalogue.category_vector(user_category_impact) != 0) | (catalogue.category_vector(user_categories) != 0)
+            for user_categories, user_category_impact in profiles
+        ], axis=1)
+        relevant = (catalogue.matrix @ touched.astype(np.float64)).T > 0
+        for row, (user_id, _, _) in enumerate(batch):
+            columns = np.flatnonzero(relevant[row])
+            user_ids.extend([user_id] * len(columns))
+            item_ids.extend(catalogue.advice_names[column] for column in columns)
+            ratings.extend(batch_ratings[row, columns].tolist())
+    return pd.DataFrame({'userID': user_ids, 'itemID': item_ids, 'rating': ratings})
+
+
+def train_recommendation_model(users, advice_objects, path=None):
+    """
+    Train one SVD model over all users' advice ratings and persist its factor matrices.
+
+    The model is evaluated on a held-out split first, then refitted on all ratings.
+
+    Args:
+    users (iterable): (user_id, user_categories, user_category_impact) triples.
+    advice_objects (dict): A dictionary of advice objects.
+    path (str, optional): The model directory. Defaults to RECOMMENDATION_MODEL_PATH.
+
+    Returns:
+    float: The RMSE on the held-out ratings.
+    """
+    path = path or Config.RECOMMENDATION_MODEL_PATH
+    rating_scale = (Config.RECOMMENDATION_MIN_SCALE, Config.RECOMMENDATION_MAX_SCALE)
+    ratings = build_ratings(users, advice_objects)
+    if ratings.empty:
+        raise ValueError("No user shares a category with any advice, there is nothing to train on.")
+    dataset = Dataset.load_from_df(ratings[['userID', 'itemID', 'rating']], Reader(rating_scale=rating_scale))
+
+    def new_model():
+        return SVD(n_factors=Config.RECOMMENDATION_N_FACTORS, n_epochs=Config.RECOMMENDATION_N_EPOCHS, random_state=Config.RECOMMENDATION_RANDOM_STATE)
+
+    trainset, testset = train_test_split(dataset, test_size=Config.RECCOMENDATION_TEST_SIZE, random_state=Config.RECOMMENDATION_RANDOM_STATE)
+    with instrumentation.timer('recommendation_trainer', 'svd_evaluate'):
+        rmse = accuracy.rmse(new_model().fit(trainset).test(testset), verbose=False)
+    instrumentation.set_gauge('recommendation_trainer', 'heldout_rmse', rmse)
+    logger.info("Held-out RMSE over %d ratings: %.4f", len(testset), rmse)
+
+    trainset = dataset.build_full_trainset()
+    with instrumentation.timer('recommendation_trainer', 'svd_fit'):
+        model = new_model().fit(trainset)
+    save_factorization_model(
+        path,
+        user_ids=[trainset.to_raw_uid(inner_id) for inner_id in range(trainset.n_users)],
+        advice_names=[trainset.to_raw_iid(inner_id) for inner_id in range(trainset.n_items)],
+        user_factors=model.pu,
+        item_factors=model.qi,
+        user_biases=model.bu,
+        item_biases=model.bi,
+        global_mean=trainset.global_mean,
+        rating_scale=rating_scale
+    )
+    logger.info("Saved a model of %d users and %d advice to %s.", trainset.n_users, trainset.n_items, path)
+    return rmse
+
+
+def load_advice(path):
+    with open(path, encoding='utf-8') as f:
+        return {
+            advice_name: SimpleNamespace(
+                categories=fields['categories'],
+                showed_count=fields.get('showed_count', 0),
+                agreed_count=fields.get('agreed_count', 0),
+                completed_count=fields.get('completed_count', 0)
+            )
+            for advice_name, fields in json.load(f).items()
+        }
+
+
+def load_users(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['user_id'], record.get('categories', []), record.get('category_impact', {})
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', required=True)
+    parser.add_argument('--advice', required=True)
+    parser.add_argument('--output', default=Config.RECOMMENDATION_MODEL_PATH)
+    args = parser.parse_args()
+    train_recommendation_model(load_users(args.users), load_advice(args.advice), args.output)
+
+
+if __name__ == '__main__':
+    main()
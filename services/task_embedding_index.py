@@ -0,0 +1,259 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class TaskEmbeddingIndex:
+    def __init__(self, path: str, dimension: int, model_name: str, initial_capacity: int = 1024):
+        """
+        Open (or create) an on-disk index of task embeddings keyed by task_id.
+
+        Vectors are stored in a memory-mapped float32 .npy file; task ids, rows and content hashes
+        live in a JSON metadata file next to it, which also names the current vector file. Rows of
+        deleted tasks are reused by later inserts.
+
+        Updates write the vectors of new and changed tasks into rows the current metadata does not
+        reference, in place, and then move a new metadata file into place with os.replace, so a
+        crash leaves either the old or the new index on disk. Only when the rows run out is the
+        vector file copied into a new one of twice the capacity. Updates run under an exclusive
+        file lock and first reload changes made by other processes, so workers sharing the
+        directory do not overwrite each other's updates.
+
+        search reads one immutable snapshot of the index, so it may run concurrently with updates.
+
+        Args:
+        path (str): The directory holding the index files.
+        dimension (int): The dimension of the task embeddings.
+        model_name (str): The encoder the vectors were computed with. An index built with another
+            encoder or dimension is discarded.
+        initial_capacity (int): The number of rows allocated for a new index.
+        """
+        self.path = path
+        self.dimension = dimension
+        self.model_name = model_name
+        self.initial_capacity = initial_capacity
+        self.metadata_path = os.path.join(path, 'metadata.json')
+        self.lock_path = os.path.join(path, 'index.lock')
+        self.vectors = None
+        self.vectors_file = None
+        self.generation = None
+        self._metadata_stamp = None
+        self._snapshot = None
+        os.makedirs(path, exist_ok=True)
+        with self._locked():
+            pass
+
+    def _load(self, metadata):
+        """
+        Adopt the state described by the metadata, or an empty index if it is missing or was built
+        with another encoder or dimension.
+        """
+        vectors_file = metadata.get('vectors_file', 'vectors.npy') if metadata else None
+        vectors_path = os.path.join(self.path, vectors_file) if metadata else None
+        if metadata and metadata['model_name'] == self.model_name and metadata['dimension'] == self.dimension and os.path.exists(vectors_path):
+            # Writes to the current file happen in place, so its mapping stays valid.
+            vectors = self.vectors if vectors_file == self.vectors_file else np.load(vectors_path, mmap_mode='r+')
+            entries = {task_id: (row, content_hash) for task_id, (row, content_hash) in metadata['entries'].items()}
+            free_rows, size, generation = metadata['free_rows'], metadata['size'], metadata.get('generation', 0)
+        else:
+            vectors_file = None
+            vectors = np.zeros((0, self.dimension), dtype=np.float32)
+            entries, free_rows, size = {}, [], 0
+            # A discarded index keeps its generation, so that the next write does not reuse its file names.
+            generation = metadata.get('generation', 0) if metadata else None
+        row_task_ids = [None] * vectors.shape[0]
+        for task_id, (row, _) in entries.items():
+            row_task_ids[row] = task_id
+
+        self.vectors, self.vectors_file, self.generation = vectors, vectors_file, generation
+        self.entries, self.free_rows, self.size = entries, free_rows, size
+        self._snapshot = (vectors, entries, row_task_ids)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        Hold the exclusive lock of the index directory and reload the index if another process changed it.
+
+        Every call opens the lock file anew, so the lock also serializes the threads of a process.
+        """
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._reload()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reload(self):
+        """
+        Load the index from disk unless the loaded state is the one described by the metadata file.
+        Must be called under the lock, which keeps writers from removing the vector file meanwhile.
+        """
+        stamp = self._stamp()
+        if self._snapshot is not None and stamp == self._metadata_stamp:
+            return
+        metadata = self._read_metadata()
+        if self._snapshot is None or (metadata.get('generation', 0) if metadata else None) != self.generation:
+            self._load(metadata)
+        self._metadata_stamp = stamp
+
+    def _stamp(self):
+        """
+        Identify the version of the metadata file; os.replace gives every version a new inode.
+        """
+        try:
+            status = os.stat(self.metadata_path)
+        except OSError:
+            return None
+        return status.st_ino, status.st_mtime_ns, status.st_size
+
+    def _read_metadata(self):
+        try:
+            with open(self.metadata_path, encoding='utf-8') as metadata_file:
+                return json.load(metadata_file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """
+        Hash the text a task vector is computed from.
+        """
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, task_id):
+        return task_id in self.entries
+
+    def is_stale(self, task_id: str, content_hash: str) -> bool:
+        """
+        Check whether the task is missing from the index or was indexed with different content.
+        """
+        entry = self.entries.get(task_id)
+        return entry is None or entry[1] != content_hash
+
+    def upsert(self, task_ids: List[str], content_hashes: List[str], vectors: np.ndarray):
+        """
+        Add new tasks or overwrite the vectors of changed ones, and write the index to disk.
+
+        Args:
+        task_ids (list of str): The task ids.
+        content_hashes (list of str): The content hash of every task.
+        vectors (ndarray): The task embeddings, one row per task.
+        """
+        # The last occurrence of a task wins.
+        updates = dict(zip(task_ids, zip(content_hashes, vectors)))
+        with self._locked():
+            entries, free_rows, size = dict(self.entries), list(self.free_rows), self.size
+            # A changed task gets a new row too, so that the rows of the current metadata stay intact.
+            needed = size + max(0, len(updates) - len(free_rows))
+            if self.vectors_file is None or needed > self.vectors.shape[0]:
+                target = self._new_vectors_file(max(needed, 2 * self.vectors.shape[0], self.initial_capacity), size)
+            else:
+                target = self.vectors
+
+            released = []
+            for task_id, (content_hash, vector) in updates.items():
+                if task_id in entries:
+                    released.append(entries[task_id][0])
+                if free_rows:
+                    row = free_rows.pop()
+                else:
+                    row = size
+                    size += 1
+                target[row] = vector
+                entries[task_id] = (row, content_hash)
+            target.flush()
+            self._write(target, entries, free_rows + released, size)
+
+    def delete(self, task_id: str):
+        """
+        Remove a task from the index and write the index to disk. Its row is reused by a later insert.
+        """
+        with self._locked():
+            if task_id not in self.entries:
+                return
+            entries = dict(self.entries)
+            row, _ = entries.pop(task_id)
+            self._write(self.vectors, entries, self.free_rows + [row], self.size)
+
+    def search(self, query_vector: np.ndarray, top_k: int, task_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Find the tasks whose vectors are most similar to the query by cosine similarity.
+
+        Args:
+        query_vector (ndarray): The L2-normalized query embedding.
+        top_k (int): The number of results.
+        task_ids (iterable of str, optional): Restrict the search to these tasks. Defaults to all indexed tasks.
+
+        Returns:
+        list of tuple: (task_id, score) pairs sorted by descending score.
+        """
+        if self._stamp() != self._metadata_stamp:
+            with self._locked():
+                pass
+        vectors, entries, row_task_ids = self._snapshot
+        if task_ids is None:
+            rows = np.fromiter((row for row, _ in entries.values()), dtype=np.int64)
+        else:
+            rows = np.fromiter((entries[task_id][0] for task_id in task_ids if task_id in entries), dtype=np.int64)
+        if rows.size == 0:
+            return []
+
+        scores = vectors[rows] @ query_vector
+        top_k = min(top_k, rows.size)
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(row_task_ids[rows[i]], float(scores[i])) for i in best]
+
+    def _new_vectors_file(self, capacity: int, size: int) -> np.ndarray:
+        """
+        Create the vector file of the next generation with the given capacity and the first size
+        rows of the current one. Must be called under the lock.
+        """
+        vectors_file = f"vectors.{(self.generation or 0) + 1}.npy"
+        vectors_path = os.path.join(self.path, vectors_file)
+        written = np.lib.format.open_memmap(vectors_path + '.tmp', mode='w+', dtype=np.float32, shape=(capacity, self.dimension))
+        written[:size] = self.vectors[:size]
+        written.flush()
+        del written
+        os.replace(vectors_path + '.tmp', vectors_path)
+        return np.load(vectors_path, mmap_mode='r+')
+
+    def _write(self, vectors: np.ndarray, entries: dict, free_rows: List[int], size: int):
+        """
+        Write the metadata of a new generation and switch to it. Must be called under the lock.
+
+        The vectors are already on disk, in the current file or in a new one; replacing the
+        metadata switches readers to them in one step, and a previous vector file is removed afterwards.
+        """
+        generation = (self.generation or 0) + 1
+        vectors_file = os.path.basename(vectors.filename)
+        metadata = {
+            'model_name': self.model_name,
+            'dimension': self.dimension,
+            'generation': generation,
+            'vectors_file': vectors_file,
+            'size': size,
+            'free_rows': free_rows,
+            'entries': {task_id: list(entry) for task_id, entry in entries.items()},
+        }
+        tmp_path = self.metadata_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as metadata_file:
+            json.dump(metadata, metadata_file)
+            metadata_file.flush()
+            os.fsync(metadata_file.fileno())
+        os.replace(tmp_path, self.metadata_path)
+
+        self._load(metadata)
+        self._metadata_stamp = self._stamp()
+        for file_name in os.listdir(self.path):
+            if file_name.startswith('vectors') and file_name != vectors_file:
+                os.remove(os.path.join(self.path, file_name))
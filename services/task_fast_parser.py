@@ -0,0 +1,235 @@
+import datetime
+import re
+
+DAY_OFFSETS = {
+    'сегодня': 0, 'today': 0,
+    'завтра': 1, 'tomorrow': 1,
+    'послезавтра': 2, 'day after tomorrow': 2,
+}
+
+WEEKDAYS = {
+    'понедельник': 0, 'вторник': 1, 'среду': 2, 'среда': 2, 'четверг': 3, 'пятницу': 4, 'пятница': 4,
+    'субботу': 5, 'суббота': 5, 'воскресенье': 6,
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+
+MONTHS = {
+    'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4, 'мая': 5, 'июня': 6, 'июля': 7, 'августа': 8,
+    'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12,
+}
+
+# Ordered so that longer phrases are claimed first ("не срочно" before "срочно").
+PRIORITIES = [
+    ('none', r'без приоритета|no priority'),
+    ('low', r'низк\w* приоритет\w*|приоритет\w*:? низк\w*|low priority|priority:? low|не срочно'),
+    ('medium', r'средн\w* приоритет\w*|приоритет\w*:? средн\w*|medium priority|priority:? medium|normal priority'),
+    ('high', r'(?:высок\w*|срочн\w*) приоритет\w*|приоритет\w*:? высок\w*|high priority|priority:? high|срочно|urgent(?:ly)?'),
+]
+
+
+def _alternation(words):
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+DAY_PATTERN = re.compile(rf'\b(?:{_alternation(DAY_OFFSETS)})\b')
+WEEKDAY_PATTERN = re.compile(rf'\b(?:(?:в|во|on)\s+)?({_alternation(WEEKDAYS)})\b')
+ISO_DATE_PATTERN = re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b')
+DOTTED_DATE_PATTERN = re.compile(r'\b(\d{1,2})\.(\d{1,2})(?:\.(\d{4}|\d{2}))?\b')
+NAMED_DATE_PATTERN = re.compile(rf'\b(\d{{1,2}})\s+({_alternation(MONTHS)})(?:\s+(\d{{4}}))?\b')
+TIME_PATTERN = re.compile(
+    r'(?:\b(?:в|к|at|by)\s+)?\b(\d{1,2})(?::(\d{2})|\s*(am|pm)\b)'
+    r'|\b(?:в|к|at|by)\s+(\d{1,2})\b(?:\s*(утра|дня|вечера|ночи)\b)?'
+)
+DURATION_PATTERN = re.compile(
+    r'\b(?:(потратил[аи]?|потрачено|spent|уже)\s+)?(?:(?:на|за|займ[её]т|примерно|около|for|about|takes?)\s+)?'
+    r'(\d+(?:[.,]\d+)?)\s*(минуты|минуту|минут|мин|minutes|minute|mins|min|часов|часа|час|ч|hours|hour|hrs|h)(?!\w)'
+)
+PRIORITY_PATTERNS = [(priority, re.compile(rf'\b(?:{pattern})\b')) for priority, pattern in PRIORITIES]
+
+# Words that hint at a deadline, duration or priority the rules above did not understand.
+UNPARSED_HINTS = re.compile(
+    r'\b(?:приоритет\w*|priority|дедлайн\w*|deadline|due|до|через|к|by|until|next|'
+    r'утр\w*|вечер\w*|дн[её]м|ноч\w*|полдень|полночь|morning|evening|night|tonight|noon|midnight|'
+    r'недел\w*|месяц\w*|week|month|понедельник\w*|вторник\w*|сред[аыу]|четверг\w*|пятниц\w*|суббот\w*|воскресень\w*|'
+    r'январ\w*|феврал\w*|март\w*|апрел\w*|июн\w*|июл\w*|август\w*|сентябр\w*|октябр\w*|ноябр\w*|декабр\w*|'
+    r'минут\w*|час\w*|полчаса|hours?|minutes?|срочн\w*|важн\w*)\b'
+)
+DANGLING_WORDS = {'в', 'во', 'на', 'к', 'до', 'за', 'и', 'с', 'по', 'at', 'on', 'by', 'for', 'and', 'in', 'to'}
+SEPARATORS = ' ,;:.-–—!'
+
+
+class FastTaskParser:
+    def __init__(self, max_title_words=8):
+        """
+        Initialize the rule-based parser for short, simple task descriptions in Russian or English.
+
+        Args:
+        max_title_words (int): The maximum number of words of a title that is accepted without the LLM.
+        """
+        self.max_title_words = max_title_words
+
+    def parse(self, text, now=None):
+        """
+        Parse a task description when every field can be extracted confidently.
+
+        Relative dates ("завтра в 10", "tomorrow at 7pm", "в пятницу в 18:30") are resolved against now.
+        A missing priority is "none" and missing durations are None, but a day without a time, a time
+        without a day, conflicting matches or leftover words that look like an unparsed deadline,
+        duration or priority make the parser give up.
+
+        Args:
+        text (str): The text input from the user describing the task.
+        now (datetime, optional): The reference time for relative dates. Defaults to the current time.
+
+        Returns:
+        dict: The parsed fields of the task in the same shape as the LLM parser, or None if the
+        text is not simple enough to be parsed without the LLM.
+        """
+        now = now or datetime.datetime.now()
+        text = ' '.join(text.split())
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            return None
+        spans = []
+
+        priority = self._parse_priority(lowered, spans)
+        if priority is False:
+            return None
+        durations = self._parse_durations(lowered, spans)
+        if durations is None:
+            return None
+        deadline = self._parse_deadline(lowered, spans, now)
+        if deadline is False:
+            return None
+
+        title = self._title(text, spans)
+        if title is None:
+            return None
+
+        return {
+            "title": title,
+            "description": None,
+            "deadline": deadline.strftime('%Y-%m-%dT%H:%M') if deadline else None,
+            "priority": priority,
+            "estimated_time": durations['estimated'],
+            "spent_time": durations['spent'],
+        }
+
+    @staticmethod
+    def _claim(match, spans):
+        """
+        Record the span of a match unless it overlaps an already claimed span.
+        """
+        start, end = match.span()
+        if any(start < claimed_end and claimed_start < end for claimed_start, claimed_end in spans):
+            return False
+        spans.append((start, end))
+        return True
+
+    def _parse_priority(self, lowered, spans):
+        found = set()
+        for priority, pattern in PRIORITY_PATTERNS:
+            for match in pattern.finditer(lowered):
+                if self._claim(match, spans):
+                    found.add(priority)
+        if len(found) > 1:
+            return False
+        return found.pop() if found else 'none'
+
+    def _parse_durations(self, lowered, spans):
+        durations = {'estimated': None, 'spent': None}
+        for match in DURATION_PATTERN.finditer(lowered):
+            if not self._claim(match, spans):
+                continue
+            kind = 'spent' if match.group(1) else 'estimated'
+            if durations[kind] is not None:
+                return None
+            minutes = float(match.group(2).replace(',', '.'))
+            if match.group(3).startswith(('ч', 'h')):
+                minutes *= 60
+            durations[kind] = int(round(minutes))
+        return durations
+
+    def _parse_deadline(self, lowered, spans, now):
+        """
+        Returns:
+        datetime: The deadline, None if the text mentions none, or False if it is ambiguous.
+        """
+        days = []
+        for match in DAY_PATTERN.finditer(lowered):
+            if self._claim(match, spans):
+                days.append(now.date() + datetime.timedelta(days=DAY_OFFSETS[match.group(0)]))
+        for match in WEEKDAY_PATTERN.finditer(lowered):
+            if self._claim(match, spans):
+                ahead = (WEEKDAYS[match.group(1)] - now.weekday()) % 7 or 7
+                days.append(now.date() + datetime.timedelta(days=ahead))
+        try:
+            for match in ISO_DATE_PATTERN.finditer(lowered):
+                if self._claim(match, spans):
+                    days.append(datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3))))
+            for match in NAMED_DATE_PATTERN.finditer(lowered):
+                if self._claim(match, spans):
+                    days.append(self._date_from_parts(now, int(match.group(1)), MONTHS[match.group(2)], match.group(3)))
+            for match in DOTTED_DATE_PATTERN.finditer(lowered):
+                if self._claim(match, spans):
+                    days.append(self._date_from_parts(now, int(match.group(1)), int(match.group(2)), match.group(3)))
+        except ValueError:
+            return False
+
+        times = []
+        for match in TIME_PATTERN.finditer(lowered):
+            if not self._claim(match, spans):
+                continue
+            if match.group(1) is not None:
+                hour, minute, suffix = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+            else:
+                hour, minute, suffix = int(match.group(4)), 0, match.group(5)
+            if suffix in ('pm', 'дня', 'вечера') and hour < 12:
+                hour += 12
+            elif suffix in ('am', 'утра', 'ночи') and hour == 12:
+                hour = 0
+            if hour > 23 or minute > 59:
+                return False
+            times.append(datetime.time(hour, minute))
+
+        if not days and not times:
+            return None
+        if len(days) != 1 or len(times) != 1:
+            return False
+        return datetime.datetime.combine(days[0], times[0])
+
+    @staticmethod
+    def _date_from_parts(now, day, month, year):
+        """
+        Build a date from day and month, using the next occurrence when the year is omitted.
+        """
+        if year is None:
+            date = datetime.date(now.year, month, day)
+            return date if date >= now.date() else date.replace(year=now.year + 1)
+        year = int(year)
+        return datetime.date(year + 2000 if year < 100 else year, month, day)
+
+    def _title(self, text, spans):
+        """
+        Build the title from the text that is left after removing the parsed fields.
+
+        Returns:
+        str: The title, or None if the leftover text does not look like a plain title.
+        """
+        pieces, position = [], 0
+        for start, end in sorted(spans):
+            pieces.append(text[position:start])
+            position = end
+        pieces.append(text[position:])
+        title = ' '.join(' '.join(piece.strip(SEPARATORS) for piece in pieces).split()).strip(SEPARATORS)
+
+        words = title.lower().split()
+        if not words or len(words) > self.max_title_words:
+            return None
+        if words[0] in DANGLING_WORDS or words[-1] in DANGLING_WORDS:
+            return None
+        if any(character.isdigit() for character in title) or UNPARSED_HINTS.search(title.lower()):
+            return None
+        if any(separator in title for separator in (';', '.', '?', '\n')):
+            return None
+        return title[0].upper() + title[1:]
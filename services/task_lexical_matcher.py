@@ -0,0 +1,83 @@
+import hashlib
+import threading
+from typing import List, Tuple
+
+import numpy as np
+
+
+class TaskLexicalMatcher:
+    def __init__(self, ngram_range=(3, 5), confidence=0.6, margin=0.15):
+        """
+        Initialize the TF-IDF matcher over character n-grams of the task texts.
+
+        Character n-grams within word boundaries are used so that Russian word forms
+        ("созвон" / "созвона") still share most of their features.
+
+        Args:
+        ngram_range (tuple): The range of character n-gram lengths.
+        confidence (float): The minimum cosine similarity of the best task for a confident match.
+        margin (float): The minimum lead of the best task over the runner-up for a confident match.
+        """
+        self.ngram_range = ngram_range
+        self.confidence = confidence
+        self.margin = margin
+        self._fingerprint = None
+        self._vectorizer = None
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def _fit(self, texts: List[str]):
+        """
+        Fit the vectorizer on the task texts unless it was already fitted on exactly these texts.
+        Texts without any n-gram (e.g. all empty) leave the matcher without a vocabulary.
+
+        Returns:
+        tuple: The vectorizer and the TF-IDF matrix of the texts, both None without a vocabulary.
+        """
+        fingerprint = hashlib.sha1('\x1e'.join(texts).encode('utf-8')).digest()
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return self._vectorizer, self._matrix
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            self._vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=self.ngram_range, sublinear_tf=True, dtype=np.float32)
+            try:
+                self._matrix = self._vectorizer.fit_transform(texts)
+            except ValueError:
+                # Raised by the vectorizer for an empty vocabulary.
+                self._vectorizer = self._matrix = None
+            self._fingerprint = fingerprint
+            return self._vectorizer, self._matrix
+
+    def rank(self, query: str, texts: List[str], top_k: int) -> List[Tuple[int, float]]:
+        """
+        Rank texts by the cosine similarity of their TF-IDF vectors to the query.
+
+        Args:
+        query (str): The user input.
+        texts (list of str): The task texts.
+        top_k (int): The number of results.
+
+        Returns:
+        list of tuple: (text index, score) pairs sorted by descending score. Empty if the texts
+        have no n-grams to compare.
+        """
+        if not texts:
+            return []
+        vectorizer, matrix = self._fit(texts)
+        if matrix is None:
+            return []
+        scores = (matrix @ vectorizer.transform([query]).T).toarray().ravel()
+        top_k = min(top_k, scores.size)
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(i), float(scores[i])) for i in best]
+
+    def is_confident(self, ranked: List[Tuple[int, float]]) -> bool:
+        """
+        Decide whether the best lexical match can be returned without the neural scorer.
+        """
+        if not ranked or ranked[0][1] <= self.confidence:
+            return False
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return ranked[0][1] - runner_up >= self.margin
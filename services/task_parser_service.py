@@ -1,31 +1,109 @@
-import openai
+import asyncio
+import contextlib
+import datetime
 import json
+import logging
+import time
 from core.private_config import PrivateConfig
 from core.config import Config
-from task_search_service import TaskSearchService 
+from core.instrumentation import instrumentation
+from core.lru_cache import LRUCache
+from services.llm_client import AsyncLLMClient, LLMError
+from services.task_fast_parser import FastTaskParser
+from services.task_stream_parser import TASK_FIELDS, IncrementalTaskParser
+
+logger = logging.getLogger(__name__)
 
 class TaskParserService:
     def __init__(self):
         """
         Initialize the TaskParserService with the OpenAI API key and configuration parameters.
+        The openai module and the task search model are loaded on first use.
         """
-        openai.api_key = PrivateConfig.TASK_PARSER_OPEN_AI_API_KEY
         self.engine = Config.TASK_PARSER_ENGINE
         self.create_prompt_template = Config.TASK_PARSER_CREATE_PROMPT
         self.edit_prompt_template = Config.TASK_PARSER_EDIT_PROMPT
         self.max_tokens = Config.TASK_PARSER_MAX_TOKENS
-        self.task_search_service = TaskSearchService()
+        self._task_search_service = None
+        self.fast_parser = FastTaskParser(Config.TASK_PARSER_FAST_PATH_MAX_TITLE_WORDS) if Config.TASK_PARSER_FAST_PATH_ENABLED else None
+        self.response_cache = LRUCache(Config.TASK_PARSER_CACHE_SIZE, Config.TASK_PARSER_CACHE_TTL_SECONDS)
+        self.counters = {'create_requests': 0, 'fast_path_hits': 0, 'fast_path_seconds': 0.0, 'llm_calls': 0, 'llm_seconds': 0.0}
+
+    @property
+    def task_search_service(self):
+        """
+        The TaskSearchService used by edit_task, created on first use.
+        """
+        if self._task_search_service is None:
+            from services.task_search_service import TaskSearchService
+            self._task_search_service = TaskSearchService()
+        return self._task_search_service
+
+    @staticmethod
+    def _openai():
+        """
+        Import and configure the openai module used by the synchronous create_task and edit_task.
+        """
+        import openai
+        openai.api_key = PrivateConfig.TASK_PARSER_OPEN_AI_API_KEY
+        openai.api_base = Config.TASK_PARSER_API_BASE
+        return openai
+
+    @staticmethod
+    def _warm_up_client(openai):
+        """
+        Build the openai client's request headers, import its response object classes and open the
+        keep-alive connection of the calling thread's session, so that the first completion does not
+        pay for them. Building the headers runs `uname` in a subprocess.
+
+        The connection is opened with an authenticated request for the model list, which costs no
+        tokens. openai<1 keeps one requests session per thread, so this helps requests made on the
+        thread that called warmup. It relies on openai<1 internals and is skipped for other versions.
+        """
+        try:
+            if not hasattr(openai, 'api_requestor'):
+                return
+            requestor = openai.api_requestor
+            headers = requestor.APIRequestor().request_headers('get', {}, None)
+            openai.util.convert_to_openai_object({'object': 'text_completion'})
+            if not hasattr(requestor._thread_context, 'session'):
+                requestor._thread_context.session = requestor._make_session()
+                requestor._thread_context.session_create_time = time.time()
+            requestor._thread_context.session.get(f"{openai.api_base.rstrip('/')}/models", headers=headers, timeout=Config.TASK_PARSER_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning("Could not warm up the openai client for %s: %s", openai.api_base, e)
+
+    def warmup(self, search=True, all_tasks=None):
+        """
+        Import the LLM clients, run the fast path once and, for edit requests, warm up task search,
+        so that the first request does not pay for imports and model loading.
+
+        Args:
+        search (bool): Whether to load the task search model used by edit_task.
+        all_tasks (list, optional): The tasks that will be edited, see TaskSearchService.warmup.
+        """
+        self._warm_up_client(self._openai())
+        if self.fast_parser is not None:
+            self.fast_parser.parse("Купить молоко завтра в 10:00")
+        if search:
+            self.task_search_service.warmup(all_tasks)
 
     def create_task(self, user_input):
         """
         Parse the user input to create a new task.
 
+        Simple inputs are parsed locally when every field can be extracted confidently;
+        everything else goes to the LLM, whose results are cached by normalized prompt.
+
         Args:
         user_input (str): The text input from the user describing the task.
 
         Returns:
         dict: A dictionary containing the parsed fields of the task.
         """
+        parsed_task = self._fast_parse(user_input)
+        if parsed_task:
+            return parsed_task
         return self._parse_task(user_input, self.create_prompt_template)
 
     def edit_task(self, user_input, all_tasks):
@@ -41,35 +119,260 @@ class TaskParserService:
         """
         previous_task_info = self._find_task_info(user_input, all_tasks)
         if previous_task_info:
-            prompt = self.edit_prompt_template.format(previous_task_info=previous_task_info, text=user_input)
-            parsed_task = self._parse_task(prompt, self.edit_prompt_template)
+            parsed_task = self._parse_task(user_input, self.edit_prompt_template, previous_task_info=previous_task_info)
+            if parsed_task:
+                parsed_task['id'] = previous_task_info['task_id']
+                return parsed_task
+        return None
+
+    async def create_tasks(self, user_inputs):
+        """
+        Parse many user inputs concurrently to create new tasks.
+
+        Args:
+        user_inputs (list of str): The text inputs from the user describing the tasks.
+
+        Returns:
+        list of dict: The parsed fields of every task, or None where parsing failed, in input order.
+        """
+        async with self._llm_client() as client:
+            return await asyncio.gather(*(self._create_task_async(client, user_input) for user_input in user_inputs))
+
+    async def edit_tasks(self, edits):
+        """
+        Parse many user inputs concurrently to edit existing tasks.
+
+        Args:
+        edits (list of tuple): (user_input, all_tasks) pairs, see edit_task.
+
+        Returns:
+        list of dict: The parsed fields and the task ID of every edited task, or None where no task
+        was found or parsing failed, in input order.
+        """
+        async with self._llm_client() as client:
+            return await asyncio.gather(*(self._edit_task_async(client, user_input, all_tasks) for user_input, all_tasks in edits))
+
+    async def stream_task(self, user_input):
+        """
+        Parse the user input to create a new task, yielding each field as soon as it is known.
+
+        The completion is streamed and parsed incrementally, and the generation is stopped as soon
+        as all fields are present. Inputs handled by the fast path or the response cache yield
+        all fields at once.
+
+        Args:
+        user_input (str): The text input from the user describing the task.
+
+        Yields:
+        tuple: (field, value) pairs in the order the fields are completed.
+        """
+        parsed_task = self._fast_parse(user_input)
+        prompt = self.create_prompt_template.format(text=user_input)
+        cache_key = self._cache_key(prompt)
+        if not parsed_task:
+            parsed_task = self.response_cache.get(cache_key)
+            if parsed_task:
+                instrumentation.increment('task_parser', 'cache_hits')
+        if parsed_task:
+            for field, value in parsed_task.items():
+                yield field, value
+            return
+
+        parser = IncrementalTaskParser()
+        start = time.perf_counter()
+        try:
+            async with self._llm_client() as client:
+                async with contextlib.aclosing(client.stream(prompt, self.engine, self.max_tokens)) as chunks:
+                    async for chunk in chunks:
+                        for field, value in parser.feed(chunk):
+                            yield field, value
+                        if parser.finished:
+                            break
+        except LLMError as e:
+            self._record_error('llm_errors', "Error calling OpenAI API: %s", e)
+            return
+        finally:
+            self._record_llm_call(start)
+        for error in parser.errors:
+            self._record_error('parse_errors', "Error parsing response: %s", error)
+        if parser.complete:
+            self.response_cache.set(cache_key, parser.result())
+
+    async def create_task_streaming(self, user_input, on_field=None):
+        """
+        Parse the user input to create a new task from a streamed completion.
+
+        Args:
+        user_input (str): The text input from the user describing the task.
+        on_field (callable, optional): Called with (field, value) as soon as each field is parsed.
+
+        Returns:
+        dict: A dictionary containing the parsed fields of the task, with fields missing from a
+        malformed completion set to None, or None if no field could be parsed.
+        """
+        parsed_task = {}
+        async for field, value in self.stream_task(user_input):
+            parsed_task[field] = value
+            if on_field is not None:
+                on_field(field, value)
+        if not parsed_task:
+            return None
+        return {field: parsed_task.get(field) for field in TASK_FIELDS}
+
+    def _llm_client(self):
+        return AsyncLLMClient(
+            Config.TASK_PARSER_API_BASE,
+            PrivateConfig.TASK_PARSER_OPEN_AI_API_KEY,
+            max_concurrency=Config.TASK_PARSER_MAX_CONCURRENCY,
+            timeout=Config.TASK_PARSER_TIMEOUT_SECONDS,
+            max_retries=Config.TASK_PARSER_MAX_RETRIES,
+            backoff_base=Config.TASK_PARSER_BACKOFF_BASE_SECONDS,
+            backoff_max=Config.TASK_PARSER_BACKOFF_MAX_SECONDS
+        )
+
+    def metrics(self):
+        """
+        Report how often the fast path and the response cache avoided an LLM call and the latency this saved.
+
+        Returns:
+        dict: The fast-path and cache hit counts and rates, the number and mean latency of LLM calls, and
+        the estimated latency saved (avoided calls times the mean LLM latency, minus the fast-path time).
+        """
+        counters = self.counters
+        cache = self.response_cache.stats()
+        mean_llm_latency = counters['llm_seconds'] / counters['llm_calls'] if counters['llm_calls'] else 0.0
+        return {
+            'create_requests': counters['create_requests'],
+            'fast_path_hits': counters['fast_path_hits'],
+            'fast_path_hit_rate': counters['fast_path_hits'] / counters['create_requests'] if counters['create_requests'] else 0.0,
+            'cache_hits': cache['hits'],
+            'cache_hit_rate': cache['hit_rate'],
+            'llm_calls': counters['llm_calls'],
+            'mean_llm_latency_seconds': mean_llm_latency,
+            'latency_saved_seconds': (counters['fast_path_hits'] + cache['hits']) * mean_llm_latency - counters['fast_path_seconds'],
+        }
+
+    def _fast_parse(self, user_input):
+        """
+        Try the rule-based parser on a create request.
+
+        Returns:
+        dict: The parsed fields of the task, or None if the input needs the LLM.
+        """
+        self.counters['create_requests'] += 1
+        if self.fast_parser is None:
+            return None
+        start = time.perf_counter()
+        parsed_task = self.fast_parser.parse(user_input)
+        elapsed = time.perf_counter() - start
+        self.counters['fast_path_seconds'] += elapsed
+        instrumentation.observe('task_parser', 'fast_path', elapsed)
+        if parsed_task:
+            self.counters['fast_path_hits'] += 1
+            instrumentation.increment('task_parser', 'fast_path_hits')
+        return parsed_task
+
+    def _cache_key(self, prompt):
+        # Relative dates in the prompt ("завтра") resolve differently on another day.
+        return (self.engine, datetime.date.today().isoformat(), ' '.join(prompt.lower().split()))
+
+    def _record_llm_call(self, start):
+        elapsed = time.perf_counter() - start
+        self.counters['llm_calls'] += 1
+        self.counters['llm_seconds'] += elapsed
+        instrumentation.observe('task_parser', 'llm_round_trip', elapsed)
+
+    @staticmethod
+    def _record_error(event, message, error):
+        instrumentation.increment('task_parser', event)
+        logger.error(message, error)
+
+    async def _create_task_async(self, client, user_input):
+        parsed_task = self._fast_parse(user_input)
+        if parsed_task:
+            return parsed_task
+        return await self._parse_task_async(client, user_input, self.create_prompt_template)
+
+    async def _edit_task_async(self, client, user_input, all_tasks):
+        # Task search runs the model, so it is kept off the event loop.
+        previous_task_info = await asyncio.to_thread(self._find_task_info, user_input, all_tasks)
+        if previous_task_info:
+            parsed_task = await self._parse_task_async(client, user_input, self.edit_prompt_template, previous_task_info=previous_task_info)
             if parsed_task:
                 parsed_task['id'] = previous_task_info['task_id']
                 return parsed_task
         return None
 
-    def _parse_task(self, text, prompt_template):
+    async def _parse_task_async(self, client, text, prompt_template, **prompt_fields):
+        """
+        Use the asynchronous LLM client to parse the task description.
+
+        Args:
+        client (AsyncLLMClient): The open client.
+        text (str): The text description of the task.
+        prompt_template (str): The template to format the prompt.
+        **prompt_fields: Extra fields of the prompt template.
+
+        Returns:
+        dict: A dictionary containing the parsed fields of the task.
+        """
+        prompt = prompt_template.format(text=text, **prompt_fields)
+        cache_key = self._cache_key(prompt)
+        cached_task = self.response_cache.get(cache_key)
+        if cached_task is not None:
+            instrumentation.increment('task_parser', 'cache_hits')
+            return dict(cached_task)
+        start = time.perf_counter()
+        try:
+            completion = await client.complete(prompt, self.engine, self.max_tokens)
+        except LLMError as e:
+            self._record_error('llm_errors', "Error calling OpenAI API: %s", e)
+            return None
+        finally:
+            self._record_llm_call(start)
+        return self._cache_parsed_task(cache_key, self._parse_completion_text(completion))
+
+    def _parse_task(self, text, prompt_template, **prompt_fields):
         """
         Use the OpenAI API to parse the task description.
 
         Args:
         text (str): The text description of the task.
         prompt_template (str): The template to format the prompt.
+        **prompt_fields: Extra fields of the prompt template.
 
         Returns:
         dict: A dictionary containing the parsed fields of the task.
         """
-        prompt = prompt_template.format(text=text)
+        prompt = prompt_template.format(text=text, **prompt_fields)
+        cache_key = self._cache_key(prompt)
+        cached_task = self.response_cache.get(cache_key)
+        if cached_task is not None:
+            instrumentation.increment('task_parser', 'cache_hits')
+            return dict(cached_task)
+        openai = self._openai()
+        start = time.perf_counter()
         try:
             response = openai.Completion.create(
                 engine=self.engine,
                 prompt=prompt,
                 max_tokens=self.max_tokens
             )
-            return self._parse_response(response)
+            return self._cache_parsed_task(cache_key, self._parse_response(response))
         except openai.error.OpenAIError as e:
-            print(f"Error calling OpenAI API: {e}")
+            self._record_error('llm_errors', "Error calling OpenAI API: %s", e)
             return None
+        finally:
+            self._record_llm_call(start)
+
+    def _cache_parsed_task(self, cache_key, parsed_task):
+        """
+        Cache a successfully parsed task and return a copy the caller may modify.
+        """
+        if parsed_task is None:
+            return None
+        self.response_cache.set(cache_key, parsed_task)
+        return dict(parsed_task)
 
     def _parse_response(self, response):
         """
@@ -82,7 +385,23 @@ class TaskParserService:
         dict: A dictionary containing the parsed fields of the task.
         """
         try:
-            task_data = json.loads(response.choices[0].text.strip())
+            return self._parse_completion_text(response.choices[0].text)
+        except (AttributeError, IndexError) as e:
+            self._record_error('parse_errors', "Error parsing response: %s", e)
+            return None
+
+    def _parse_completion_text(self, text):
+        """
+        Parse the completion text to extract task fields.
+
+        Args:
+        text (str): The completion text containing the task JSON.
+
+        Returns:
+        dict: A dictionary containing the parsed fields of the task.
+        """
+        try:
+            task_data = json.loads(text.strip())
             return {
                 "title": task_data.get("title"),
                 "description": task_data.get("description"),
@@ -91,8 +410,8 @@ class TaskParserService:
                 "estimated_time": task_data.get("estimated_time"),
                 "spent_time": task_data.get("spent_time")
             }
-        except (json.JSONDecodeError, AttributeError, IndexError) as e:
-            print(f"Error parsing response: {e}")
+        except (json.JSONDecodeError, AttributeError) as e:
+            self._record_error('parse_errors', "Error parsing response: %s", e)
             return None
 
     def _find_task_info(self, user_input, all_tasks):
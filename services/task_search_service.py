@@ -1,7 +1,13 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from typing import List, Dict, Optional
+import heapq
+import time
+from typing import Callable, List, Dict, Optional, Tuple
 from core.config import Config
+from core.inference_cache import inference_cache
+from core.instrumentation import instrumentation
+from core.model_registry import model_registry
+from core.text_encoder import TextEncoder
+from services.task_embedding_index import TaskEmbeddingIndex
+from services.task_lexical_matcher import TaskLexicalMatcher
 import logging
 
 # Set up logging
@@ -12,18 +18,273 @@ class TaskSearchService:
     def __init__(self):
         """
         Initialize the TaskSearchService with the specified model and configuration parameters.
+        The model is loaded on first use, see load_model_and_tokenizer.
+        """
+        self.model_name = Config.TASK_SEARCH_MODEL_NAME
+        self.tokenizer = None
+        self.model = None
+        self.entailment_index = None
+        self.threshold = Config.TASK_SEARCH_THRESHOLD
+        self.max_length = Config.TASK_SEARCH_MAX_TOKEN_LENGTH
+        self.padding = Config.TASK_SEARCH_PADDING_STRATEGY
+        self.batch_size = Config.TASK_SEARCH_BATCH_SIZE
+        self.top_k = Config.TASK_SEARCH_TOP_K
+        self.index_enabled = Config.TASK_SEARCH_INDEX_ENABLED
+        self.index_threshold = Config.TASK_SEARCH_INDEX_THRESHOLD
+        self.rerank_top_k = Config.TASK_SEARCH_RERANK_TOP_K
+        self.encoder = TextEncoder(Config.TASK_SEARCH_INDEX_MODEL_NAME)
+        self.index = None
+        self.lexical_enabled = Config.TASK_SEARCH_LEXICAL_ENABLED
+        self.lexical_candidates = Config.TASK_SEARCH_LEXICAL_CANDIDATES
+        self.lexical_matcher = TaskLexicalMatcher(
+            ngram_range=Config.TASK_SEARCH_LEXICAL_NGRAM_RANGE,
+            confidence=Config.TASK_SEARCH_LEXICAL_CONFIDENCE,
+            margin=Config.TASK_SEARCH_LEXICAL_MARGIN
+        )
+        self.stage_stats = {stage: {'calls': 0, 'answered': 0, 'seconds': 0.0} for stage in ('lexical', 'index', 'cross_encoder')}
+
+    def load_model_and_tokenizer(self):
+        """
+        Load the shared NLI model and its tokenizer from the model registry.
         """
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained(Config.TASK_SEARCH_MODEL_NAME)
-            self.model = AutoModelForSequenceClassification.from_pretrained(Config.TASK_SEARCH_MODEL_NAME)
+            self.tokenizer, self.model = model_registry.get(self.model_name)
             logger.info("Model and tokenizer loaded successfully.")
         except Exception as e:
             logger.error("Error loading model or tokenizer: %s", e)
             raise e
-        
-        self.threshold = Config.TASK_SEARCH_THRESHOLD
-        self.max_length = Config.TASK_SEARCH_MAX_TOKEN_LENGTH
-        self.padding = Config.TASK_SEARCH_PADDING_STRATEGY
+        self.entailment_index = self.model.config.label2id.get('entailment', 2)
+
+    def is_ready(self) -> bool:
+        """
+        Check whether the models needed by find_task are loaded.
+        """
+        return self.model is not None and (not self.index_enabled or self.encoder.is_ready())
+
+    def warmup(self, all_tasks: Optional[List[Dict]] = None):
+        """
+        Load the models, score dummy batches of one pair and of a full batch and fit the lexical
+        matcher once, so that the first request does not pay for loading and lazy initialization.
+
+        Args:
+        all_tasks (list, optional): The tasks that will be searched, see find_task. The lexical
+            matcher is fitted and the embedding index synced on them.
+        """
+        task_text = "warmup task " * 8
+        # _forward bypasses the inference cache, so the model is run even if the pairs were scored before.
+        self._forward([("warmup", task_text)])
+        self._forward([("warmup", task_text)] * self.batch_size)
+        if self.lexical_enabled:
+            texts = [self.task_text(task) for task in all_tasks] if all_tasks else ["warmup task", task_text]
+            self.lexical_matcher.rank("warmup", texts, 1)
+        if self.index_enabled:
+            self.encoder.warmup()
+            if all_tasks:
+                self.sync_index(all_tasks)
+
+    def _get_index(self) -> TaskEmbeddingIndex:
+        """
+        Open the persistent task embedding index on first use.
+        """
+        if self.index is None:
+            self.encoder.load_model_and_tokenizer()
+            self.index = TaskEmbeddingIndex(Config.TASK_SEARCH_INDEX_PATH, self.encoder.model.config.hidden_size, self.encoder.model_name)
+        return self.index
+
+    def sync_index(self, all_tasks: List[Dict]) -> int:
+        """
+        Bring the embedding index up to date with the given tasks, encoding only new or changed ones.
+
+        Args:
+        all_tasks (list): The tasks to index, see find_task.
+
+        Returns:
+        int: The number of tasks that were (re-)encoded.
+        """
+        index = self._get_index()
+        stale_tasks, stale_hashes = [], []
+        for task in all_tasks:
+            content_hash = index.content_hash(self.task_text(task))
+            if index.is_stale(task['task_id'], content_hash):
+                stale_tasks.append(task)
+                stale_hashes.append(content_hash)
+        if stale_tasks:
+            vectors = self.encoder.encode([self.task_text(task) for task in stale_tasks])
+            index.upsert([task['task_id'] for task in stale_tasks], stale_hashes, vectors)
+        return len(stale_tasks)
+
+    def remove_task(self, task_id: str):
+        """
+        Delete a task from the embedding index.
+        """
+        self._get_index().delete(task_id)
+
+    @staticmethod
+    def task_text(task: Dict) -> str:
+        """
+        Combine task descriptions with other relevant fields.
+        """
+        return f"{task['task_title']} {task['list_title']} {task['description']}"
+
+    def score_pairs(self, pairs: List[Tuple[str, str]], forward: Optional[Callable] = None) -> List[float]:
+        """
+        Score (user_input, task text) pairs with the NLI model. The logits of pairs scored before,
+        by this service or the categorizer, are taken from the shared inference cache.
+
+        Args:
+        pairs (list of tuple): The (user_input, task text) pairs.
+        forward (callable, optional): Takes a list of pairs and returns their logits. Defaults to _forward.
+
+        Returns:
+        list of float: The entailment probability of every pair.
+        """
+        import torch
+
+        if not self.tokenizer or not self.model:
+            self.load_model_and_tokenizer()
+        cache_key = (self.model_name, Config.INFERENCE_BACKEND, self.max_length)
+        logits = inference_cache.get_logits(cache_key, pairs, forward or self._forward)
+        instrumentation.increment('task_search', 'pairs_scored', len(pairs))
+        if not logits:
+            return []
+        with instrumentation.timer('task_search', 'softmax'):
+            probabilities = torch.nn.functional.softmax(torch.tensor(logits), dim=1)
+            return probabilities[:, self.entailment_index].tolist()
+
+    def _forward(self, pairs: List[Tuple[str, str]]) -> List[List[float]]:
+        """
+        Compute the NLI logits of (user_input, task text) pairs, one batch of the configured size at a time.
+        """
+        import torch
+
+        if not self.tokenizer or not self.model:
+            self.load_model_and_tokenizer()
+        logits = []
+        for start in range(0, len(pairs), self.batch_size):
+            batch = pairs[start:start + self.batch_size]
+            with instrumentation.timer('task_search', 'tokenize'):
+                inputs = inference_cache.encode_pairs(self.tokenizer, batch, padding=self.padding, max_length=self.max_length)
+            with instrumentation.timer('task_search', 'forward'), torch.inference_mode():
+                outputs = self.model(**inputs)
+            logits.extend(outputs.logits.tolist())
+        instrumentation.increment('task_search', 'pairs_computed', len(pairs))
+        return logits
+
+    def rank_tasks(self, user_input: str, all_tasks: List[Dict], top_k: Optional[int] = None, forward: Optional[Callable] = None) -> List[Tuple[str, float]]:
+        """
+        Rank tasks by how well they match the user input.
+
+        The (user_input, task) pairs are scored in chunks of the configured batch size with
+        dynamic padding, keeping only a running top-k, so peak memory does not depend on the
+        number of tasks.
+
+        Args:
+        user_input (str): The text input from the user describing the edits.
+        all_tasks (list): The list of all tasks, see find_task.
+        top_k (int, optional): The number of best matches to return. Defaults to the configured value.
+        forward (callable, optional): Computes the logits of the pairs not in the inference cache, see score_pairs.
+
+        Returns:
+        list of tuple: (task_id, score) pairs sorted by descending score.
+        """
+        top_k = top_k or self.top_k
+        heap = []
+        for start in range(0, len(all_tasks), self.batch_size):
+            chunk = all_tasks[start:start + self.batch_size]
+            scores = self.score_pairs([(user_input, self.task_text(task)) for task in chunk], forward)
+            for offset, score in enumerate(scores):
+                # Ties are broken in favour of the earlier task.
+                item = (score, -(start + offset))
+                if len(heap) < top_k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        return [(all_tasks[-negative_index]['task_id'], score) for score, negative_index in sorted(heap, reverse=True)]
+
+    def _record_stage(self, stage: str, start: float, latencies: Dict[str, float]):
+        """
+        Record the latency of a search stage that started at the given perf_counter value.
+        """
+        elapsed = time.perf_counter() - start
+        latencies[stage] = elapsed
+        self.stage_stats[stage]['calls'] += 1
+        self.stage_stats[stage]['seconds'] += elapsed
+        instrumentation.observe('task_search', stage, elapsed)
+
+    def _answer(self, stage: str, task_id: str, score: float, threshold: float, latencies: Dict[str, float]) -> Dict:
+        self.stage_stats[stage]['answered'] += 1
+        instrumentation.increment('task_search', f"answered_by_{stage}")
+        return {
+            'task_id': task_id if score > threshold else None,
+            'best_task_id': task_id,
+            'score': score,
+            'stage': stage,
+            'latency': latencies,
+        }
+
+    def search(self, user_input: str, all_tasks: List[Dict], forward: Optional[Callable] = None) -> Dict:
+        """
+        Find the best matching task through the configured search stages.
+
+        1. Lexical: TF-IDF over character n-grams. A confident match is returned directly,
+           otherwise the best lexical matches become candidates for the following stages. If the
+           task texts have no n-grams, every task remains a candidate.
+        2. Index: cosine search in the persistent embedding index, if enabled. Without reranking
+           the index answers; otherwise its hits are added to the candidates.
+        3. Cross-encoder: NLI scoring of the (user_input, task) pairs of the candidates.
+
+        Args:
+        user_input (str): The text input from the user describing the edits.
+        all_tasks (list): The list of all tasks, see find_task. Must not be empty.
+        forward (callable, optional): Computes the cross-encoder logits of the pairs not in the inference cache, see score_pairs.
+
+        Returns:
+        dict: The matched task_id (None if the score does not exceed the stage's threshold), the best
+        candidate and its score, the stage that answered and the latency of every stage that ran.
+        """
+        latencies = {}
+        candidates = all_tasks
+
+        if self.lexical_enabled:
+            start = time.perf_counter()
+            ranked = self.lexical_matcher.rank(user_input, [self.task_text(task) for task in all_tasks], self.lexical_candidates)
+            self._record_stage('lexical', start, latencies)
+            if self.lexical_matcher.is_confident(ranked):
+                index, score = ranked[0]
+                return self._answer('lexical', all_tasks[index]['task_id'], score, self.lexical_matcher.confidence, latencies)
+            if ranked:
+                candidates = [all_tasks[index] for index, _ in ranked]
+
+        if self.index_enabled:
+            start = time.perf_counter()
+            self.sync_index(all_tasks)
+            query_vector = self.encoder.encode([user_input])[0]
+            hits = self.index.search(query_vector, max(self.rerank_top_k, 1), task_ids=[task['task_id'] for task in all_tasks])
+            self._record_stage('index', start, latencies)
+            if not self.rerank_top_k:
+                task_id, score = hits[0]
+                return self._answer('index', task_id, score, self.index_threshold, latencies)
+            tasks_by_id = {task['task_id']: task for task in all_tasks}
+            index_candidates = [tasks_by_id[task_id] for task_id, _ in hits]
+            if self.lexical_enabled:
+                hit_ids = {task_id for task_id, _ in hits}
+                candidates = index_candidates + [task for task in candidates if task['task_id'] not in hit_ids]
+            else:
+                candidates = index_candidates
+
+        start = time.perf_counter()
+        task_id, score = self.rank_tasks(user_input, candidates, top_k=1, forward=forward)[0]
+        self._record_stage('cross_encoder', start, latencies)
+        return self._answer('cross_encoder', task_id, score, self.threshold, latencies)
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Report per-stage counters: how often each stage ran and answered, and its total and mean latency.
+        """
+        return {
+            stage: dict(stage_stats, mean_seconds=stage_stats['seconds'] / stage_stats['calls'] if stage_stats['calls'] else 0.0)
+            for stage, stage_stats in self.stage_stats.items()
+        }
 
     def find_task(self, user_input: str, all_tasks: List[Dict]) -> Optional[str]:
         """
@@ -49,26 +310,16 @@ class TaskSearchService:
             return None
 
         try:
-            # Combine task descriptions with other relevant fields
-            task_texts = [f"{task['task_title']} {task['list_title']} {task['description']}" for task in all_tasks]
-            inputs = self.tokenizer([user_input] + task_texts, return_tensors='pt', truncation=True, padding=self.padding, max_length=self.max_length)
-            
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-
-            # Extract the probabilities for the tasks (excluding the user input)
-            probabilities = torch.nn.functional.softmax(outputs.logits, dim=1)
-            similarity_scores = probabilities[0, 1:].tolist()
-
-            # Find the index of the most similar task
-            most_similar_idx = max(range(len(similarity_scores)), key=similarity_scores.__getitem__)
-            if similarity_scores[most_similar_idx] > self.threshold:
-                logger.info(f"Task '{all_tasks[most_similar_idx]['task_id']}' exceeds the similarity threshold with a score of {similarity_scores[most_similar_idx]:.4f}.")
-                return all_tasks[most_similar_idx]['task_id']
+            result = self.search(user_input, all_tasks)
+            if result['task_id'] is not None:
+                logger.debug("Task '%s' exceeds the similarity threshold of the %s stage with a score of %.4f.", result['task_id'], result['stage'], result['score'])
+                return result['task_id']
             else:
-                logger.info("No task exceeds the similarity threshold.")
+                instrumentation.increment('task_search', 'no_match')
+                logger.debug("No task exceeds the similarity threshold.")
                 return None
 
         except Exception as e:
+            instrumentation.increment('task_search', 'errors')
             logger.error("Error during task matching: %s", e)
             return None
@@ -0,0 +1,154 @@
+import json
+
+TASK_FIELDS = ("title", "description", "deadline", "priority", "estimated_time", "spent_time")
+
+
+class IncrementalTaskParser:
+    def __init__(self, fields=TASK_FIELDS):
+        """
+        Initialize the incremental parser for the task JSON object of a streamed completion.
+
+        The parser scans the text as it arrives and decodes each top-level field of the first JSON
+        object as soon as its value is complete, so the title can be shown before the rest of the
+        completion has been generated. A field whose value does not decode is skipped without
+        losing the fields around it.
+
+        Args:
+        fields (tuple of str): The fields of the task, in the shape returned by the parser.
+        """
+        self.fields = fields
+        self.values = {}
+        self.errors = []
+        self._text = []
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._expect = None
+        self._key = None
+        self._value_start = None
+        self._done = False
+
+    @property
+    def complete(self):
+        """
+        Whether every field has been parsed.
+        """
+        return all(field in self.values for field in self.fields)
+
+    @property
+    def finished(self):
+        """
+        Whether the task object has been closed or every field has been parsed.
+        """
+        return self._done or self.complete
+
+    def feed(self, chunk):
+        """
+        Consume the next piece of the completion.
+
+        Args:
+        chunk (str): The newly generated text.
+
+        Returns:
+        list of tuple: The (field, value) pairs completed by this chunk, in order.
+        """
+        completed = []
+        if self._done:
+            return completed
+        offset = self._length
+        self._text.append(chunk)
+        self._length += len(chunk)
+        for index, character in enumerate(chunk, start=offset):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif character == '\\':
+                    self._escaped = True
+                elif character == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._end_top_level_string(index, completed)
+                continue
+            if self._depth == 0:
+                # Text before the object, such as "Ответ:", is skipped.
+                if character == '{':
+                    self._depth = 1
+                    self._expect = 'key'
+                continue
+            if character == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._string_start = index
+                    if self._expect == 'value':
+                        self._value_start = index
+                        self._expect = 'end'
+            elif character in '{[':
+                if self._depth == 1 and self._expect == 'value':
+                    self._value_start = index
+                    self._expect = 'end'
+                self._depth += 1
+            elif character in '}]':
+                if self._depth == 1:
+                    self._emit(index, completed)
+                    self._done = True
+                    break
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._emit(index + 1, completed)
+            elif self._depth == 1:
+                if character == ':' and self._expect == 'colon':
+                    self._expect = 'value'
+                elif character == ',':
+                    self._emit(index, completed)
+                    self._expect = 'key'
+                elif self._expect == 'value' and not character.isspace():
+                    self._value_start = index
+                    self._expect = 'end'
+        return completed
+
+    def result(self):
+        """
+        Return the fields parsed so far, with missing fields set to None.
+
+        Returns:
+        dict: A dictionary containing the parsed fields of the task.
+        """
+        return {field: self.values.get(field) for field in self.fields}
+
+    def _slice(self, start, end):
+        text = ''.join(self._text)
+        self._text = [text]
+        return text[start:end]
+
+    def _end_top_level_string(self, index, completed):
+        if self._expect == 'key':
+            try:
+                self._key = json.loads(self._slice(self._string_start, index + 1))
+            except json.JSONDecodeError as e:
+                self.errors.append(f"Malformed key: {e}")
+                self._key = None
+            self._expect = 'colon'
+        elif self._expect == 'end':
+            self._emit(index + 1, completed)
+
+    def _emit(self, end, completed):
+        """
+        Decode the pending value up to end and record it under the current key.
+        """
+        if self._value_start is None:
+            return
+        raw = self._slice(self._value_start, end).strip()
+        key = self._key
+        self._value_start = None
+        self._key = None
+        self._expect = None
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.errors.append(f"Malformed value of {key!r}: {e}")
+            return
+        if key in self.fields and key not in self.values:
+            self.values[key] = value
+            completed.append((key, value))
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.synthetic_data import provide_private_config
+
+provide_private_config()
+
+from core.inference_cache import inference_cache  # noqa: E402
+from services.categorizer_service import CategorizerService  # noqa: E402
+
+VOCABULARY = ["спорт", "работа", "сон", "друзья", "музыка"]
+CATEGORIES = VOCABULARY
+
+
+def embed(texts):
+    """
+    Deterministic embeddings without a model: one dimension per vocabulary word, plus a constant.
+    """
+    vectors = np.array([[float(word in text.lower()) for word in VOCABULARY] + [0.1] for text in texts], dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def service(monkeypatch):
+    categorizer = CategorizerService()
+    categorizer.model_name = 'test-keyword-model'
+    categorizer.tokenizer = SimpleNamespace(model_max_length=512)
+    categorizer.model = object()
+    categorizer.forwarded = []
+    encoded = []
+
+    def forward(pairs, batch_size=None):
+        categorizer.forwarded.extend(pairs)
+        # Entailment when the hypothesis' category occurs in the text.
+        return [[-4.0, 0.0, 4.0] if hypothesis.split()[-1].rstrip('.') in text else [4.0, 0.0, -4.0] for text, hypothesis in pairs]
+
+    def encode(texts):
+        encoded.extend(texts)
+        return embed(texts)
+
+    monkeypatch.setattr(categorizer, '_forward', forward)
+    monkeypatch.setattr(categorizer.prefilter_encoder, 'encode', encode)
+    monkeypatch.setattr(inference_cache, 'enabled', False)
+    return categorizer, encoded
+
+
+def test_prefilter_scores_only_the_top_k_categories(monkeypatch):
+    categorizer, encoded = service(monkeypatch)
+    texts = ["утром спорт", "весь день работа, вечером друзья", "ничего особенного"]
+
+    full = categorizer.categorize_many(texts, CATEGORIES, top_k=0)
+    assert full == [["спорт"], ["работа", "друзья"], []]
+    assert len(categorizer.forwarded) == len(texts) * len(CATEGORIES)
+
+    categorizer.forwarded.clear()
+    assert categorizer.categorize_many(texts, CATEGORIES, top_k=2) == full
+    assert len(categorizer.forwarded) == len(texts) * 2
+    assert [text for text, _ in categorizer.forwarded[:2]] == [texts[0]] * 2
+
+    # The hypothesis embeddings are computed once.
+    categorizer.categorize_many(texts, CATEGORIES, top_k=2)
+    assert sum(text.startswith("Это пример") for text in encoded) == len(CATEGORIES)
+
+
+def test_prefilter_recall(monkeypatch):
+    categorizer, _ = service(monkeypatch)
+    texts = ["спорт, работа и сон", "музыка"]
+
+    report = categorizer.prefilter_recall(texts, CATEGORIES, top_k=2)
+    assert (report['positives'], report['pairs_full'], report['pairs_prefiltered']) == (4, 10, 4)
+    assert report['recall'] == 0.75
+    assert categorizer.prefilter_recall(texts, CATEGORIES, top_k=3)['recall'] == 1.0
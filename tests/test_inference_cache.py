@@ -0,0 +1,84 @@
+import pytest
+
+from core.inference_cache import InferenceCache
+
+
+class Model:
+    """
+    Computes fake logits and remembers the pairs it was asked for.
+    """
+
+    def __init__(self):
+        self.computed = []
+
+    def __call__(self, pairs):
+        self.computed.extend(pairs)
+        return [[float(len(text)), float(len(hypothesis))] for text, hypothesis in pairs]
+
+
+def test_distinct_missing_pairs_are_computed_once():
+    cache, model = InferenceCache(), Model()
+    pairs = [('a', 'x'), ('bb', 'x'), ('a', 'x')]
+    assert cache.get_logits('model', pairs, model) == [(1.0, 1.0), (2.0, 1.0), (1.0, 1.0)]
+    assert model.computed == [('a', 'x'), ('bb', 'x')]
+
+    assert cache.get_logits('model', [('bb', 'x'), ('ccc', 'y')], model) == [(2.0, 1.0), (3.0, 1.0)]
+    assert model.computed[2:] == [('ccc', 'y')]
+    # Entries are per model.
+    cache.get_logits('other model', [('a', 'x')], model)
+    assert model.computed[3:] == [('a', 'x')]
+    # Duplicates within a call are looked up once.
+    assert cache.stats()['logits']['hits'] == 1
+
+
+def test_disabled_cache_computes_every_pair():
+    cache, model = InferenceCache(enabled=False), Model()
+    cache.get_logits('model', [('a', 'x'), ('a', 'x')], model)
+    assert model.computed == [('a', 'x'), ('a', 'x')] and len(cache.logits) == 0
+
+
+def test_logits_on_disk_survive_a_restart(tmp_path):
+    model = Model()
+    InferenceCache(cache_dir=str(tmp_path)).get_logits('model', [('a', 'x'), ('bb', 'y')], model)
+
+    restarted = InferenceCache(cache_dir=str(tmp_path))
+    assert restarted.get_logits('model', [('bb', 'y'), ('ccc', 'z')], model) == [(2.0, 1.0), (3.0, 1.0)]
+    assert model.computed[2:] == [('ccc', 'z')]
+    stats = restarted.stats()['logits']
+    assert (stats['disk_hits'], stats['disk_misses']) == (1, 1)
+
+
+@pytest.fixture(scope='module')
+def tokenizer(tmp_path_factory):
+    from transformers import AutoTokenizer
+
+    from benchmarks.tiny_model import build_tiny_checkpoint
+    return AutoTokenizer.from_pretrained(build_tiny_checkpoint(str(tmp_path_factory.mktemp('model'))))
+
+
+@pytest.mark.parametrize('padding, max_length', [(True, None), ('max_length', 24), (True, 12)])
+def test_pair_inputs_match_the_tokenizer(tokenizer, padding, max_length):
+    cache = InferenceCache()
+    pairs = [("короткий текст", "Этот текст о работе."), ("совсем другой и более длинный текст про спорт", "Этот текст о спорте.")]
+    expected = tokenizer([text for text, _ in pairs], [hypothesis for _, hypothesis in pairs], return_tensors='pt',
+                         truncation=True, padding=padding, max_length=max_length)
+    # The second call builds the inputs from cached encodings.
+    for _ in range(2):
+        inputs = cache.encode_pairs(tokenizer, pairs, padding=padding, max_length=max_length)
+        assert set(inputs) == set(expected)
+        for name in expected:
+            assert inputs[name].tolist() == expected[name].tolist()
+
+
+@pytest.mark.parametrize('previous_call', [{'truncation': True, 'max_length': 12}, {'padding': 'max_length', 'max_length': 64}])
+def test_pair_inputs_do_not_depend_on_the_previous_tokenizer_call(tokenizer, previous_call):
+    cache = InferenceCache()
+    pairs = [("совсем другой и более длинный текст про спорт " * 3, "Этот текст о спорте.")]
+    # The tokenizer keeps the truncation and padding of its last call in its backend.
+    tokenizer(["a b c d e f g h i j k l m n"], ["x y z"], **previous_call)
+    expected = tokenizer([text for text, _ in pairs], [hypothesis for _, hypothesis in pairs], return_tensors='pt', truncation=True, padding=True)
+    tokenizer(["a b c d e f g h i j k l m n"], ["x y z"], **previous_call)
+
+    inputs = cache.encode_pairs(tokenizer, pairs)
+    for name in expected:
+        assert inputs[name].tolist() == expected[name].tolist()
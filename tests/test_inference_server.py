@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+from benchmarks.synthetic_data import provide_private_config
+
+provide_private_config()
+
+from core.inference_cache import inference_cache  # noqa: E402
+from services.categorizer_service import CategorizerService  # noqa: E402
+from services.inference_server import InferenceServer  # noqa: E402
+from services.task_search_service import TaskSearchService  # noqa: E402
+
+
+def overlap_logits(pairs):
+    """
+    Deterministic NLI logits without a model: the entailment logit grows with the words the pair shares.
+    """
+    return [[0.0, 0.0, 2.0 * len(set(text.lower().split()) & set(hypothesis.lower().split())) - 1.0] for text, hypothesis in pairs]
+
+
+def fake_model(service, monkeypatch):
+    service.model_name = 'test-overlap-model'
+    service.tokenizer = SimpleNamespace(model_max_length=512)
+    service.model = object()
+    service.entailment_index = 2
+    monkeypatch.setattr(service, '_forward', lambda pairs, batch_size=None: overlap_logits(pairs))
+    monkeypatch.setattr(inference_cache, 'enabled', False)
+
+
+def task(task_id, title):
+    return {'task_id': task_id, 'task_title': title, 'list_title': 'Работа', 'description': ''}
+
+
+TASKS = [task('call', "Созвон с командой"), task('milk', "Купить молоко"), task('report', "Отчет по проекту")]
+QUERIES = ["перенеси созвон с командой на завтра", "купить молоко и хлеб", "отчет по проекту", "погулять с собакой"]
+
+
+def test_find_task_matches_the_service_pipeline(monkeypatch):
+    service = TaskSearchService()
+    fake_model(service, monkeypatch)
+    server = InferenceServer(task_search_service=service)
+
+    async def run():
+        async with server:
+            return await asyncio.gather(*(server.find_task(query, TASKS) for query in QUERIES))
+
+    served = asyncio.run(run())
+    assert served == [service.find_task(query, TASKS) for query in QUERIES]
+    assert served[1] == 'milk' and served[3] is None
+    # The lexical stage answered some requests without the batcher.
+    assert service.stats()['lexical']['answered'] > 0
+    assert 0 < server.stats()['find_task']['requests'] < len(QUERIES)
+
+
+def test_categorize_matches_the_service_and_splits_large_requests(monkeypatch):
+    service = CategorizerService()
+    fake_model(service, monkeypatch)
+    monkeypatch.setattr('core.config.Config.INFERENCE_SERVER_MAX_BATCH_SIZE', 2)
+    server = InferenceServer(categorizer_service=service)
+    categories = ["спорт", "работа", "проект", "друзья", "сон"]
+    texts = ["работа над проект", "сон после спорт", "ничего"]
+
+    async def run():
+        async with server:
+            return await asyncio.gather(*(server.categorize(text, categories) for text in texts))
+
+    assert asyncio.run(run()) == service.categorize_many(texts, categories)
+    stats = server.stats()['categorize']
+    assert max(stats['batch_size_histogram']) <= 2
+    assert stats['requests'] == len(texts) * 3
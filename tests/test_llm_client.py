@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from benchmarks.stub_llm_server import StubLLMServer
+from services.llm_client import AsyncLLMClient, LLMError, _parse_duration
+
+
+class CountingServer(StubLLMServer):
+    """
+    A stub server that records the largest number of requests it handled at once.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _completions(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super()._completions(request)
+        finally:
+            self.in_flight -= 1
+
+
+class RejectingServer(StubLLMServer):
+    async def _completions(self, request):
+        self.requests += 1
+        return web.json_response({'error': {'message': 'Invalid prompt'}}, status=400)
+
+
+def complete_all(server, count, **client_options):
+    async def run():
+        async with server:
+            async with AsyncLLMClient(server.url, 'key', backoff_base=0.001, **client_options) as client:
+                return await asyncio.gather(*(client.complete(f"prompt {index}", 'model', 16) for index in range(count)), return_exceptions=True)
+
+    return asyncio.run(run())
+
+
+def test_rate_limit_durations():
+    assert _parse_duration('20ms') == pytest.approx(0.02)
+    assert _parse_duration('6m0s') == 360
+    assert _parse_duration('1.5') == 1.5
+    assert _parse_duration('') is None and _parse_duration('soon') is None
+
+
+def test_transient_errors_are_retried_within_the_concurrency_limit():
+    server = CountingServer(latency_ms=5, error_rate=0.3, completions=["answer"])
+    answers = complete_all(server, 20, max_concurrency=4, max_retries=10)
+    assert answers == ["answer"] * 20
+    # Some requests were answered with 429 or 503 and retried.
+    assert server.requests > 20
+    assert server.max_in_flight == 4
+
+
+def test_permanent_errors_and_exhausted_retries_raise():
+    server = RejectingServer()
+    [error] = complete_all(server, 1, max_retries=3)
+    assert isinstance(error, LLMError) and "HTTP 400" in str(error) and server.requests == 1
+
+    server = StubLLMServer(latency_ms=0, error_rate=1.0)
+    [error] = complete_all(server, 1, max_retries=2)
+    assert isinstance(error, LLMError) and "after 3 attempts" in str(error) and server.requests == 3
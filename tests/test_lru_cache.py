@@ -0,0 +1,37 @@
+from core.lru_cache import LRUCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'b' not in cache and cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.get('b', 'missing') == 'missing'
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses'], stats['evictions']) == (2, 3, 1, 1)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('core.lru_cache.time.monotonic', lambda: now[0])
+    cache = LRUCache(ttl=10)
+    cache.set('a', 1)
+    now[0] += 5
+    assert cache.get('a') == 1
+    now[0] += 6
+    assert 'a' not in cache and cache.get('a') is None and len(cache) == 0
+
+
+def test_max_bytes_evicts_until_the_entries_fit():
+    cache = LRUCache(maxsize=10, max_bytes=100, sizeof=lambda key, value: value)
+    for key in 'abc':
+        cache.set(key, 40)
+    assert 'a' not in cache and cache.bytes == 80 and cache.stats()['evictions'] == 1
+
+    # A value larger than the budget is not stored, and replaces the previous value of its key.
+    cache.set('b', 101)
+    assert 'b' not in cache and cache.bytes == 40
+    cache.clear()
+    assert cache.stats()['bytes'] == 0
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from core.micro_batcher import BatcherOverloadedError, MicroBatcher
+
+
+def test_concurrent_requests_are_coalesced_in_order():
+    batches = []
+
+    def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        async with MicroBatcher(double, max_batch_size=4, max_wait_ms=50) as batcher:
+            results = await asyncio.gather(*(batcher.submit([index, index + 100]) for index in range(3)))
+            return results, batcher.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [[0, 200], [2, 202], [4, 204]]
+    # The third request would overflow the first batch and is carried over to the next one.
+    assert batches == [[0, 100, 1, 101], [2, 102]]
+    assert stats['requests'] == 3 and stats['batch_size_histogram'] == {2: 1, 4: 1}
+
+
+def test_a_failed_batch_fails_its_requests_only():
+    def fail_on_negative(items):
+        if min(items) < 0:
+            raise ValueError("negative")
+        return items
+
+    async def run():
+        async with MicroBatcher(fail_on_negative, max_batch_size=1) as batcher:
+            return await asyncio.gather(batcher.submit([-1]), batcher.submit([1]), return_exceptions=True)
+
+    failed, succeeded = asyncio.run(run())
+    assert isinstance(failed, ValueError) and succeeded == [1]
+
+
+def test_full_queue_rejects_requests():
+    async def run():
+        batcher = MicroBatcher(lambda items: items, max_queue_size=1, reject_when_full=True)
+        await batcher.start()
+        # The queue is only drained once the event loop runs the batcher.
+        first = asyncio.ensure_future(batcher.submit([1]))
+        await asyncio.sleep(0)
+        with pytest.raises(BatcherOverloadedError):
+            await batcher.submit([2])
+        assert await first == [1]
+        await batcher.stop()
+        return batcher.stats()['rejected']
+
+    assert asyncio.run(run()) == 1
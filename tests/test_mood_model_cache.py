@@ -0,0 +1,93 @@
+import pytest
+
+from benchmarks.synthetic_data import generate_mood_history
+from services.mood_analyzer_service import MoodAnalyzerService
+from services.mood_model_cache import MoodModelCache, model_size
+
+
+def service(cache_dir=None, max_bytes=None):
+    analyzer = MoodAnalyzerService()
+    analyzer.n_estimators = 5
+    analyzer.warm_start_trees = 2
+    analyzer.max_estimators = 9
+    analyzer.model_cache = MoodModelCache(16, cache_dir, max_bytes)
+    return analyzer
+
+
+def head(history, days):
+    return {column: values[:days] for column, values in history.items()}
+
+
+def cached_model(analyzer, user_id):
+    return analyzer.model_cache.get(('user', user_id))['model']
+
+
+def test_unchanged_history_is_a_hit():
+    analyzer, history = service(), generate_mood_history(60, seed=1)
+    first = analyzer.analyze_mood(history, user_id=1)
+    assert analyzer.analyze_mood(history, user_id=1) == first
+    stats = analyzer.model_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['refits'], stats['warm_starts']) == (1, 1, 1, 0)
+
+
+def test_appended_days_add_trees_until_the_limit():
+    analyzer, history = service(), generate_mood_history(60, seed=1)
+    analyzer.analyze_mood(head(history, 50), user_id=1)
+    analyzer.analyze_mood(head(history, 51), user_id=1)
+    model = cached_model(analyzer, 1)
+    assert model.n_estimators == len(model.estimators_) == 7
+    analyzer.analyze_mood(head(history, 52), user_id=1)
+    assert cached_model(analyzer, 1).n_estimators == 9
+    # A further warm start would exceed max_estimators, so the forest is fitted anew.
+    analyzer.analyze_mood(head(history, 53), user_id=1)
+    assert cached_model(analyzer, 1).n_estimators == 5
+    stats = analyzer.model_cache.stats()
+    assert (stats['warm_starts'], stats['refits']) == (2, 2)
+
+
+def test_shrunk_history_or_changed_columns_are_refitted():
+    analyzer, history = service(), generate_mood_history(60, seed=1)
+    analyzer.analyze_mood(history, user_id=1)
+    analyzer.analyze_mood(head(history, 40), user_id=1)
+    renamed = {('renamed' if column != 'mood_rate' and index == 0 else column): values for index, (column, values) in enumerate(history.items())}
+    analyzer.analyze_mood(dict(renamed, extra=[1.0] * 60), user_id=1)
+    assert analyzer.model_cache.stats()['refits'] == 3
+    assert analyzer.model_cache.stats()['warm_starts'] == 0
+
+
+def test_failed_warm_start_keeps_the_cached_forest(monkeypatch):
+    analyzer, history = service(), generate_mood_history(60, seed=1)
+    analyzer.analyze_mood(head(history, 50), user_id=1)
+    cached = cached_model(analyzer, 1)
+    trees = list(cached.estimators_)
+
+    def fail(X, y):
+        raise MemoryError("out of memory")
+
+    monkeypatch.setattr(analyzer, '_train', fail)
+    with pytest.raises(MemoryError):
+        analyzer.analyze_mood(head(history, 51), user_id=1)
+    assert cached_model(analyzer, 1) is cached
+    assert cached.n_estimators == 5 and not cached.warm_start and cached.estimators_ == trees
+
+
+def test_entries_survive_a_restart_on_disk(tmp_path):
+    history = generate_mood_history(60, seed=1)
+    result = service(str(tmp_path)).analyze_mood(history, user_id=1)
+
+    restarted = service(str(tmp_path))
+    assert restarted.analyze_mood(history, user_id=1) == result
+    assert restarted.model_cache.stats()['hits'] == 1
+
+
+def test_memory_budget_evicts_forests():
+    analyzer = service(max_bytes=2 ** 30)
+    analyzer.analyze_mood(generate_mood_history(60, seed=1), user_id=1)
+    size = analyzer.model_cache.stats()['bytes']
+    assert size >= model_size(cached_model(analyzer, 1)) > 0
+
+    analyzer = service(max_bytes=int(size * 1.5))
+    for user_id in range(3):
+        analyzer.analyze_mood(generate_mood_history(60, seed=1), user_id=user_id)
+    stats = analyzer.model_cache.stats()
+    assert stats['size'] == 1 and stats['bytes'] <= size * 1.5
@@ -0,0 +1,74 @@
+import json
+
+from services.pipeline_runner import PipelineRunner
+
+
+class Categorizer:
+    def categorize_many(self, texts, categories):
+        return [[categories[0]] if 'work' in text else [] for text in texts]
+
+
+class MoodAnalyzer:
+    def analyze_mood(self, history, user_id=None, mode=None):
+        return {'work': sum(history['work'])}
+
+
+class Recommender:
+    def recommend(self, categories, category_impact, advice_objects, user_id=None, k=5):
+        return [f"advice for {user_id}"]
+
+
+def runner(**kwargs):
+    return PipelineRunner(['work', 'rest'], {}, Categorizer(), MoodAnalyzer(), Recommender(), workers=0, **kwargs)
+
+
+def user(user_id, *days):
+    return json.dumps({'user_id': user_id, 'days': [{'entries': list(entries), 'mood_rate': 3} for entries in days]})
+
+
+def write_lines(path, lines, mode='w'):
+    with open(path, mode, encoding='utf-8') as f:
+        f.write(''.join(line + '\n' for line in lines))
+
+
+def read_output(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_malformed_records_become_error_rows(tmp_path):
+    write_lines(tmp_path / 'input.jsonl', [
+        user(1, ['work late'], ['walk']),
+        json.dumps({'user_id': 99, 'days': ['oops']}),
+        json.dumps({'user_id': 98, 'days': [{'entries': 'work'}]}),
+        json.dumps({'user_id': 97, 'days': {'entries': []}}),
+        json.dumps({'user_id': 96}),
+        json.dumps([1, 2]),
+        '{not json',
+        user(2, ['work', 'more work']),
+    ])
+    stats = runner(batch_size=4).run(str(tmp_path / 'input.jsonl'), str(tmp_path / 'output.jsonl'))
+
+    rows = read_output(tmp_path / 'output.jsonl')
+    assert stats['records'] == 8
+    assert [row['offset'] for row in rows] == list(range(8))
+    assert rows[0]['category_impact'] == {'work': 1} and rows[7]['category_impact'] == {'work': 2}
+    assert rows[7]['recommendations'] == ["advice for 2"]
+    assert all(row['error'].startswith("Malformed record") for row in rows[1:7])
+    assert rows[1]['user_id'] is None and 'day 0 is not an object' in rows[1]['error']
+
+
+def test_resume_continues_after_the_checkpoint(tmp_path):
+    input_path, output_path, checkpoint_path = (str(tmp_path / name) for name in ('input.jsonl', 'output.jsonl', 'checkpoint.json'))
+    write_lines(input_path, [user(index, ['work']) for index in range(3)])
+    runner(checkpoint_every=1).run(input_path, output_path, checkpoint_path)
+    assert json.load(open(checkpoint_path)) == {'offset': 3, 'output_size': (tmp_path / 'output.jsonl').stat().st_size}
+
+    # Output written after the checkpoint, e.g. by a run that was killed, is discarded on resume.
+    write_lines(output_path, ['{"offset": 3, "partial'], mode='a')
+    write_lines(input_path, [user(index, ['work']) for index in range(3, 5)], mode='a')
+    stats = runner(checkpoint_every=1).run(input_path, output_path, checkpoint_path, resume=True)
+
+    assert stats['records'] == 2
+    assert [row['user_id'] for row in read_output(output_path)] == [0, 1, 2, 3, 4]
+    assert json.load(open(checkpoint_path))['offset'] == 5
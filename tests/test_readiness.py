@@ -0,0 +1,38 @@
+from core.readiness import ReadinessProbe
+
+
+class Service:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.loaded = True
+
+    def warmup(self):
+        if self.fail:
+            raise RuntimeError("model missing")
+
+    def is_ready(self):
+        return self.loaded
+
+
+def test_probe_without_services_is_not_ready():
+    probe = ReadinessProbe()
+    assert probe.status() == {'ready': False, 'services': {}}
+    assert not probe.warmup()['ready']
+
+
+def test_ready_once_every_service_warmed_up():
+    probe = ReadinessProbe()
+    service, failing = Service(), Service(fail=True)
+    probe.register('service', service)
+    assert not probe.ready
+
+    probe.register('failing', failing)
+    status = probe.warmup()
+    assert not status['ready']
+    assert status['services']['service']['ready']
+    assert status['services']['failing']['error'] == "RuntimeError: model missing"
+
+    failing.fail = False
+    assert probe.warmup()['ready']
+    service.loaded = False
+    assert not probe.ready
@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from surprise import Dataset, Reader, SVD
+
+from benchmarks.synthetic_data import MOOD_CATEGORIES, generate_advice_catalogue, generate_user_profiles
+from core.config import Config
+from services.factorization_model import save_factorization_model
+from services.reccomendation_service import RecommendationService
+from services.recommendation_trainer import build_ratings, train_recommendation_model
+
+
+def advice(*categories, showed=0, agreed=0, completed=0):
+    return SimpleNamespace(categories=list(categories), showed_count=showed, agreed_count=agreed, completed_count=completed)
+
+
+def loop_rating(service, advice, user_categories, user_category_impact):
+    # The per-advice rating computed before the catalogue was compiled into a sparse matrix.
+    impact_score = sum(user_category_impact.get(cat, 0) for cat in advice.categories)
+    user_preference_bonus = sum(1 for cat in advice.categories if cat in user_categories)
+    interaction_score = service.agreed_count_weight * advice.agreed_count + service.completed_count_weight * advice.completed_count + service.showed_count_weight * advice.showed_count
+    total_score = service.impact_score_weight * impact_score + service.preference_bonus_weight * user_preference_bonus + interaction_score
+    return max(service.min_scale, min(service.max_scale, round(total_score)))
+
+
+def test_sparse_scores_match_the_per_advice_loop():
+    service = RecommendationService()
+    advice_objects = generate_advice_catalogue(300, seed=1)
+    work, sport = MOOD_CATEGORIES[6], MOOD_CATEGORIES[0]
+    advice_objects['Повтор'] = advice(work, work, sport, completed=1)
+    users = [(categories, impact) for _, categories, impact in generate_user_profiles(50, seed=2)]
+    users.append(({work, 'Неизвестно'}, {work: 0.01, 'Неизвестно': 1.0}))
+    users.append((set(), {}))
+
+    ratings = service.score_advice(users, advice_objects)
+    expected = [[loop_rating(service, item, *user) for item in advice_objects.values()] for user in users]
+    np.testing.assert_array_equal(ratings, expected)
+
+
+def test_catalogue_is_recompiled_only_when_the_advice_set_changes():
+    service = RecommendationService()
+    advice_objects = {'a': advice('Работа'), 'b': advice('Спорт')}
+    user = ({'Спорт'}, {})
+    service.score_advice([user], advice_objects)
+    catalogue = service.catalogue
+
+    # Interaction counters are read live without recompiling.
+    advice_objects['b'].showed_count = 100
+    assert service.score_advice([user], advice_objects).tolist() == [[1, 1]]
+    assert service.catalogue is catalogue
+
+    advice_objects['b'].categories.append('Работа')
+    service.score_advice([user], advice_objects)
+    assert service.catalogue is not catalogue
+    catalogue = service.catalogue
+
+    advice_objects['c'] = advice('Сон')
+    service.recommend(*user, advice_objects)
+    assert service.catalogue is not catalogue and service.catalogue.advice_names == ['a', 'b', 'c']
+
+
+def test_top_k_from_the_saved_factors_matches_the_svd_predictions(tmp_path):
+    users = list(generate_user_profiles(100, seed=3))
+    advice_objects = generate_advice_catalogue(40, seed=4)
+    train_recommendation_model(users, advice_objects, str(tmp_path))
+
+    # The same fit as the trainer's final model, kept in memory.
+    rating_scale = (Config.RECOMMENDATION_MIN_SCALE, Config.RECOMMENDATION_MAX_SCALE)
+    dataset = Dataset.load_from_df(build_ratings(users, advice_objects), Reader(rating_scale=rating_scale))
+    svd = SVD(n_factors=Config.RECOMMENDATION_N_FACTORS, n_epochs=Config.RECOMMENDATION_N_EPOCHS, random_state=Config.RECOMMENDATION_RANDOM_STATE)
+    svd.fit(dataset.build_full_trainset())
+
+    service = RecommendationService()
+    model = service.load_model(str(tmp_path))
+    assert isinstance(model.item_factors, np.memmap)
+    for user_id, user_categories, user_category_impact in users[:20]:
+        predictions = {name: svd.predict(user_id, name, clip=False).est for name in advice_objects}
+        recommended = service.recommend(user_categories, user_category_impact, advice_objects, user_id=user_id, k=5)
+        assert recommended == model.top_k(*model.user_vector(user_id), 5)
+        # The factors are stored as float32, so near ties may swap; the predicted ratings must not.
+        assert [predictions[name] for name in recommended] == pytest.approx(sorted(predictions.values(), reverse=True)[:5], abs=1e-4)
+
+
+def test_an_event_folds_the_user_vector_towards_the_item(tmp_path):
+    save_factorization_model(
+        str(tmp_path),
+        user_ids=['known'],
+        advice_names=['a', 'b', 'c'],
+        user_factors=np.array([[1.0, 0.0]]),
+        item_factors=np.array([[1.0, 0.0], [0.0, 1.0], [-1.0, -1.0]]),
+        user_biases=np.zeros(1),
+        item_biases=np.zeros(3),
+        global_mean=3.0,
+        rating_scale=(1, 5)
+    )
+    advice_objects = {name: advice('Работа') for name in 'abc'}
+    service = RecommendationService()
+    model = service.load_model(str(tmp_path))
+    item = model.item_factors[model.advice_index['b']]
+
+    # A new user gets a vector from a single event.
+    assert service._user_vector(model, 'new') is None
+    service.record_completed('new', 'b', advice_objects)
+    vector, _ = service._user_vector(model, 'new')
+    assert vector @ item > 0
+    assert service.recommend([], {}, advice_objects, user_id='new') == ['b']
+    assert advice_objects['b'].completed_count == 1
+
+    prior, _ = model.user_vector('known')
+    assert service.recommend([], {}, advice_objects, user_id='known') == ['a']
+    service.record_completed('known', 'b', advice_objects)
+    vector, _ = service._user_vector(model, 'known')
+    assert vector @ item > prior @ item
@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from services.task_embedding_index import TaskEmbeddingIndex
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_upsert_search_and_delete(tmp_path):
+    index = TaskEmbeddingIndex(str(tmp_path), 2, 'encoder', initial_capacity=2)
+    index.upsert(['a', 'b'], ['ha', 'hb'], np.stack([unit(1, 0), unit(0, 1)]))
+    assert [task_id for task_id, _ in index.search(unit(1, 0.1), 2)] == ['a', 'b']
+    assert not index.is_stale('a', 'ha') and index.is_stale('a', 'changed')
+
+    index.delete('a')
+    assert 'a' not in index
+    assert [task_id for task_id, _ in index.search(unit(1, 0), 2)] == ['b']
+
+    # The freed row is reused, and the index grows beyond its initial capacity.
+    index.upsert(['c', 'd'], ['hc', 'hd'], np.stack([unit(1, 1), unit(-1, 0)]))
+    assert index.size == 3
+    assert index.search(unit(-1, 0), 1)[0][0] == 'd'
+
+
+def test_updates_are_persisted_and_shared_between_instances(tmp_path):
+    first = TaskEmbeddingIndex(str(tmp_path), 2, 'encoder')
+    second = TaskEmbeddingIndex(str(tmp_path), 2, 'encoder')
+    first.upsert(['a'], ['ha'], unit(1, 0)[None])
+    second.upsert(['b'], ['hb'], unit(0, 1)[None])
+    first.delete('b')
+
+    reopened = TaskEmbeddingIndex(str(tmp_path), 2, 'encoder')
+    assert 'a' in reopened and 'b' not in reopened
+    assert reopened.search(unit(1, 0), 1) == [('a', pytest.approx(1.0))]
+    assert [name for name in os.listdir(tmp_path) if name.startswith('vectors')] == [json.load(open(tmp_path / 'metadata.json'))['vectors_file']]
+
+
+def test_failed_write_keeps_the_previous_index(tmp_path, monkeypatch):
+    index = TaskEmbeddingIndex(str(tmp_path), 2, 'encoder')
+    index.upsert(['a'], ['ha'], unit(1, 0)[None])
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(json, 'dump', fail)
+    with pytest.raises(OSError):
+        index.upsert(['a', 'b'], ['changed', 'hb'], np.stack([unit(0, 1), unit(0, 1)]))
+    monkeypatch.undo()
+
+    reopened = TaskEmbeddingIndex(str(tmp_path), 2, 'encoder')
+    assert len(reopened) == 1 and not reopened.is_stale('a', 'ha')
+    assert reopened.search(unit(1, 0), 1)[0][1] == pytest.approx(1.0)
+
+
+def test_index_of_another_encoder_is_discarded(tmp_path):
+    TaskEmbeddingIndex(str(tmp_path), 2, 'encoder').upsert(['a'], ['ha'], unit(1, 0)[None])
+    assert len(TaskEmbeddingIndex(str(tmp_path), 2, 'other encoder')) == 0
+
+
+def test_updates_are_written_in_place_until_the_rows_run_out(tmp_path):
+    index = TaskEmbeddingIndex(str(tmp_path), 2, 'encoder', initial_capacity=4)
+    index.upsert(['a', 'b'], ['ha', 'hb'], np.stack([unit(1, 0), unit(0, 1)]))
+    vectors_file = index.vectors_file
+    index.upsert(['a'], ['changed'], unit(1, 1)[None])
+    index.delete('b')
+    index.upsert(['c'], ['hc'], unit(-1, 0)[None])
+    assert index.vectors_file == vectors_file and index.vectors.shape[0] == 4
+
+    # One free and one unused row are left for three new tasks.
+    index.upsert(['d', 'e', 'f'], ['hd', 'he', 'hf'], np.stack([unit(0, -1), unit(1, -1), unit(-1, -1)]))
+    assert index.vectors_file != vectors_file and index.vectors.shape[0] == 8
+    reopened = TaskEmbeddingIndex(str(tmp_path), 2, 'encoder')
+    queries = (unit(1, 1), unit(-1, 0), unit(0, -1), unit(1, -1), unit(-1, -1))
+    assert [reopened.search(vector, 1)[0][0] for vector in queries] == ['a', 'c', 'd', 'e', 'f']
+
+
+def test_search_during_updates_sees_consistent_snapshots(tmp_path):
+    rng = np.random.default_rng(0)
+    count, dimension = 5000, 8
+    vectors = rng.normal(size=(count, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = TaskEmbeddingIndex(str(tmp_path), dimension, 'encoder')
+    index.upsert([str(i) for i in range(count)], ['h'] * count, vectors)
+    # Every update moves a task to a new vector; a hit must carry the score of its task's old or new vector.
+    moved = {str(i): vectors[(i + 1) % count] for i in range(0, 60, 2)}
+
+    failures = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            query = vectors[int(rng.integers(60))]
+            for task_id, score in index.search(query, 5):
+                if task_id is None:
+                    failures.append((task_id, score))
+                    continue
+                expected = [float(vectors[int(task_id)] @ query)] + ([float(moved[task_id] @ query)] if task_id in moved else [])
+                if not any(abs(score - value) < 1e-5 for value in expected):
+                    failures.append((task_id, score))
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for task_id, vector in moved.items():
+            index.upsert([task_id], ['changed'], vector[None])
+            index.delete(str(int(task_id) + 1))
+            index.upsert([str(int(task_id) + 1)], ['h'], vectors[int(task_id) + 1][None])
+    finally:
+        done.set()
+        reader.join()
+    assert failures == []
@@ -0,0 +1,46 @@
+import datetime
+
+import pytest
+
+from services.task_fast_parser import FastTaskParser
+
+# A Friday.
+NOW = datetime.datetime(2026, 10, 16, 9, 0)
+
+
+def parse(text):
+    return FastTaskParser().parse(text, now=NOW)
+
+
+@pytest.mark.parametrize('text, title, deadline', [
+    ("Позвонить маме завтра в 10", "Позвонить маме", '2026-10-17T10:00'),
+    ("Call mom tomorrow at 7pm", "Call mom", '2026-10-17T19:00'),
+    # A weekday is the next one, a week ahead on the same weekday.
+    ("отчет в пятницу в 18:30", "Отчет", '2026-10-23T18:30'),
+    # A date that has passed this year is next year's.
+    ("сдать отчет 5 марта в 12:00", "Сдать отчет", '2027-03-05T12:00'),
+    ("тренировка 2026-10-20 at 6 am", "Тренировка", '2026-10-20T06:00'),
+    ("купить молоко", "Купить молоко", None),
+])
+def test_titles_and_deadlines(text, title, deadline):
+    result = parse(text)
+    assert result['title'] == title and result['deadline'] == deadline
+
+
+def test_priority_and_durations():
+    assert parse("отчет в пятницу в 18:30 высокий приоритет")['priority'] == 'high'
+    assert parse("купить молоко не срочно")['priority'] == 'low'
+    result = parse("купить молоко на 30 минут, потратил 1 час")
+    assert (result['priority'], result['estimated_time'], result['spent_time']) == ('none', 30, 60)
+
+
+@pytest.mark.parametrize('text', [
+    "Созвон завтра",                      # a day without a time
+    "Сдать отчет до конца недели",        # an unparsed deadline
+    "встреча 31.02 в 10",                 # an invalid date
+    "срочно не срочно купить",            # conflicting priorities
+    "купить молоко на 30 минут и на 1 час",  # two estimates
+    "встретиться с командой, обсудить планы на следующий квартал и выбрать новые задачи",  # too long for a title
+])
+def test_gives_up_on_texts_it_cannot_parse_confidently(text):
+    assert parse(text) is None
@@ -0,0 +1,35 @@
+from services.task_lexical_matcher import TaskLexicalMatcher
+from services.task_search_service import TaskSearchService
+
+
+def task(task_id, title, description=''):
+    return {'task_id': task_id, 'task_title': title, 'list_title': '', 'description': description}
+
+
+def test_confident_match_and_shortlist():
+    matcher = TaskLexicalMatcher()
+    texts = ["Созвон с командой проекта", "Купить молоко", "Отчет по проекту"]
+    ranked = matcher.rank("перенеси созвон с командой", texts, 2)
+    assert ranked[0][0] == 0 and len(ranked) == 2
+    assert matcher.is_confident([(0, 0.9), (1, 0.2)])
+    assert not matcher.is_confident([(0, 0.9), (1, 0.85)])
+    assert not matcher.is_confident([(0, 0.5)])
+
+
+def test_texts_without_ngrams_rank_nothing():
+    matcher = TaskLexicalMatcher()
+    assert matcher.rank("созвон", ["", " "], 2) == []
+    assert matcher.rank("созвон", [], 2) == []
+    # A later fit on real texts still works.
+    assert matcher.rank("созвон", ["созвон", "молоко"], 1)[0][0] == 0
+
+
+def test_search_falls_back_to_the_cross_encoder_for_empty_task_texts(monkeypatch):
+    service = TaskSearchService()
+    service.index_enabled = False
+    monkeypatch.setattr(service, 'rank_tasks', lambda user_input, tasks, top_k=None, forward=None: [(tasks[-1]['task_id'], 0.95)])
+    tasks = [task('a', ''), task('b', '')]
+
+    result = service.search("созвон", tasks)
+    assert result['stage'] == 'cross_encoder'
+    assert result['task_id'] == 'b'
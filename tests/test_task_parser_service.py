@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.synthetic_data import provide_private_config
+from benchmarks.stub_llm_server import CANNED_TASKS, StubLLMServer
+from core.config import Config
+
+provide_private_config()
+
+from core.private_config import PrivateConfig  # noqa: E402
+from services.task_parser_service import TaskParserService  # noqa: E402
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    server = StubLLMServer(latency_ms=0, token_latency_ms=0).start_in_thread()
+    monkeypatch.setattr(Config, 'TASK_PARSER_API_BASE', server.url)
+    yield server
+    server.stop_in_thread()
+
+
+def test_simple_inputs_skip_the_llm_and_repeated_ones_hit_the_cache(llm):
+    service = TaskParserService()
+    assert service.create_task("Позвонить маме завтра в 10")['title'] == "Позвонить маме"
+    assert llm.requests == 0
+
+    text = "Надо бы купить молока, когда будет время, и заодно хлеба"
+    first = service.create_task(text)
+    assert first['title'] == CANNED_TASKS[0]['title']
+    # The cache key is the normalized prompt, so whitespace does not matter.
+    assert service.create_task(f"  {text} ") == first
+    assert llm.requests == 1
+
+    metrics = service.metrics()
+    assert (metrics['fast_path_hits'], metrics['cache_hits'], metrics['llm_calls']) == (1, 1, 1)
+
+
+def test_create_tasks_parses_every_input_in_order(llm):
+    service = TaskParserService()
+    user_inputs = [f"Разобраться с задачей номер {index}, когда появится свободная минутка" for index in range(5)]
+    tasks = asyncio.run(service.create_tasks(["Позвонить маме завтра в 10"] + user_inputs))
+
+    assert tasks[0]['title'] == "Позвонить маме"
+    assert {task['title'] for task in tasks[1:]} <= {task['title'] for task in CANNED_TASKS}
+    assert llm.requests == len(user_inputs)
+
+
+def test_create_tasks_returns_none_where_the_llm_failed(llm):
+    llm.error_rate = 1.0
+    service = TaskParserService()
+    assert asyncio.run(service.create_tasks(["Разобраться с задачей, когда появится свободная минутка"])) == [None]
+
+
+def test_warmup_connects_with_the_api_key_and_skips_other_openai_versions(llm, monkeypatch):
+    service = TaskParserService()
+    service.warmup(search=False)
+    assert llm.model_list_authorizations == [f"Bearer {PrivateConfig.TASK_PARSER_OPEN_AI_API_KEY}"]
+    assert llm.requests == 0
+
+    # openai>=1 has no api_requestor module.
+    monkeypatch.setattr(TaskParserService, '_openai', staticmethod(lambda: SimpleNamespace(api_base=llm.url)))
+    service.warmup(search=False)
+    assert len(llm.model_list_authorizations) == 1
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+from services.llm_client import AsyncLLMClient, LLMError
+from services.task_stream_parser import IncrementalTaskParser
+
+COMPLETION = 'Ответ: {"title": "Купить \\"молоко\\"", "description": null, "deadline": "2024-06-02T10:00", ' \
+             '"priority": "high", "estimated_time": 15, "spent_time": 0} и еще текст'
+
+
+def test_fields_are_completed_as_soon_as_their_values_end():
+    parser = IncrementalTaskParser()
+    completed = {}
+    for index, character in enumerate(COMPLETION):
+        for field, value in parser.feed(character):
+            completed[field] = (value, index)
+
+    assert parser.finished and parser.complete and not parser.errors
+    assert parser.result() == {'title': 'Купить "молоко"', 'description': None, 'deadline': '2024-06-02T10:00',
+                               'priority': 'high', 'estimated_time': 15, 'spent_time': 0}
+    # The title is known at its closing quote, long before the object ends.
+    assert completed['title'][1] == COMPLETION.index('",')
+    assert completed['spent_time'][1] == COMPLETION.index('}')
+    # Text after the object is ignored.
+    assert parser.feed('{"title": "other"}') == []
+
+
+def test_malformed_and_nested_values_do_not_break_the_other_fields():
+    parser = IncrementalTaskParser()
+    assert parser.feed('{"title": "A", "tags": ["x", {"y": 1}], "priority": lo, "estimated_time": 5') == [('title', 'A')]
+    assert parser.errors and "'priority'" in parser.errors[0]
+    assert not parser.finished
+    assert parser.feed(', "spent_time": 1}') == [('estimated_time', 5), ('spent_time', 1)]
+    assert parser.finished and not parser.complete
+    assert parser.result()['priority'] is None
+
+
+def test_server_sent_events():
+    event = {'choices': [{'index': 0, 'text': 'Куп', 'finish_reason': None}]}
+    assert AsyncLLMClient._parse_event(f"data: {json.dumps(event)}\n".encode()) == 'Куп'
+    assert AsyncLLMClient._parse_event(b': keep-alive\n') == ''
+    assert AsyncLLMClient._parse_event(b'\n') == ''
+    assert AsyncLLMClient._parse_event(b'data: [DONE]\n') is None
+    with pytest.raises(LLMError):
+        AsyncLLMClient._parse_event(b'data: {"choices": []}\n')
+
+
+def test_streamed_task_stops_the_generation_once_complete(monkeypatch):
+    from benchmarks.synthetic_data import provide_private_config
+    from benchmarks.stub_llm_server import CANNED_TASKS, StubLLMServer
+    from core.config import Config
+
+    provide_private_config()
+    from services.task_parser_service import TaskParserService
+
+    # The stream is closed at the end of the object, before the trailing text is generated.
+    completion = json.dumps(CANNED_TASKS[1], ensure_ascii=False) + " " * 400
+    # Too long for the fast path.
+    text = "Надо бы созвониться с Петей насчет проекта, когда он вернется из отпуска"
+
+    async def run():
+        async with StubLLMServer(latency_ms=0, token_latency_ms=1, completions=[completion]) as server:
+            monkeypatch.setattr(Config, 'TASK_PARSER_API_BASE', server.url)
+            service = TaskParserService()
+            fields = []
+            task = await service.create_task_streaming(text, lambda field, _: fields.append(field))
+            # Served from the response cache without a second request.
+            cached = await service.create_task_streaming(text)
+            return task, cached, fields, server.tokens_streamed, server.requests
+
+    task, cached, fields, tokens_streamed, requests = asyncio.run(run())
+    assert task == cached == CANNED_TASKS[1]
+    assert fields == list(CANNED_TASKS[1])
+    assert tokens_streamed < len(completion) / 4 and requests == 1